@@ -1,11 +1,30 @@
+import io
+import os
+import time
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import gdown
-import numpy as np
+from types import MappingProxyType
+
+from sicoin.actualizador import Actualizador
+from sicoin.cache import CacheLRU, memorizar
+from sicoin.conciliacion import REGLAS
+from sicoin.esquema import (risk_cols, cuadrante_cols, estrategia_cols, trimestres,
+                            columnas_actri, columnas_amtri)
+from sicoin.exportar import exportar
+from sicoin.graficas import figura_trimestres
+from sicoin.metricas import ARCHIVO as ARCHIVO_METRICAS, METRICAS
+from sicoin.paquete import IngestaPaquete, ingesta_desde_entorno
+from sicoin.reportes import NGCI, años_disponibles, columnas_instituciones, columnas_sectores, reporte_anual
+from sicoin.resumen import resumen_ptar, resumen_ptci
+from sicoin import grilla
+from sicoin.grilla import TAMAÑOS_PAGINA
+from sicoin.tablas import (CELDA, CELDA_COMPACTA, CONTENEDOR, FILAS_ESTATUS, Columna,
+                           porcentaje, porcentaje_entero, tabla_html, tabla_trimestres, tabla_valores)
 
 #================================================== CONFIGURACIÓN INICIAL DE LA PÁGINA ======================================================================================
 st.set_page_config(page_title="Sistema Control Interno", layout="wide", page_icon="📊")
+inicio_rerun = time.perf_counter()                  # Duración total del rerun (se registra en las métricas al final del script)
 
 
 ###########################################################
@@ -19,57 +38,46 @@ st.set_page_config(page_title="Sistema Control Interno", layout="wide", page_ico
 
 
 #==================================== DESCARGA ARCHIVOS A PARTIR DE LOS LINKS DE GOOGLE DRIVE ================================================
-ARCHIVOS = {
-    "PTAR.xlsx": "1U2vlwj4cVRiMUc9v9WECXZQ1cYVby0mr",      # PTAR BASE
-    "ACTRI.xlsx": "1Ix69LpGafKmqfmePZaaWcQ9dsmURiRfT",     # ACTRI BASE
-    "PTCI.xlsx": "1FTsOOyJqIYZf-6n6Mz0yPbPW49IM5aup",      # PTCI BASE
-    "AMTRI.xlsx": "1fRoHNDgNYMyckXaKidVcRcpD9LAymX3-"      # AMTRI BASE
-}
-
-
-#============================================ CACHEADA PARA DESCARGA Y CARGA DE DATOS================================================
-@st.cache_resource(ttl="1h", show_spinner="Descargando datos actualizados...")  # <--- MAGIA AQUÍ
-def descargar_y_cargar_datos():
-    # Descarga archivos desde Google Drive
-    for nombre_archivo, id in ARCHIVOS.items():
-        gdown.download(f"https://drive.google.com/uc?id={id}", nombre_archivo, quiet=True)
-
-    # Carga los DataFrames
-    return {
-        "PTAR": pd.read_excel("PTAR.xlsx"),
-        "ACTRI": pd.read_excel("ACTRI.xlsx"),
-        "PTCI": pd.read_excel("PTCI.xlsx"),
-        "AMTRI": pd.read_excel("AMTRI.xlsx")
-    }
-
-
-#================================================== CACHEADA PARA LIMPIEZA DE DATOS ===========================================================================================
-@st.cache_data(show_spinner=False)  # <--- Optimización adicional
-def limpiar_datos(df):
-    df.columns = df.columns.str.strip()                                          # Normaliza nombres de las columnas
-    if 'Año' in df.columns:
-        df = df[df['Año'] != 'Año']                                              # Elimina filas duplicadas con encabezados
-        df['Año'] = pd.to_numeric(df['Año'], errors='coerce')                    # Normaliza Año y convierte a Número
-    if 'Institución' in df.columns:
-        df['Institución'] = df['Institución'].astype(str).str.strip()            # Normaliza Institución y convierte a Texto
-    if 'Sector' in df.columns:
-        df['Sector'] = df['Sector'].astype(str).str.strip()                      # Normaliza Institución y convierte a Texto
-    return df
+# Los IDs de Drive de PTAR, ACTRI, PTCI y AMTRI están en sicoin/descarga.py (ARCHIVOS) para usarlos también desde la línea de comandos
+
+
+#=================================== INGESTA PERSISTENTE (recuerda huellas, instantáneas y tablas ya preparadas) ====================================
+@st.cache_resource(show_spinner=False)
+def obtener_ingesta():
+    # SICOIN_PAQUETE: arranca desde el paquete precalculado (python -m sicoin.paquete construir) sin leer ningún Excel.
+    # Con varias réplicas en un equipo, `python -m sicoin.paquete publicar` lo mantiene al día y todas mapean el mismo archivo.
+    # SICOIN_FUENTE puede apuntar a una carpeta local o a un servidor HTTP; SICOIN_LECTOR elige la estrategia de lectura del Excel
+    return ingesta_desde_entorno()                  # La misma que usa la API JSON (sicoin/api.py)
+
+
+#============================================ ACTUALIZACIÓN EN SEGUNDO PLANO DE DESCARGA, CARGA Y LIMPIEZA DE DATOS ================================================
+@st.cache_resource(show_spinner="Descargando datos actualizados...")  # <--- MAGIA AQUÍ
+def obtener_actualizador():
+    # Solo la primera carga del proceso espera; después un hilo repite la ingesta cada SICOIN_REFRESCO_MIN minutos (60 por omisión)
+    # y publica la versión nueva ya validada, con su índice de facetas y su cubo, sin que ninguna sesión espere.
+    # Con SICOIN_PAQUETE solo se revisa el manifiesto, cada SICOIN_PAQUETE_REVISION_S segundos (10 por omisión).
+    # (las instantáneas se purgan con: python -m sicoin.snapshots purgar)
+    ingesta = obtener_ingesta()
+    if isinstance(ingesta, IngestaPaquete):
+        actualizador = Actualizador(ingesta, ingesta.intervalo_min, ingesta.construir)   # El paquete ya trae facetas y cubo
+    else:
+        actualizador = Actualizador(ingesta)
+    actualizador.iniciar()
+    return actualizador
 
 
 #================================================== CARGA PRINCIPAL DE LOS DATOS EN LA APP ======================================================================================
 try:
-    # Paso 1: Descarga y carga de datos (solo en primer uso)
-    datos_crudos = descargar_y_cargar_datos()  # <--- Aquí se descargan los archivos
-
-    # Paso 2: Limpieza de datos
-    datos_limpios = {nombre: limpiar_datos(df) for nombre, df in datos_crudos.items()}
+    # Paso 1: Versión publicada de los datos (se lee una sola vez por rerun para que todo el rerun use la misma versión)
+    publicacion = obtener_actualizador().actual  # <--- La descarga ocurre en el hilo del actualizador
+    datos = publicacion.datos
 
-    # Asignación a variables
-    df1 = datos_limpios["PTAR"]
-    df2 = datos_limpios["ACTRI"]
-    df3 = datos_limpios["PTCI"]
-    df4 = datos_limpios["AMTRI"]
+    # Asignación a variables (tablas inmutables compartidas por todas las sesiones)
+    df1 = datos["PTAR"]
+    df2 = datos["ACTRI"]
+    df3 = datos["PTCI"]
+    df4 = datos["AMTRI"]
+    version_datos = datos.version     # Las cachés posteriores usan este token como llave en lugar de hashear los DataFrames
 
 except Exception as e:
     st.error(f"Error crítico: {str(e)}")
@@ -102,29 +110,10 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-#====================================== LISTAS DE FILTROS PARTE 1 - PRE CÁLCULO PARA OPTIMIZAR RENDIMIENTO ==============================================
-@st.cache_data(show_spinner=False)
-def precompute_filter_lists(df):
-    # Lista de instituciones y sectores
-    inst_list = sorted(df['Institución'].dropna().unique().tolist())
-    sector_list = sorted(df['Sector'].dropna().unique().tolist())
-
-    # Precomputar años disponibles por institución
-    years_by_institucion = {}
-    for inst in inst_list:
-        years = sorted(df[df['Institución'] == inst]['Año'].dropna().unique().tolist())
-        years_by_institucion[inst] = years
-
-    # Precomputar años disponibles por sector
-    years_by_sector = {}
-    for sec in sector_list:
-        years = sorted(df[df['Sector'] == sec]['Año'].dropna().unique().tolist())
-        years_by_sector[sec] = years
-
-    return inst_list, sector_list, years_by_institucion, years_by_sector
-
-#===================================== LISTAS DE FILTROS PARTE 2 - OBTENCIÓN DE LISTA DE FILTROS PRECOMPUTADAS ==============================================
-inst_list, sector_list, years_by_inst, years_by_sector = precompute_filter_lists(df1)  # Obtener listas de filtros precomputadas (se calcula una única vez por sesión)
+#====================================== LISTAS DE FILTROS - ÍNDICE DE FACETAS PRECALCULADO PARA OPTIMIZAR RENDIMIENTO ==============================================
+# Institución <-> Sector <-> Año <-> Trimestre <-> Siglas para PTAR, ACTRI, PTCI y AMTRI; se arma junto con cada versión publicada
+facetas = publicacion.facetas
+inst_list, sector_list = facetas.instituciones, facetas.sectores
 
 # Callback para reiniciar sector a "Todas" al cambiar la institución
 def reset_sector():
@@ -137,10 +126,7 @@ with col2:
     sector = st.selectbox("Seleccione el Sector", ["Todas"] + sector_list, key="sector")
 with col3:
     # Se seleccionan los años basados en la opción de sector o institución
-    if sector != "Todas":
-        available_years = years_by_sector.get(sector, [])
-    else:
-        available_years = years_by_inst.get(institucion, [])
+    available_years = facetas.años(institucion, sector)
     year = st.selectbox("Seleccione el Año", available_years)
 
 
@@ -164,12 +150,31 @@ with col3:
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 
-#================================== SE OBTIENE UNA LISTA CON LOS NOMBRES DE LAS VARIABLES PARA EL REPORTE PTAR =====================================================
-risk_cols = ['Sustantivo','Administrativo','Financiero','Presupuestal','Servicios', 'Seguridad','Obra_Pública','Recursos_Humanos','Imagen','TICs','Salud', 'Otro','Corrupción','Legal']
-cuadrante_cols = ['I','II','III','IV']
-estrategia_cols = ['Evitar','Reducir','Asumir','Transferir','Compartir']
-estados = ['Sin_Avances', 'En_Proceso', 'Concluidas', 'Cumplimiento']
-trimestres = ['1', '2', '3', '4']
+#================================== LISTAS CON LOS NOMBRES DE LAS VARIABLES PARA EL REPORTE PTAR =====================================================
+# risk_cols, cuadrante_cols, estrategia_cols, estados y trimestres se declaran junto al esquema de datos (sicoin/esquema.py)
+
+
+#================================== CUBO DE AGREGADOS (sumas, promedios y primeros registros por Institución/Sector y Año) ==============================================
+cubo = publicacion.cubo                  # Se calcula una sola vez por versión de datos (en el actualizador) para PTAR, ACTRI, PTCI y AMTRI
+conciliacion = publicacion.conciliacion  # Discrepancias entre PTAR, ACTRI, PTCI y AMTRI de todos los alcances (también una vez por versión)
+busqueda = publicacion.busqueda          # Índice de texto de ACTRI y AMTRI (también una vez por versión)
+
+
+#================================== CACHÉ COMPARTIDA (LRU) DE LAS VISTAS YA CONSTRUIDAS ==============================================
+@st.cache_resource(show_spinner=False)
+def obtener_cache_vistas():              # Una sola caché para todas las sesiones; descarta sola las versiones de datos que ya no se usan
+    cache = CacheLRU()
+    METRICAS.fuente("cache_vistas", cache.estadisticas)                # Aciertos, fallos y tasa de aciertos en el panel y en metricas.prom
+    return cache
+
+cache_vistas = obtener_cache_vistas()
+if publicacion.cambios is not None:      # Si solo cambiaron algunos alcances, se conservan las vistas de los demás
+    cache_vistas.avanzar(version_datos, publicacion.cambios.version_anterior, publicacion.cambios.afectados)
+
+
+def alcance_filtro(institucion, year, sector):
+    # Alcance del que depende una vista filtrada por institución (sector = "Todas") o por sector
+    return [("Sector", sector, year)] if sector != "Todas" else [("Institución", institucion, year)]
 
 
 #================================== FUNCIÓN PARA OBTENER INSTITUCION, SECTOR Y SIGLAS FILTRADOS (Header) ==============================================
@@ -177,12 +182,14 @@ trimestres = ['1', '2', '3', '4']
 #========================= OBTIENE TAMBIEN LOS INDICADORES PRINCIPALES DE ACCIONES DE CONTROL Y RIESGOS (Stats) ==============================================
 #==================================== OBTIENE TAMBIEN LAS TABLAS: RIESGOS, CUADRANTE Y ESTRATEGIA ==============================================
 
+@memorizar(cache_vistas, lambda: version_datos, alcance_filtro)     # Resultado compartido entre sesiones por (institucion, year, sector, versión de datos)
+@METRICAS.medir()                                   # Solo mide los cálculos reales; los aciertos de la caché se cuentan en cache_vistas
 def generate_dashboard(institucion, year, sector):
-  #----- Parte 1 de la función: Calcula data para reportes -----#
+  #----- Parte 1 y 2 de la función: Obtiene data desde el cubo de agregados (ya limpio: NaN = 0 y conteos enteros) -----#
+    agregado, data = resumen_ptar(cubo, institucion, year, sector)     # Los mismos valores que escribe la exportación a Excel (sicoin/resumen.py)
     if sector != "Todas":                                       # -------------------- # Caso 1: Sector != "Todas"
-        filtered = df1[(df1['Sector'] == sector) & (df1['Año'] == year)]               # Filtra PTAR o df1 por Sector y Año y lo guarda en filtered
         instituciones_list = "<ul style='margin:0; padding-left:20px;'>" + "".join(
-          f"<li>{inst}</li>" for inst in filtered['Institución'].unique()) + "</ul>"   # Crea lista desordenada de HTML con las instituciones del sector seleccionado y los imprime
+          f"<li>{inst}</li>" for inst in agregado.instituciones) + "</ul>"             # Crea lista desordenada de HTML con las instituciones del sector seleccionado y los imprime
         header = f"""
         <div style='background-color:#f8f9fa; padding:15px; border-radius:10px; margin-bottom:20px; box-shadow:0 2px 4px rgba(0,0,0,0.1);'>
           <h3 style='color:#621132; margin:0; font-size:14px;'>
@@ -191,33 +198,16 @@ def generate_dashboard(institucion, year, sector):
           </h3>
         </div>
         """
-                                                                                # COMENTARIO: VARIABLE CUMPLIMIENTO - Se guarda en data, el cumplimeinto promedio por trimestre del sector seleccionado para posterior uso
-        data = filtered.sum(numeric_only=True).to_dict()                                # Obtiene los acumulados de filtered (dfi filtrada) y los guarda en data (acumulados por que es un sector) #serie a diccionario para posterior uso en reportes
-        for t in trimestres:                                                            # En el Caso 1, el Cumplimiento por Sector se obtendrá en promedio- aqui recorre la lista de trimestres
-            key = f"{t}Cumplimiento"                                                    # Se interpola la cadena del trimestre con % y se guarda en key
-            if key in filtered.columns:                                                 # Revisa si existe Key (nCumplimiento) como columna en filtered (que es df1 filtrado por Sector y Año)
-                avg_value = pd.to_numeric(filtered[key], errors='coerce').fillna(0).mean()  # Filtra key en filtered, convierte a número, cambia NaN por 0 y obtiene el promedio - finalmente guarda el dataframe
-                data[key] = round(avg_value, 2)                                             # Guarda los promedios de Cumplimiento en data, con dos decimales
-
     else:                                                     # ------------------------ # Caso 2: sector = "Todas"    (Filtro por Institucipon y Año)
-        filtered = df1[(df1['Institución'] == institucion) & (df1['Año'] == year)]       # En este caso se usa iloc[0] por que filtered nadamas tiene un registro (ya que se filtro por institución)
         header = f"""
         <div style='background-color:#f8f9fa; padding:15px; border-radius:10px; margin-bottom:20px; box-shadow:0 2px 4px rgba(0,0,0,0.1);'>
           <h3 style='color:#621132; margin:0; font-size:14px;'>
             Institución: {institucion}<br>
-            Sector: {filtered['Sector'].iloc[0]}<br>
-            Siglas: {filtered['Siglas'].iloc[0]}
+            Sector: {agregado.primeros['Sector']}<br>
+            Siglas: {agregado.primeros['Siglas']}
           </h3>
         </div>
         """
-        data = filtered.iloc[0].to_dict()     # Se obtiene un diccionario con los datos filtrados por Institucion y Año para los posteriores reportes
-
-  #---- Parte 2 de la función: Se limpia el data obtenido - se cambian NaN por 0 -----#
-    for key in data:
-        if pd.isna(data[key]):
-            data[key] = 0
-        elif isinstance(data[key], (int, float)) and not str(key).endswith("Cumplimiento"):
-            data[key] = int(round(data[key]))
 
   #---- Parte 3 de la función: Obtenido data, se obtienen los indicadores principales de la pestaña PTAR - Total de AC_Total y Riesgos ----#
     stats = f"""
@@ -232,50 +222,27 @@ def generate_dashboard(institucion, year, sector):
   #---- Parte 4 de la función: Obtención de tablas principales ----#
 
                              # ------------------------ Tabla de Clasificación de Riesgos ------------------------- #
-    risk_html = """
-    <div style='overflow-x:auto; margin-bottom:20px;'>
-      <table style='width:100%; border-collapse:collapse;'>
-        <tr style='background-color:#621132; color:white;'>
-    """
-    for col in risk_cols:
-        risk_html += f"<th style='padding:12px; text-align:center; border:1px solid #ddd;'>{col}</th>"    # Titulos de la tabla
-    risk_html += "</tr><tr>"
-    for col in risk_cols:                                                                                 # Valores de la tabla
-        risk_html += f"<td style='padding:12px; text-align:center; border:1px solid #ddd; font-weight:500;'>{data[col]}</td>"
-    risk_html += "</tr></table></div>"
+    risk_html = tabla_valores({col: data[col] for col in risk_cols})
 
                              # ------------------------------- Tabla de Cuadrante ---------------------------------- #
-    cuadrante_html = """
-    <div style='overflow-x:auto; margin-bottom:20px;'>
-      <table style='width:100%; border-collapse:collapse;'>
-        <tr style='background-color:#621132; color:white;'>
-    """
     colors = ['#dc3545', '#ffc107', '#28a745', '#007bff']                                                                              # Guarda los colores de cada riesgo
-    for col, color in zip(cuadrante_cols, colors):
-        cuadrante_html += f"<th style='background-color:{color}; padding:12px; text-align:center; border:1px solid #ddd;'>{col}</th>"
-    cuadrante_html += "</tr><tr>"
-    for col in cuadrante_cols:
-        cuadrante_html += f"<td style='padding:12px; text-align:center; border:1px solid #ddd; font-weight:500;'>{data[col]}</td>"
-    cuadrante_html += "</tr></table></div>"
+    cuadrante_html = tabla_valores({col: data[col] for col in cuadrante_cols},
+                                   estilos_titulo=[f"background-color:{color}; {CELDA}" for color in colors])
 
                              # ------------------------------- Tabla de Estrategia ---------------------------------- #
-    estrategia_html = """
-    <div style='overflow-x:auto; margin-bottom:20px;'>
-      <table style='width:100%; border-collapse:collapse;'>
-        <tr style='background-color:#621132; color:white;'>
-    """
-    for col in estrategia_cols:
-        estrategia_html += f"<th style='padding:12px; text-align:center; border:1px solid #ddd;'>{col}</th>"
-    estrategia_html += "</tr><tr>"
-    for col in estrategia_cols:
-        estrategia_html += f"<td style='padding:12px; text-align:center; border:1px solid #ddd; font-weight:500;'>{data[col]}</td>"
-    estrategia_html += "</tr></table></div>"
+    estrategia_html = tabla_valores({col: data[col] for col in estrategia_cols})
 
   #---- Parte 5 de la función (Final): Retorna resultados ----#
-    return header, stats, risk_html, cuadrante_html, estrategia_html, data
+    return header, stats, risk_html, cuadrante_html, estrategia_html, MappingProxyType(data)   # data de solo lectura (se comparte entre sesiones)
 #============================================================== FIN DE LA FUNCIÓN =======================================================================
 
 
+#=================================== GRÁFICA DE ESTATUS DE LAS AC POR TRIMESTRE (figura memorizada por alcance y versión de datos) ====================================
+@memorizar(cache_vistas, lambda: version_datos, alcance_filtro)
+def figura_ptar(institucion, year, sector):
+    return figura_trimestres(generate_dashboard(institucion, year, sector)[-1])
+
+
 
 #============================================== DESEMPAQUETADO DE VALORES QUE DEVUELVE LA FUNCIÓN ==============================================
 header, stats, risk_html, cuadrante_html, estrategia_html, data = generate_dashboard(institucion, year, sector)
@@ -285,8 +252,42 @@ header, stats, risk_html, cuadrante_html, estrategia_html, data = generate_dashb
 st.markdown(header, unsafe_allow_html=True)                                                     #Se muestran fuera de las pestañas pues son datos globales
 #--------------------------------------------------------------------------------------------------------------------------------------------------
 
-#================================================== CREACIÓN DE PESTAÑAS PTAR, PTCI Y REPORTES =========================================================
-tabs = st.tabs(["PTAR", "PTCI", "REPORTES"])
+#============================================ GRILLA PAGINADA PARA LAS SECCIONES DE DETALLE (ACTRI y AMTRI) ============================================
+# Solo se manda al navegador la página visible; el filtro por columna y el orden se resuelven aquí sobre el dataframe ya filtrado.
+# Es un fragmento: ordenar, filtrar o cambiar de página solo vuelve a ejecutar la grilla.
+@st.fragment
+def mostrar_grilla(df, columnas, formatos, clave):
+    titulos = {titulo: col for col, titulo in columnas.items()}
+    c1, c2, c3, c4, c5 = st.columns([2, 1, 2, 2, 1])
+    with c1:
+        orden = st.selectbox("Ordenar por", ["(Sin ordenar)"] + list(titulos), key=f"{clave}_orden")
+    with c2:
+        sentido = st.selectbox("Sentido", ["Ascendente", "Descendente"], key=f"{clave}_sentido")
+    with c3:
+        columna_filtro = st.selectbox("Filtrar columna", list(titulos), key=f"{clave}_columna")
+    with c4:
+        texto_filtro = st.text_input("Contiene", key=f"{clave}_texto")
+    with c5:
+        tamaño = st.selectbox("Filas por página", TAMAÑOS_PAGINA, key=f"{clave}_tamaño")
+
+    vista = grilla.filtrar(df, {titulos[columna_filtro]: texto_filtro})
+    vista = grilla.ordenar(vista, titulos.get(orden), sentido == "Ascendente")
+    paginas = grilla.total_paginas(len(vista), tamaño)
+    if st.session_state.get(f"{clave}_pagina", 1) > paginas:                # Si el filtro reduce las páginas se regresa a la última
+        st.session_state[f"{clave}_pagina"] = paginas
+
+    st.dataframe(grilla.pagina(vista, st.session_state.get(f"{clave}_pagina", 1), tamaño, columnas, formatos),
+                 hide_index=True, width="stretch")
+    c1, c2 = st.columns([1, 4])
+    with c1:
+        st.number_input("Página", min_value=1, max_value=paginas, step=1, key=f"{clave}_pagina")
+    with c2:
+        st.caption(f"{len(vista)} de {len(df)} registros · {paginas} página(s)")
+
+
+#================================================== CREACIÓN DE PESTAÑAS PTAR, PTCI, REPORTES Y BÚSQUEDA =========================================================
+# Con on_change="rerun" solo se ejecuta el contenido de la pestaña abierta (tabs[i].open); las demás no calculan nada
+tabs = st.tabs(["PTAR", "PTCI", "REPORTES", "BÚSQUEDA"], key="pestaña", on_change="rerun")
 
 
 #===================================================== MOSTRAR RESULTADOS EN LA PESTAÑA PTAR ==============================================
@@ -295,205 +296,102 @@ tabs = st.tabs(["PTAR", "PTCI", "REPORTES"])
 
 #---- Pestaña PTAR
 with tabs[0]:
+    if tabs[0].open:
 
-  #---- Parte 1 del with: Se muestran los Indicadores Principales (Stats) ----#
-    st.markdown(stats, unsafe_allow_html=True)
+      #---- Parte 1 del with: Se muestran los Indicadores Principales (Stats) ----#
+        st.markdown(stats, unsafe_allow_html=True)
 
 
 #============================================= SE ABRE LA SECCIÓN 1 - "Clasificación de Riesgos" ==============================================
 #--------------------------------------------------------------------------------------------------------------------------------------------------
-    st.markdown("""
-      <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-bottom:20px; text-align:center;'>
-        Clasificación de Riesgos
-      </div>
-    """, unsafe_allow_html=True)
-                                        # ------ Se muestra la Tabla de Clasificación de Riesgos ----#
-    st.markdown(risk_html, unsafe_allow_html=True)
-    col1, col2 = st.columns(2)
-
-                                #-------------- Se muestra la Tabla de Cuadrante (En columna 1) ------------#
-    with col1:
         st.markdown("""
           <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-bottom:20px; text-align:center;'>
-            Cuadrante
+            Clasificación de Riesgos
           </div>
         """, unsafe_allow_html=True)
-        st.markdown(cuadrante_html, unsafe_allow_html=True)
+                                            # ------ Se muestra la Tabla de Clasificación de Riesgos ----#
+        st.markdown(risk_html, unsafe_allow_html=True)
+        col1, col2 = st.columns(2)
 
-                                #-------------- Se muestra la Tabla de Estrategia (En columna 2) ------------#
-    with col2:
-        st.markdown("""
-          <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-bottom:20px; text-align:center;'>
-            Estrategia
-          </div>
-        """, unsafe_allow_html=True)
-        st.markdown(estrategia_html, unsafe_allow_html=True)
+                                    #-------------- Se muestra la Tabla de Cuadrante (En columna 1) ------------#
+        with col1:
+            st.markdown("""
+              <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-bottom:20px; text-align:center;'>
+                Cuadrante
+              </div>
+            """, unsafe_allow_html=True)
+            st.markdown(cuadrante_html, unsafe_allow_html=True)
+
+                                    #-------------- Se muestra la Tabla de Estrategia (En columna 2) ------------#
+        with col2:
+            st.markdown("""
+              <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-bottom:20px; text-align:center;'>
+                Estrategia
+              </div>
+            """, unsafe_allow_html=True)
+            st.markdown(estrategia_html, unsafe_allow_html=True)
 
 
 
 #====================================== SE ABRE LA SECCIÓN 2 - "Seguimiento de las Acciones de Control" ==============================================
 #--------------------------------------------------------------------------------------------------------------------------------------------------
-    st.markdown("""
-      <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-bottom:20px; text-align:center;'>
-        Seguimiento de las Acciones de Control
-      </div>
-    """, unsafe_allow_html=True)
+        st.markdown("""
+          <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-bottom:20px; text-align:center;'>
+            Seguimiento de las Acciones de Control
+          </div>
+        """, unsafe_allow_html=True)
 
-                       #-------------- Parte 1: Se crea y muestra la Tabla para el estado de las Acciones de Control ------------#
-    # (Se agregan "%" en Cumplimiento)
-    st.markdown("""
-      <div style='overflow-x:auto; margin-top:20px; margin-bottom:20px;'>
-        <table style='width:100%; border-collapse:collapse;'>
-          <tr style='background-color:#621132; color:white; text-align:center;'>
-            <th>Estatdo de las Acciones de Control</th>
-            <th>Primero</th>
-            <th>Segundo</th>
-            <th>Tercero</th>
-            <th>Cuarto</th>
-          </tr>
-          <tr>
-            <th style='background-color:#621132; color:white;'>Sin Avances</th>
-            <td style='text-align:center; border:1px solid #ddd;'>{0}</td>
-            <td style='text-align:center; border:1px solid #ddd;'>{1}</td>
-            <td style='text-align:center; border:1px solid #ddd;'>{2}</td>
-            <td style='text-align:center; border:1px solid #ddd;'>{3}</td>
-          </tr>
-          <tr>
-            <th style='background-color:#621132; color:white;'>En Proceso</th>
-            <td style='text-align:center; border:1px solid #ddd;'>{4}</td>
-            <td style='text-align:center; border:1px solid #ddd;'>{5}</td>
-            <td style='text-align:center; border:1px solid #ddd;'>{6}</td>
-            <td style='text-align:center; border:1px solid #ddd;'>{7}</td>
-          </tr>
-          <tr>
-            <th style='background-color:#621132; color:white;'>Concluidas</th>
-            <td style='text-align:center; border:1px solid #ddd;'>{8}</td>
-            <td style='text-align:center; border:1px solid #ddd;'>{9}</td>
-            <td style='text-align:center; border:1px solid #ddd;'>{10}</td>
-            <td style='text-align:center; border:1px solid #ddd;'>{11}</td>
-          </tr>
-          <tr>
-            <th style='background-color:#621132; color:white;'>% de Cumplimiento</th>
-            <td style='text-align:center; border:1px solid #ddd;'>{12}%</td>
-            <td style='text-align:center; border:1px solid #ddd;'>{13}%</td>
-            <td style='text-align:center; border:1px solid #ddd;'>{14}%</td>
-            <td style='text-align:center; border:1px solid #ddd;'>{15}%</td>
-          </tr>
-        </table>
-      </div>
-    """.format(
-      data.get("1Sin_Avances",0), data.get("2Sin_Avances",0), data.get("3Sin_Avances",0), data.get("4Sin_Avances",0),
-      data.get("1En_Proceso",0), data.get("2En_Proceso",0), data.get("3En_Proceso",0), data.get("4En_Proceso",0),
-      data.get("1Concluidas",0), data.get("2Concluidas",0), data.get("3Concluidas",0), data.get("4Concluidas",0),
-      data.get("1Cumplimiento",0), data.get("2Cumplimiento",0), data.get("3Cumplimiento",0), data.get("4Cumplimiento",0)
-    ), unsafe_allow_html=True)
-
-                           #-------------- Parte 2: Se crea el gráfico de barras para el estado de las AC ------------#
-           #----------------- Para ello primero crea lista de diccionarios que contenga los datos para el gráfico -----------------#
-
-    plot_data = []
-    for t in trimestres:
-        for estado in estados:
-            plot_data.append({'Trimestre': f' {t}', 'Estado': estado, 'Cantidad': data.get(f"{t}{estado}", 0)})
-
-                #-------------- Convierte a dataframe la información obtenida y crea la gráfica (fig)  ------------------------#
-    fig = px.bar(pd.DataFrame(plot_data), x='Trimestre', y='Cantidad', color='Estado',
-                 barmode='group', height=400,
-                 color_discrete_map={'Sin_Avances': '#dc3545', 'En_Proceso': '#ffc107',
-                                     'Concluidas': '#28a745', 'Cumplimiento': '#6610f2'})
-
-                                       #--------------  Da el formato a a la gráfica  ------------------#
-    fig.update_layout(
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        font=dict(color='#333'),
-        xaxis=dict(title=None, gridcolor='#f0f0f0'),
-        yaxis=dict(title=None, gridcolor='#f0f0f0'),
-        legend=dict(title=None),
-        margin=dict(l=20, r=20, t=50, b=20)
-    )
-     #--------------  Agrega la etiqueta de porcentaje en las barras de Cumplimiento (ya que este valor es porcentaje) -----------------#
-    for trace in fig.data:
-        if trace.name == "Cumplimiento":
-            trace.text = [f"{y}%" for y in trace.y]
-            trace.textposition = 'outside'
-
-                                #-------------- Muestra el gráfico de barras para el estado de las AC ------------#
-    st.plotly_chart(fig, use_container_width=True)
+                           #-------------- Parte 1: Se crea y muestra la Tabla para el estado de las Acciones de Control ------------#
+        # (Se agregan "%" en Cumplimiento)
+        st.markdown(tabla_trimestres("Estatdo de las Acciones de Control", FILAS_ESTATUS, data, trimestres, porcentajes=["Cumplimiento"]),
+                    unsafe_allow_html=True)
+
+                               #-------------- Parte 2: Gráfico de barras para el estado de las AC ------------#
+               #----------------- La figura se arma una vez por alcance y versión de datos y se reutiliza entre sesiones -----------------#
+        figura = figura_ptar(institucion, year, sector)
+        with METRICAS.tramo("plotly_chart"):
+            st.plotly_chart(figura, width="stretch")
 
 
 
 #================================= SE ABRE LA SECCIÓN 3 - "Descripción de los Riesgos y las Acciones de Control" ==============================================
 #--------------------------------------------------------------------------------------------------------------------------------------------------
-    st.markdown("""
-          <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-top:30px; margin-bottom:30px; text-align:center;'>
-        Descripción de los Riesgos y las Acciones de Control
-      </div>
-    """, unsafe_allow_html=True)
+        st.markdown("""
+              <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-top:30px; margin-bottom:30px; text-align:center;'>
+            Descripción de los Riesgos y las Acciones de Control
+          </div>
+        """, unsafe_allow_html=True)
 
-                        #------------------ Para el contenido de esta sección se utilizará df2 (ACTRI) --------------#
+                            #------------------ Para el contenido de esta sección se utilizará df2 (ACTRI) --------------#
 
-                    #--------------Primero:  Se crea un dataframe (filtered_df2) según el filtro seleccionado ------------#
-                    #---------------Esto se hace por que estamos usando otra base, pero con los mismos filtros ------------#
+                        #--------------Primero:  Se crea un dataframe (filtered_df2) según el filtro seleccionado ------------#
+                        #---------------Esto se hace por que estamos usando otra base, pero con los mismos filtros ------------#
 
-    if sector != "Todas":
-        filtered_df2 = df2[(df2['Sector'] == sector) & (df2['Año'] == year)]
-    else:
-        filtered_df2 = df2[(df2['Institución'] == institucion) & (df2['Año'] == year)]
+        if sector != "Todas":
+            filtered_df2 = cubo.seleccionar("ACTRI", "Sector", sector, year)               # Filas de ACTRI del Sector y Año (sin recorrer df2)
+        else:
+            filtered_df2 = cubo.seleccionar("ACTRI", "Institución", institucion, year)     # Filas de ACTRI de la Institución y Año
 
 
-            #-------------- Segundo: Se verifica si (data['AC_Total']) coincide con el número de filas en filtered_df2 ------------#
-    if int(data['AC_Total']) != len(filtered_df2):
-        st.markdown("""
-          <p style='color:red; font-weight:bold; text-align:center;'>
-            Las acciones de control registradas en el PTAR no coinciden con las Acciones de Control Registradas
-          </p>
-        """, unsafe_allow_html=True)
-
-                  #------------------ Tercero: Se crean los encabezados para la tabla principal de esta sección --------------#
-    table_html = """
-      <div style='overflow-x:auto;'>
-        <table style='width:100%; border-collapse:collapse; margin-bottom:20px;'>
-          <tr style='background-color:#621132; color:white;'>
-            <th style='padding:12px; text-align:center; border:1px solid #ddd;'>Año</th>
-            <th style='padding:12px; text-align:center; border:1px solid #ddd;'>Siglas</th>
-            <th style='padding:12px; text-align:center; border:1px solid #ddd;'>Riesgo</th>
-            <th style='padding:12px; text-align:center; border:1px solid #ddd;'>Descripción del Riesgo</th>
-            <th style='padding:12px; text-align:center; border:1px solid #ddd;'>No. de AC</th>
-            <th style='padding:12px; text-align:center; border:1px solid #ddd;'>Descripción</th>
-            <th style='padding:12px; text-align:center; border:1px solid #ddd;'>Avance Institución</th>
-            <th style='padding:12px; text-align:center; border:1px solid #ddd;'>Avance OIC</th>
-          </tr>
-    """
+                #-------------- Segundo: Se verifica si (data['AC_Total']) coincide con el número de filas en filtered_df2 ------------#
+                #-------------- (consulta al índice de la conciliación, que revisa todos los alcances una vez por versión) ------------#
+        if not conciliacion.cuadra(*(("Sector", sector) if sector != "Todas" else ("Institución", institucion)), year, "AC_PTAR_ACTRI"):
+            st.markdown("""
+              <p style='color:red; font-weight:bold; text-align:center;'>
+                Las acciones de control registradas en el PTAR no coinciden con las Acciones de Control Registradas
+              </p>
+            """, unsafe_allow_html=True)
 
-                               #------------------ Cuarto: Se llenan los datos de la tabla principal --------------#
-        # Primero muestra los valores de Avance como porcentaje
-    for _, row in filtered_df2.iterrows():
-        avance_inst = f"{round(row['Avance_Institución'], 2)}%" if pd.notna(row['Avance_Institución']) else ""
-        avance_oic = f"{round(row['Avance_OIC'], 2)}%" if pd.notna(row['Avance_OIC']) else ""
-        # Crea la tabla de html con los datos correspondientes
-        table_html += "<tr>"
-        table_html += f"<td style='padding:12px; text-align:center; border:1px solid #ddd;'>{row.get('Año','')}</td>"
-        table_html += f"<td style='padding:12px; text-align:center; border:1px solid #ddd;'>{row.get('Siglas','')}</td>"
-        table_html += f"<td style='padding:12px; text-align:center; border:1px solid #ddd;'>{row.get('Riesgo','')}</td>"
-        table_html += f"<td style='padding:12px; text-align:center; border:1px solid #ddd;'>{row.get('Descripción_del_Riesgo','')}</td>"
-        table_html += f"<td style='padding:12px; text-align:center; border:1px solid #ddd;'>{row.get('AC','')}</td>"
-        table_html += f"<td style='padding:12px; text-align:justify; border:1px solid #ddd;'>{row.get('Descripcion','')}</td>"
-        table_html += f"<td style='padding:12px; text-align:center; border:1px solid #ddd;'>{avance_inst}</td>"
-        table_html += f"<td style='padding:12px; text-align:center; border:1px solid #ddd;'>{avance_oic}</td>"
-        table_html += "</tr>"
-    table_html += "</table></div>" #cierra la tabla fuera del for
-
-                              #------------------ Quinto: Se muestra la tabla principal de la sección--------------#
-    st.markdown(table_html, unsafe_allow_html=True)
+                      #------------------ Tercero: Se muestra la grilla paginada de la sección (Avance como porcentaje) --------------#
+        mostrar_grilla(filtered_df2, columnas_actri, {"Avance_Institución": porcentaje, "Avance_OIC": porcentaje}, "grilla_actri")
 
 
 #============================================= PIE DE PÁGINA DE LA SECCION PTAR - FUENTE SICOIN ==============================================
-    st.markdown("""
-      <div style='text-align:right; font-size:12px; color:#666; margin-top:20px;'>
-        Fuente: Sistema de Control Interno (SICOIN)
-      </div>
-    """, unsafe_allow_html=True)
+        st.markdown("""
+          <div style='text-align:right; font-size:12px; color:#666; margin-top:20px;'>
+            Fuente: Sistema de Control Interno (SICOIN)
+          </div>
+        """, unsafe_allow_html=True)
 
 #================================= FIN DE LA SECCIÓN 3 - "Descripción de los Riesgos y las Acciones de Control" ==============================================
 #--------------------------------------------------------------------------------------------------------------------------------------------------
@@ -515,41 +413,143 @@ with tabs[0]:
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 
-                        #------------------ Para el contenido de esta sección se utilizará df2, df3 y df4 --------------#
+                        #------------------ Para el contenido de esta sección se utilizará df3 y df4 --------------#
+
+               #--------------Los cálculos se agrupan en funciones memorizadas entre sesiones (por filtros y versión de datos) ------------#
+                    #---------------Se usan otras bases, pero con los mismos filtros de la cabecera ------------#
+
 
-               #--------------Primero:  Se crean los dataframes (filtro_ptci y filtro_ptci_df4) según el filtro seleccionado ------------#
-                    #---------------Esto se hace por que estamos usando otras bases, pero con los mismos filtros ------------#
+#================================== FUNCIÓN PARA OBTENER EL INDICADOR PRINCIPAL Y LAS TABLAS RESUMEN DEL PTCI ==============================================
+#============================ (Cumplimiento General de las NGCI, Programa de Trabajo, Detalle y Seguimiento de las Acciones de Mejora) ============================
+
+@memorizar(cache_vistas, lambda: version_datos, alcance_filtro)
+@METRICAS.medir()
+def generate_ptci(institucion, year, sector):
+    # Valores del PTCI y AMTRI con los mismos filtros (sicoin/resumen.py); si no hay registros de PTCI no hay nada que mostrar
+    resumen = resumen_ptci(cubo, institucion, year, sector)
+    if resumen is None:
+        return None
+    cum_ngci, valores_ptci, detalle, data_ptci_dict = resumen
+    cum_ngci_str = f"{cum_ngci}%"
+
+      #-------------- Parte 1: Los indicadores principales del PTCI (dependen de la condición sobre el sector) se muestran como tabla ------------#
+                #-----------------  Mapearemos nombres amigables pare entender mejor las variables en la appp-----------------#
+    friendly_names = {
+        "Acciones_de_Mejora_Programa_Original": "Programa Original de Acciones de Mejora",
+        "Se_Actualizó_el_Programa": "Se Actualizó el Programa",
+        "No_Se_Actualizó_el_Programa": "No Se Actualizó el Programa",
+        "TotalAcciones_de_Mejora_Programa_Actualizado": "Programa Actualizado de Acciones de Mejora"
+    }
+    ptci_table = tabla_valores(valores_ptci, titulos=[friendly_names.get(col, col) for col in valores_ptci])
+
+      #-------------- Parte 2:  Esta tabla será para el detalle de las Acciones de Mejora (AMTRI)------------#
+    detalle_table = tabla_valores(detalle)
+
+      #-------------- Parte 3:  Los datos del seguimiento de las acciones de mejora (estatus por trimestre) ya vienen en data_ptci_dict ------------#
+    return cum_ngci_str, ptci_table, detalle_table, MappingProxyType(data_ptci_dict)
+#============================================================== FIN DE LA FUNCIÓN =======================================================================
+
+
+#================================== GRÁFICA DEL SEGUIMIENTO DE LAS ACCIONES DE MEJORA (figura memorizada por alcance y versión de datos) ==============================================
+@memorizar(cache_vistas, lambda: version_datos, alcance_filtro)
+def figura_ptci(institucion, year, sector):
+    return figura_trimestres(generate_ptci(institucion, year, sector)[3])
+
+
+#================================== FUNCIÓN PARA OBTENER EL DESGLOSE DEL PTCI DE UNA INSTITUCIÓN DEL SECTOR ==============================================
+@memorizar(cache_vistas, lambda: version_datos, lambda sector, year, institucion: [("Institución", institucion, year)])
+def generate_desglose_ptci(sector, year, selected_institucion):
+    #----------------- Desglose de las variables a mostrar -----------------#
+    # Filas de PTCI de la institución seleccionada (dentro del sector) obtenidas directamente del cubo
+    desglose = cubo.seleccionar("PTCI", "Institución", selected_institucion, year)
+    desglose = desglose[desglose["Sector"] == sector]
+    desglose = desglose[["Año", "Institución", "Cumplimiento_General_de_las_NGCI", "Informe_Anual_Finalizado", "SUBIO_ARCHIVO",
+                         "Se_Actualizó_el_Programa", "No_Se_Actualizó_el_Programa",
+                         "Acciones_de_Mejora_Programa_Original", "TotalAcciones_de_Mejora_Programa_Actualizado"]]
+
+    #------------- Diccionario de etiquetas amigables --------------
+    friendly_labels = {
+        "Año": "Año",
+        "Institución": "Institución",
+        "Cumplimiento_General_de_las_NGCI": "Cumplimiento General NGCI",
+        "Informe_Anual_Finalizado": "Informe Anual Finalizado",
+        "SUBIO_ARCHIVO": "Subió Archivo",
+        "Se_Actualizó_el_Programa": "Programa Actualizado",
+        "No_Se_Actualizó_el_Programa": "Programa No Actualizado",
+        "Acciones_de_Mejora_Programa_Original": "Acciones Mejora (Original)",
+        "TotalAcciones_de_Mejora_Programa_Actualizado": "Acciones Mejora (Actualizado)"
+    }
+
+    #----------------- Tabla HTML del desglose por columnas (cabeceras con etiquetas amigables) -----------------#
+    desglose_html = tabla_html(
+        [Columna(friendly_labels.get(col, col),
+                 porcentaje_entero(desglose[col]) if col == "Cumplimiento_General_de_las_NGCI" else desglose[col],
+                 CELDA_COMPACTA, CELDA_COMPACTA)
+         for col in desglose.columns],
+        contenedor="overflow-x:auto; margin-bottom:20px; font-size:12px; padding:5px;")
+
+    return desglose_html
+#============================================================== FIN DE LA FUNCIÓN =======================================================================
+
+
+#================================== FUNCIÓN PARA OBTENER LA DESCRIPCIÓN DE LOS PROCESOS Y ACCIONES DE MEJORA (AMTRI) ==============================================
+def generate_desc_ptci(institucion, year, sector, selected_trimester, selected_siglas):
+    alcance, valor_alcance = ("Sector", sector) if sector != "Todas" else ("Institución", institucion)
+
+    # Filtrar el DataFrame según los filtros seleccionados (la grilla solo mostrará la página visible)
+    df_ptci_df4 = cubo.seleccionar("AMTRI", alcance, valor_alcance, year)
+    return df_ptci_df4[
+        (df_ptci_df4["Trimestre"] == selected_trimester) &
+        (df_ptci_df4["Siglas"] == selected_siglas)
+    ]
+#============================================================== FIN DE LA FUNCIÓN =======================================================================
+
+
+#================================== SECCIONES DEL PTCI CON FILTROS PROPIOS (se vuelven a ejecutar solas, sin recalcular toda la página) ==============================================
+@st.fragment
+def seccion_desglose_ptci(sector, year):
+    #------------- Filtro por Institución --------------
+    selected_institucion = st.selectbox("Filtrar por Institución", options=facetas.opciones("PTCI", "Institución", "Sector", sector, year))
+
+    #----------------- Desglose de la institución seleccionada (memorizado entre sesiones) -----------------#
+    desglose_html = generate_desglose_ptci(sector, year, selected_institucion)
+
+    #-------------- Mostramos la tabla del programa de trabajo desglosado por institución --------------#
+    st.markdown(desglose_html, unsafe_allow_html=True)
+
+
+@st.fragment
+def seccion_desc_ptci(institucion, year, sector):
+    alcance, valor_alcance = ("Sector", sector) if sector != "Todas" else ("Institución", institucion)
+
+    #------------- Filtros --------------
+    col1, col2 = st.columns(2)
+    with col1:
+        selected_trimester = st.selectbox("Filtrar por Trimestre", options=facetas.opciones("AMTRI", "Trimestre", alcance, valor_alcance, year))
+    with col2:
+        selected_siglas = st.selectbox("Filtrar por Siglas", options=facetas.opciones("AMTRI", "Siglas", alcance, valor_alcance, year))
+
+    #-------------- Parte 1: Registros de AMTRI con la descripción de los Procesos y Acciones de Mejora ------------#
+    desc_ptci = generate_desc_ptci(institucion, year, sector, selected_trimester, selected_siglas)
+
+    #-------------- Parte 2: Mostramos la grilla paginada (Avance como porcentaje entero) ------------#
+    mostrar_grilla(desc_ptci, columnas_amtri, {"Avance_Institución": porcentaje_entero, "Avance_OIC": porcentaje_entero}, "grilla_amtri")
 
 
 #---- Pestaña PTCI
 with tabs[1]:
-    # Filtrar df3 y df4 con los mismos filtros
-    if sector != "Todas":
-        filtro_ptci = (df3['Sector'] == sector) & (df3['Año'] == year)
-        filtro_ptci_df4 = (df4['Sector'] == sector) & (df4['Año'] == year)
-    else:
-        filtro_ptci = (df3['Institución'] == institucion) & (df3['Año'] == year)
-        filtro_ptci_df4 = (df4['Institución'] == institucion) & (df4['Año'] == year)
-    df_ptci = df3[filtro_ptci]
-    df_ptci_df4 = df4[filtro_ptci_df4]
+    if tabs[1].open:
+        # Indicador y tablas resumen del PTCI (memorizados entre sesiones por alcance, año y versión de datos)
+        resumen_ptci = generate_ptci(institucion, year, sector)
 
-                           #--------------- Segundo: Revisa si el DataFrame filtrado df_ptci está vacío ------------#
-      #---------------Esto se hace por que vamos a tomar un indicador similar a header pero lo imprimiremos directamente ------------#
+                               #--------------- Revisa si hay datos de PTCI para el filtro seleccionado ------------#
+          #---------------Esto se hace por que vamos a tomar un indicador similar a header pero lo imprimiremos directamente ------------#
 
-    if df_ptci.empty:
-        st.markdown("No hay datos para PTCI con los filtros seleccionados.")
-    else:
-
-      #---------------------- Obtiene el Cumplimiento en % según el sector (Este es el indicador que necesitamos) -------------------#
-        if sector != "Todas":
-            # Nuestro indicador será el promedio para sector (ya que son varias instituciones)
-            cum_ngci = df_ptci['Cumplimiento_General_de_las_NGCI'].mean().round(2)
-            cum_ngci_str = f"{cum_ngci}%"
+        if resumen_ptci is None:
+            st.markdown("No hay datos para PTCI con los filtros seleccionados.")
         else:
-            #  Nuestro indicador será el valor directo para institución (ya que solo es una)
-            cum_ngci = df_ptci['Cumplimiento_General_de_las_NGCI'].iloc[0]
-            cum_ngci_str = f"{round(cum_ngci, 2)}%"
-      #---------------------- Una vez preparados nuestros datos, estamos listos para mostrarlos en la pestaña PTCI -------------------#
+            cum_ngci_str, ptci_table, detalle_table, data_ptci_dict = resumen_ptci
+          #---------------------- Una vez preparados nuestros datos, estamos listos para mostrarlos en la pestaña PTCI -------------------#
 #-------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 
@@ -563,160 +563,55 @@ with tabs[1]:
 
 
 #================================== MOSTRAR INDICADOR PRINCIPAL DE LA PESTAÑA PTCI (Cumplimiento General de las NGCI) ==============================================
-        st.markdown(f"""
-          <div style='background-color:#f8f9fa; padding:20px; border-radius:10px; margin-bottom:20px; box-shadow:0 2px 4px rgba(0,0,0,0.1); text-align:center;'>
-            <h2 style='color:#2e86c1; margin:0;'>
-              Cumplimiento General de las NGCI: <span style='color:#621132;'>{cum_ngci_str}</span>
-            </h2>
-          </div>
-        """, unsafe_allow_html=True)
+            st.markdown(f"""
+              <div style='background-color:#f8f9fa; padding:20px; border-radius:10px; margin-bottom:20px; box-shadow:0 2px 4px rgba(0,0,0,0.1); text-align:center;'>
+                <h2 style='color:#2e86c1; margin:0;'>
+                  Cumplimiento General de las NGCI: <span style='color:#621132;'>{cum_ngci_str}</span>
+                </h2>
+              </div>
+            """, unsafe_allow_html=True)
 
 #============================================= SE ABRE LA SECCIÓN 1 - "Programa de Trabajo de Control Interno" ==============================================
 #------------------------------------------------------------------------------------------------------------------------------------------------------------
-        st.markdown("""
-            <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-bottom:20px; text-align:center;'>
-                Programa de Trabajo de Control Interno
-            </div>
-        """, unsafe_allow_html=True)
+            st.markdown("""
+                <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-bottom:20px; text-align:center;'>
+                    Programa de Trabajo de Control Interno
+                </div>
+            """, unsafe_allow_html=True)
 
-          #-------------- Parte 1: En esta primera parte se utilizará un condicional, ya que los indicadores principales (headers de PTCI) ------------#
-                        #-----------------que se van a mostrar, dependerán de la condición sobre el sector -----------------#
-                    #-----------------  Estos se mostraran como una tabla (Ya que tenemos mas de dos indicadores)-----------------#
-                    #-----------------  Mapearemos nombres amigables pare entender mejor las variables en la appp-----------------#
-
-        # Mapeo de nombres amigables
-        friendly_names = {
-            "Acciones_de_Mejora_Programa_Original": "Programa Original de Acciones de Mejora",
-            "Se_Actualizó_el_Programa": "Se Actualizó el Programa",
-            "No_Se_Actualizó_el_Programa": "No Se Actualizó el Programa",
-            "TotalAcciones_de_Mejora_Programa_Actualizado": "Programa Actualizado de Acciones de Mejora"
-        }
-
-                #----------------- Guardaremos las columnas de nuestros indicadores a mostrar según la condición sobre el sector-----------------#
-        if sector == "Todas":
-            ptci_cols = [
-                "Acciones_de_Mejora_Programa_Original",
-                "Se_Actualizó_el_Programa",
-                "No_Se_Actualizó_el_Programa",
-                "TotalAcciones_de_Mejora_Programa_Actualizado"
-            ]
-        else:
-            ptci_cols = [
-                "Acciones_de_Mejora_Programa_Original",
-                "TotalAcciones_de_Mejora_Programa_Actualizado"
-            ]
-
-                #-----------------Creamos el inicio de la tabla HTML que vamos a mostrar en PTCI-----------------#
-        ptci_table = "<div style='overflow-x:auto; margin-bottom:20px;'><table style='width:100%; border-collapse:collapse;'>"
-        ptci_table += "<tr style='background-color:#621132; color:white;'>"
-
-                  #----------------- Creamos los headers con nombres amigables para la tabla -----------------#
-        for col in ptci_cols:
-            header_name = friendly_names.get(col, col)
-            ptci_table += f"<th style='padding:12px; text-align:center; border:1px solid #ddd;'>{header_name}</th>"
-        ptci_table += "</tr><tr>"
-
-                #-------------- Parte 2: Llenamos los valores de nuestra tabla según la condición sobre el sector ------------#
-        for col in ptci_cols:
-            if sector == "Todas" and col in ["Se_Actualizó_el_Programa", "No_Se_Actualizó_el_Programa"]:
-                cell_value = df_ptci[col].iloc[0] if not df_ptci.empty and col in df_ptci.columns else "N/A"
-            else:
-                numeric_value = pd.to_numeric(df_ptci[col], errors='coerce').fillna(0).sum() if col in df_ptci.columns else 0
-                cell_value = int(round(numeric_value))
-            ptci_table += f"<td style='padding:12px; text-align:center; border:1px solid #ddd; font-weight:500;'>{cell_value}</td>"
-        ptci_table += "</tr></table></div>"
-
-                #-------------- Parte 3: Finalmente mostramos la tabla con nuestros indicadores para el PTCI ------------#
-        st.markdown(ptci_table, unsafe_allow_html=True)
+                    #-------------- Parte 3: Finalmente mostramos la tabla con nuestros indicadores para el PTCI ------------#
+            st.markdown(ptci_table, unsafe_allow_html=True)
 
 
 #============================================= SE ABRE LA SECCIÓN 2 - "Programa de Trabajo de Control Interno - Desglose por Institución" =============================================
 #------------------------------------------------------------------------------------------------------------------------------------------------------------#---------------------------------------------------------------------------------------
 
-        # Condición para mostrar la Sección 2
-        if sector != "Todas":
-            st.markdown("""
-              <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-bottom:10px; text-align:center;'>
-                Desglose por Institución
-              </div>
-            """, unsafe_allow_html=True)
+            # Condición para mostrar la Sección 2
+            if sector != "Todas":
+                st.markdown("""
+                  <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-bottom:10px; text-align:center;'>
+                    Desglose por Institución
+                  </div>
+                """, unsafe_allow_html=True)
 
-            #------------- Filtro por Institución --------------
-            selected_institucion = st.selectbox("Filtrar por Institución", options=sorted(df_ptci["Institución"].unique()))
-
-            #----------------- Desglose de las variables a mostrar -----------------#
-            desglose = df_ptci[["Año", "Institución", "Cumplimiento_General_de_las_NGCI", "Informe_Anual_Finalizado", "SUBIO_ARCHIVO",
-                                "Se_Actualizó_el_Programa", "No_Se_Actualizó_el_Programa",
-                                "Acciones_de_Mejora_Programa_Original", "TotalAcciones_de_Mejora_Programa_Actualizado"]]
-
-            # Filtrar el DataFrame según la institución seleccionada
-            desglose = desglose[desglose["Institución"] == selected_institucion]
-
-            #------------- Diccionario de etiquetas amigables --------------
-            friendly_labels = {
-                "Año": "Año",
-                "Institución": "Institución",
-                "Cumplimiento_General_de_las_NGCI": "Cumplimiento General NGCI",
-                "Informe_Anual_Finalizado": "Informe Anual Finalizado",
-                "SUBIO_ARCHIVO": "Subió Archivo",
-                "Se_Actualizó_el_Programa": "Programa Actualizado",
-                "No_Se_Actualizó_el_Programa": "Programa No Actualizado",
-                "Acciones_de_Mejora_Programa_Original": "Acciones Mejora (Original)",
-                "TotalAcciones_de_Mejora_Programa_Actualizado": "Acciones Mejora (Actualizado)"
-            }
-
-            #----------------- Creando las columnas de la Tabla HTML para el desglose -----------------#
-            desglose_html = "<div style='overflow-x:auto; margin-bottom:20px; font-size:12px; padding:5px;'><table style='width:100%; border-collapse:collapse;'>"
-            desglose_html += "<tr style='background-color:#621132; color:white;'>"
-
-            #----------------- Llenado de tabla (cabeceras con etiquetas amigables) -----------------#
-            for col in desglose.columns:
-                friendly_name = friendly_labels.get(col, col)
-                desglose_html += f"<th style='padding:5px; text-align:center; border:1px solid #ddd;'>{friendly_name}</th>"
-            desglose_html += "</tr>"
-
-            for _, row in desglose.iterrows():
-                desglose_html += "<tr>"
-                for col in desglose.columns:
-                    value = row.get(col, '')
-                    if col == "Cumplimiento_General_de_las_NGCI":
-                        value = f"{int(value)}%" if pd.notna(value) else ""
-                    desglose_html += f"<td style='padding:5px; text-align:center; border:1px solid #ddd;'>{value}</td>"
-                desglose_html += "</tr>"
-            desglose_html += "</table></div>"
-
-            #-------------- Parte 2: Mostramos la tabla del programa de trabajo desglosado por institución --------------#
-            st.markdown(desglose_html, unsafe_allow_html=True)
+                #------------- Filtro por Institución y tabla del desglose (fragmento: el filtro solo vuelve a ejecutar esta sección) --------------
+                seccion_desglose_ptci(sector, year)
 
 
 
 #============================================= SE ABRE LA SECCIÓN 3 - "Detalle de las Acciones de Mejora"================================= ==============================================
 #------------------------------------------------------------------------------------------------------------------------------------------------------------
-        st.markdown("""
-          <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-bottom:20px; text-align:center;'>
-            Detalle de las Acciones de Mejora
-          </div>
-        """, unsafe_allow_html=True)
-
-
-          #-------------- Parte 1:  Esta tabla será para el detalle de las Acciones de Mejora------------#
-                        #----------------- Creamos columnas con las variables a mostrar  -----------------#
+            st.markdown("""
+              <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-bottom:20px; text-align:center;'>
+                Detalle de las Acciones de Mejora
+              </div>
+            """, unsafe_allow_html=True)
 
-        detalle_cols = ["Registradas", "Localizadas", "No_localizadas", "Suficientes", "Parcielmente_Suficientes", "Insuficientes"]
-        detalle_table = "<div style='overflow-x:auto; margin-bottom:20px;'><table style='width:100%; border-collapse:collapse;'>"
-        detalle_table += "<tr style='background-color:#621132; color:white;'>"
 
-    #----------------- Llenamos la tabla -----------------#
-        for col in detalle_cols:
-            detalle_table += f"<th style='padding:12px; text-align:center; border:1px solid #ddd;'>{col}</th>"
-        detalle_table += "</tr><tr>"
-        for col in detalle_cols:
-            value = pd.to_numeric(df_ptci_df4[col], errors='coerce').fillna(0).sum() if col in df_ptci_df4.columns else 0
-            detalle_table += f"<td style='padding:12px; text-align:center; border:1px solid #ddd; font-weight:500;'>{int(round(value))}</td>"
-        detalle_table += "</tr></table></div>"
+              #-------------- Parte 1: La tabla del detalle de las Acciones de Mejora ya viene en el resumen del PTCI ------------#
 
-          #-------------- Parte 2: Mostramos la tabla -----------#
-        st.markdown(detalle_table, unsafe_allow_html=True)
+              #-------------- Parte 2: Mostramos la tabla -----------#
+            st.markdown(detalle_table, unsafe_allow_html=True)
 
 
 
@@ -724,167 +619,40 @@ with tabs[1]:
 
 #============================================= SE ABRE LA SECCIÓN 4 - "Seguimiento de las Acciones de Mejora"================================= ==============================================
 #------------------------------------------------------------------------------------------------------------------------------------------------------------
-        st.markdown("""
-          <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-bottom:20px; text-align:center;'>
-            Seguimiento de las Acciones de Mejora
-          </div>
-        """, unsafe_allow_html=True)
-
+            st.markdown("""
+              <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-bottom:20px; text-align:center;'>
+                Seguimiento de las Acciones de Mejora
+              </div>
+            """, unsafe_allow_html=True)
 
 
-          #-------------- Parte 1:  Creamos la tabla que muestra el seguimiento de las acciones de mejora (usamos el estatus y los trimestres)------------#
-                        #----------------- Aqui el cumplimiento es porcentaje entonces calculamos el promedio para el caso del Sector diferente de "Todas" -----------------#
 
+              #-------------- Parte 1: El seguimiento por estatus y trimestre (data_ptci_dict) ya viene en el resumen del PTCI ------------#
 
-        # --- MODIFICACIÓN: Usar promedio para Cumplimiento en caso de sector diferente de "Todas"
-        data_ptci_dict = {}
-        for t in trimestres:
-            for estado in estados:
-                key = f"{t}{estado}"
-                if key in df_ptci.columns:
-                    if estado == "Cumplimiento" and sector != "Todas":
-                        value = pd.to_numeric(df_ptci[key], errors='coerce').fillna(0).mean()
-                    else:
-                        value = pd.to_numeric(df_ptci[key], errors='coerce').fillna(0).sum()
-                else:
-                    value = 0
-                data_ptci_dict[key] = int(round(value))
+              #-------------- Parte 2: Mostrar tabla con formato------------#
+            st.markdown(tabla_trimestres("Estatus de las Acciones de Mejora", FILAS_ESTATUS, data_ptci_dict, trimestres,
+                                         porcentajes=["Cumplimiento"], contenedor=CONTENEDOR),
+                        unsafe_allow_html=True)
 
 
-          #-------------- Parte 2: Mostrar tabla con formato------------#
-        st.markdown("""
-          <div style='overflow-x:auto; margin-bottom:20px;'>
-            <table style='width:100%; border-collapse:collapse;'>
-              <tr style='background-color:#621132; color:white; text-align:center;'>
-                <th>Estatus de las Acciones de Mejora</th>
-                <th>Primero</th>
-                <th>Segundo</th>
-                <th>Tercero</th>
-                <th>Cuarto</th>
-              </tr>
-              <tr>
-                <th style='background-color:#621132; color:white;'>Sin Avances</th>
-                <td style='text-align:center; border:1px solid #ddd;'>{0}</td>
-                <td style='text-align:center; border:1px solid #ddd;'>{1}</td>
-                <td style='text-align:center; border:1px solid #ddd;'>{2}</td>
-                <td style='text-align:center; border:1px solid #ddd;'>{3}</td>
-              </tr>
-              <tr>
-                <th style='background-color:#621132; color:white;'>En Proceso</th>
-                <td style='text-align:center; border:1px solid #ddd;'>{4}</td>
-                <td style='text-align:center; border:1px solid #ddd;'>{5}</td>
-                <td style='text-align:center; border:1px solid #ddd;'>{6}</td>
-                <td style='text-align:center; border:1px solid #ddd;'>{7}</td>
-              </tr>
-              <tr>
-                <th style='background-color:#621132; color:white;'>Concluidas</th>
-                <td style='text-align:center; border:1px solid #ddd;'>{8}</td>
-                <td style='text-align:center; border:1px solid #ddd;'>{9}</td>
-                <td style='text-align:center; border:1px solid #ddd;'>{10}</td>
-                <td style='text-align:center; border:1px solid #ddd;'>{11}</td>
-              </tr>
-              <tr>
-                <th style='background-color:#621132; color:white;'>% de Cumplimiento</th>
-                <td style='text-align:center; border:1px solid #ddd;'>{12}%</td>
-                <td style='text-align:center; border:1px solid #ddd;'>{13}%</td>
-                <td style='text-align:center; border:1px solid #ddd;'>{14}%</td>
-                <td style='text-align:center; border:1px solid #ddd;'>{15}%</td>
-              </tr>
-            </table>
-          </div>
-        """.format(
-          data_ptci_dict.get("1Sin_Avances",0), data_ptci_dict.get("2Sin_Avances",0), data_ptci_dict.get("3Sin_Avances",0), data_ptci_dict.get("4Sin_Avances",0),
-          data_ptci_dict.get("1En_Proceso",0), data_ptci_dict.get("2En_Proceso",0), data_ptci_dict.get("3En_Proceso",0), data_ptci_dict.get("4En_Proceso",0),
-          data_ptci_dict.get("1Concluidas",0), data_ptci_dict.get("2Concluidas",0), data_ptci_dict.get("3Concluidas",0), data_ptci_dict.get("4Concluidas",0),
-          data_ptci_dict.get("1Cumplimiento",0), data_ptci_dict.get("2Cumplimiento",0), data_ptci_dict.get("3Cumplimiento",0), data_ptci_dict.get("4Cumplimiento",0)
-        ), unsafe_allow_html=True)
-
-
-              #-------------- Parte 3: Se crea el gráfico de barras para el seguimiento de las acciones de mejora ------------#
-           #----------------- Para ello primero crea lista de diccionarios que contenga los datos para el gráfico -----------------#
-
-        plot_data_ptci = []
-        for t in trimestres:
-            for estado in estados:
-                key = f"{t}{estado}"
-                plot_data_ptci.append({'Trimestre': f' {t}', 'Estado': estado, 'Cantidad': data_ptci_dict.get(key, 0)})             #cambio de T por Trimestre
-
-                #-------------- Convierte a dataframe la información obtenida y crea la gráfica (fig)  ------------------------#
-        fig_ptci = px.bar(pd.DataFrame(plot_data_ptci), x='Trimestre', y='Cantidad', color='Estado',
-                          barmode='group', height=400,
-                          color_discrete_map={'Sin_Avances': '#dc3545', 'En_Proceso': '#ffc107',
-                                              'Concluidas': '#28a745', 'Cumplimiento': '#6610f2'})
-
-                    #----------------- Da formato final -----------------#
-        fig_ptci.update_layout(
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            font=dict(color='#333'),
-            xaxis=dict(title=None, gridcolor='#f0f0f0'),
-            yaxis=dict(title=None, gridcolor='#f0f0f0'),
-            legend=dict(title=None),
-            margin=dict(l=20, r=20, t=50, b=20)
-        )
-
-     #--------------  Agrega la etiqueta de porcentaje en las barras de Cumplimiento (ya que este valor es porcentaje) -----------------#
-        for trace in fig_ptci.data:
-            if trace.name == "Cumplimiento":
-                trace.text = [f"{y}%" for y in trace.y]
-                trace.textposition = 'outside'
-
-          #-------------- Parte 4: Mostramos la tabla -----------#
-        st.plotly_chart(fig_ptci, use_container_width=True)
+                  #-------------- Parte 3: Gráfico de barras para el seguimiento de las acciones de mejora ------------#
+               #----------------- La figura se arma una vez por alcance y versión de datos y se reutiliza entre sesiones -----------------#
+            figura = figura_ptci(institucion, year, sector)
+            with METRICAS.tramo("plotly_chart"):
+                st.plotly_chart(figura, width="stretch")
 
 
 
 #============================================= SE ABRE LA SECCIÓN 5 - "Descripción de los Procesos y Acciones de Mejora" =============================================
 #------------------------------------------------------------------------------------------------------------------------------------------------------------
-        st.markdown("""
-          <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-top:30px; margin-bottom:30px; text-align:center;'>
-            Descripción de los Procesos y las Acciones de Mejora
-          </div>
-        """, unsafe_allow_html=True)
-
-        #------------- Filtros --------------
-        col1, col2 = st.columns(2)
-        with col1:
-            selected_trimester = st.selectbox("Filtrar por Trimestre", options=sorted(df_ptci_df4["Trimestre"].unique()))
-        with col2:
-            selected_siglas = st.selectbox("Filtrar por Siglas", options=sorted(df_ptci_df4["Siglas"].unique()))
-
-        # Filtrar el DataFrame según los filtros seleccionados
-        filtered_df = df_ptci_df4[
-            (df_ptci_df4["Trimestre"] == selected_trimester) &
-            (df_ptci_df4["Siglas"] == selected_siglas)
-        ]
-
-        #-------------- Parte 1: Creamos la tabla que muestra la descripción de los Procesos y Acciones de Mejora ------------#
-        headers_ptci = ["Año", "Trimestre", "Siglas", "Procesos", "AM", "Descripcion", "Fecha_Inicio", "Fecha_Termino",
-                        "Avance_Institución", "Avance_OIC", "¿Evaluado?", "¿Favorable?", "¿AM_Congruete?", "¿Contribuye?"]
-
-        desc_ptci_html = "<div style='overflow-x:auto;'><table style='width:100%; border-collapse:collapse; margin-bottom:20px;'>"
-        desc_ptci_html += "<tr style='background-color:#621132; color:white;'>"
-
-        for h in headers_ptci:
-            desc_ptci_html += f"<th style='padding:12px; text-align:center; border:1px solid #ddd;'>{h}</th>"
-        desc_ptci_html += "</tr>"
-
-        #-------------- Llenamos la tabla ------------#
-        for _, row in filtered_df.iterrows():
-            desc_ptci_html += "<tr>"
-            for h in headers_ptci:
-                cell = row.get(h, "")
-                if h in ["Avance_Institución", "Avance_OIC"]:
-                    try:
-                        cell = f"{int(float(cell))}%"
-                    except:
-                        cell = cell
-                desc_ptci_html += f"<td style='padding:12px; text-align:center; border:1px solid #ddd;'>{cell}</td>"
-            desc_ptci_html += "</tr>"
-        desc_ptci_html += "</table></div>"
+            st.markdown("""
+              <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-top:30px; margin-bottom:30px; text-align:center;'>
+                Descripción de los Procesos y las Acciones de Mejora
+              </div>
+            """, unsafe_allow_html=True)
 
-        #-------------- Parte 2: Imprimimos la tabla ------------#
-        st.markdown(desc_ptci_html, unsafe_allow_html=True)
+            #------------- Filtros y grilla (fragmento: los filtros solo vuelven a ejecutar esta sección) --------------
+            seccion_desc_ptci(institucion, year, sector)
 
 
 
@@ -895,11 +663,11 @@ with tabs[1]:
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 #============================================= PIE DE PÁGINA DE LA SECCION PTCI - FUENTE SICOIN ==============================================
 
-    st.markdown("""
-      <div style='text-align:right; font-size:12px; color:#666; margin-top:20px;'>
-        Fuente: Sistema de Control Interno (SICOIN)
-      </div>
-    """, unsafe_allow_html=True)
+        st.markdown("""
+          <div style='text-align:right; font-size:12px; color:#666; margin-top:20px;'>
+            Fuente: Sistema de Control Interno (SICOIN)
+          </div>
+        """, unsafe_allow_html=True)
 
 #================================= FIN DE LA SECCIÓN 5 - "Descripción de los Procesos y Acciones de Mejora" ==============================================
 #--------------------------------------------------------------------------------------------------------------------------------------------------
@@ -918,7 +686,183 @@ with tabs[1]:
 
 
 
+#================================== REPORTE NACIONAL POR AÑO (rankings y distribuciones de todas las instituciones y sectores) ==============================================
+# Un groupby por base calcula todas las instituciones y sectores a la vez; el resultado se comparte entre sesiones por (año, versión de datos)
+@memorizar(cache_vistas, lambda: version_datos)
+def años_reporte():
+    return tuple(años_disponibles(datos))
+
+
+@memorizar(cache_vistas, lambda: version_datos)
+@METRICAS.medir()
+def reporte_nacional(year):
+    return reporte_anual(datos, year)
+
+
+def titulo_seccion(texto):
+    st.markdown(f"""
+      <div style='background-color:#621132; color:white; padding:10px; border-radius:5px; margin-bottom:20px; text-align:center;'>
+        {texto}
+      </div>
+    """, unsafe_allow_html=True)
+
+
+@st.fragment
+def seccion_reportes():
+    # Fragmento: cambiar el año o el sector del ranking solo vuelve a ejecutar esta sección
+    años = años_reporte()
+    if not años:
+        st.info("No hay años con datos para generar el reporte.")
+        return
+    c1, c2 = st.columns(2)
+    with c1:
+        año_reporte = st.selectbox("Año del reporte", años, index=len(años) - 1, key="reporte_año")
+    reporte = reporte_nacional(año_reporte)
+    with c2:
+        sector_reporte = st.selectbox("Sector del ranking", ["Todos"] + sorted(reporte.sectores["Sector"].tolist()), key="reporte_sector")
+
+    instituciones = reporte.instituciones
+    if sector_reporte != "Todos":
+        instituciones = instituciones[instituciones["Sector"] == sector_reporte]
+
+    #-------------- Indicadores generales del alcance seleccionado --------------#
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Instituciones", len(instituciones))
+    ngci = instituciones[NGCI].mean()
+    m2.metric("Cumplimiento NGCI promedio", "N/A" if pd.isna(ngci) else f"{round(float(ngci), 2)}%")
+    m3.metric("Riesgos", int(instituciones["Riesgos_Totales"].sum()))
+    m4.metric("Acciones de Control", int(instituciones["AC_Total"].sum()))
+
+    titulo_seccion("Ranking de Instituciones por Cumplimiento General de las NGCI")
+    st.dataframe(instituciones.rename(columns=columnas_instituciones), hide_index=True, width="stretch")
+
+    titulo_seccion("Ranking de Sectores")
+    st.dataframe(reporte.sectores.rename(columns=columnas_sectores), hide_index=True, width="stretch")
+
+    titulo_seccion("Distribución de Instituciones por Rango de Cumplimiento")
+    st.bar_chart(reporte.distribucion["Cumplimiento NGCI"])
+    st.dataframe(reporte.distribucion, width="stretch")
+
+
+#================================== EXPORTACIÓN A EXCEL (valores de PTAR y PTCI de cada institución × año y de cada sector) ==============================================
+# El libro se arma solo cuando se pulsa el botón (data como función) y se comparte entre sesiones por (sector, formato, versión de datos)
+@memorizar(cache_vistas, lambda: version_datos)
+@METRICAS.medir()
+def exportacion_xlsx(sector, formato):
+    salida = io.BytesIO()
+    exportar(publicacion, salida, sector, formato)
+    return salida.getvalue()
+
+
+@st.fragment
+def seccion_exportar():
+    titulo_seccion("Exportar a Excel los Valores de PTAR y PTCI por Institución y Año")
+    c1, c2 = st.columns(2)
+    with c1:
+        sector_exportar = st.selectbox("Instituciones", ["Todas"] + facetas.sectores, key="exportar_sector")
+    with c2:
+        formato = st.radio("Formato", ["tabla", "hojas"], horizontal=True, key="exportar_formato",
+                           format_func={"tabla": "Una fila por institución y año", "hojas": "Una hoja por institución y sector"}.get)
+    sector = None if sector_exportar == "Todas" else sector_exportar
+    st.download_button("Descargar Excel", data=lambda: exportacion_xlsx(sector, formato), on_click="ignore",
+                       file_name=f"reporte_sicoin_{(sector or 'nacional').replace(' ', '_')}.xlsx",
+                       mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+
+#================================== CONCILIACIÓN DE LAS BASES (discrepancias de todos los alcances, calculadas en el actualizador) ==============================================
+@st.fragment
+def seccion_conciliacion():
+    titulo_seccion("Conciliación de las Bases (PTAR, ACTRI, PTCI y AMTRI)")
+    discrepancias = conciliacion.discrepancias
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Alcances revisados", conciliacion.alcances)
+    m2.metric("Alcances con discrepancias", conciliacion.con_discrepancias)
+    m3.metric("Discrepancias", len(discrepancias))
+
+    descripciones = {r.nombre: r.descripcion for r in REGLAS}
+    resumen = conciliacion.resumen()
+    st.dataframe(resumen.assign(Descripción=resumen.index.map(descripciones)), width="stretch")
+
+    c1, c2 = st.columns(2)
+    with c1:
+        regla = st.selectbox("Regla", ["Todas"] + list(descripciones), key="conciliacion_regla")
+    with c2:
+        alcance = st.selectbox("Alcance", ["Todos", "Institución", "Sector"], key="conciliacion_alcance")
+    if regla != "Todas":
+        discrepancias = discrepancias[discrepancias["Regla"] == regla]
+    if alcance != "Todos":
+        discrepancias = discrepancias[discrepancias["Alcance"] == alcance]
+    st.dataframe(discrepancias.drop(columns="Descripción"), hide_index=True, width="stretch")
+    st.download_button("Descargar reporte de discrepancias (CSV)", data=conciliacion.csv, on_click="ignore",
+                       file_name=f"conciliacion_sicoin_{version_datos}.csv", mime="text/csv")
+
+
 with tabs[2]:
-    st.markdown("<h2>REPORTES</h2><p>Información Actualizada al 19/03/2025.</p>", unsafe_allow_html=True)
+    if tabs[2].open:
+        actualizado = time.strftime("%d/%m/%Y %H:%M", time.localtime(publicacion.fecha))
+        st.markdown(f"<h2>REPORTES</h2><p>Información Actualizada al {actualizado}.</p>", unsafe_allow_html=True)
+        seccion_reportes()
+        seccion_exportar()
+        seccion_conciliacion()
+
+
+#================================== BÚSQUEDA DE TEXTO EN RIESGOS, ACCIONES DE CONTROL Y ACCIONES DE MEJORA (todas las instituciones y años) ==============================================
+# Sin importar mayúsculas ni acentos; el índice se arma en el actualizador y cada consulta se comparte entre sesiones por versión de datos
+BASES_BUSQUEDA = {"Todas": None, "Riesgos y Acciones de Control (ACTRI)": "ACTRI", "Acciones de Mejora (AMTRI)": "AMTRI"}
+
+
+@memorizar(cache_vistas, lambda: version_datos)
+@METRICAS.medir()
+def buscar_texto(consulta, base, limite):
+    return busqueda.buscar(consulta, limite, base)
+
+
+@st.fragment
+def seccion_busqueda():
+    c1, c2, c3 = st.columns([3, 2, 1])
+    with c1:
+        consulta = st.text_input("Buscar", key="busqueda_texto", placeholder="p. ej. contratación, inventarios, conflicto de interés")
+    with c2:
+        base = st.selectbox("Buscar en", list(BASES_BUSQUEDA), key="busqueda_base")
+    with c3:
+        limite = st.selectbox("Resultados", [50, 100, 500], key="busqueda_limite")
+    if not consulta.strip():
+        st.caption(f"{busqueda.documentos} descripciones indexadas")
+        return
+    inicio = time.perf_counter()
+    resultados = buscar_texto(consulta.strip(), BASES_BUSQUEDA[base], limite)
+    st.caption(f"{len(resultados)} resultado(s) · {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    st.dataframe(resultados.rename(columns={"Texto 1": "Riesgo / Proceso", "Texto 2": "Descripción de la acción"}),
+                 hide_index=True, width="stretch")
+
+
+with tabs[3]:
+    if tabs[3].open:
+        st.markdown("<h2>BÚSQUEDA</h2><p>Descripciones de riesgos, Acciones de Control y Acciones de Mejora de todas las instituciones y años.</p>", unsafe_allow_html=True)
+        seccion_busqueda()
+
+
+#================================================== PANEL OCULTO DE DIAGNÓSTICO DE RENDIMIENTO ==================================================
+# Solo aparece si SICOIN_ADMIN está definida y la URL trae ?admin=<mismo valor>. Muestra por etapa llamadas, p50/p95 recientes,
+# máximo y tiempo total, además de los indicadores de las cachés; las mismas métricas se publican en formato Prometheus.
+METRICAS.registrar("rerun", time.perf_counter() - inicio_rerun)
+METRICAS.publicar()                                 # Escribe ARCHIVO_METRICAS como máximo cada 15 s
+
+CLAVE_ADMIN = os.environ.get("SICOIN_ADMIN", "")
+if CLAVE_ADMIN and st.query_params.get("admin") == CLAVE_ADMIN:
+    with st.expander("Diagnóstico de rendimiento", expanded=True):
+        st.caption(f"Versión de datos: {version_datos} · Archivo de métricas: {ARCHIVO_METRICAS}")
+        estado = obtener_actualizador().estado()
+        st.caption(f"Actualizaciones: {estado['refrescos']} · fallidas: {estado['fallos']} · edad de la versión: {estado['edad_s'] / 60:.0f} min")
+        if estado["ultimo_error"]:
+            st.warning(f"Último error de actualización (se sigue mostrando la versión anterior): {estado['ultimo_error']}")
+        if st.button("Actualizar datos ahora"):
+            obtener_actualizador().solicitar()                             # El refresco corre en segundo plano
+        etapas = pd.DataFrame(METRICAS.resumen(), columns=["etapa", "llamadas", "p50_ms", "p95_ms", "max_ms", "total_s"])
+        st.dataframe(etapas.round({"p50_ms": 2, "p95_ms": 2, "max_ms": 2, "total_s": 3}), hide_index=True, width="stretch")
+        indicadores = METRICAS.indicadores()
+        if indicadores:
+            st.dataframe(pd.DataFrame(indicadores).T, width="stretch")
+        st.download_button("Descargar métricas (Prometheus)", METRICAS.prometheus(), file_name="metricas.prom", mime="text/plain")
 
 #CORREGIDO V 2.1.1
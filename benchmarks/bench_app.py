@@ -0,0 +1,151 @@
+#================================================== BENCHMARK DE LA APP SIN NAVEGADOR (AppTest) ==================================================
+# Genera datos sintéticos a la escala indicada, ejecuta app.py con el arnés AppTest de Streamlit (sin navegador ni Google Drive)
+# y mide por pestaña y tipo de selección (institución o sector; año en REPORTES):
+#   - latencia de cada rerun (p50/p95), en frío (primera visita de la selección) y en caliente (misma selección otra vez)
+#   - memoria pico de Python (tracemalloc, en una pasada aparte para no inflar las latencias) y RSS máximo del proceso
+# Los resultados se guardan en JSON para comparar entre commits.
+# Uso:  python -m benchmarks.bench_app [--escala 10] [--años 2022 2023 2024] [--muestras 10] [--salida resultados.json]
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.datos_sinteticos import AÑOS, INSTITUCIONES, SECTORES, escribir, generar
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(RAIZ, "app.py")
+
+
+def percentiles(tiempos):
+    if not tiempos:
+        return {"n": 0}
+    ms = np.asarray(tiempos) * 1000
+    return {"n": len(ms), "p50_ms": round(float(np.percentile(ms, 50)), 2),
+            "p95_ms": round(float(np.percentile(ms, 95)), 2), "max_ms": round(float(ms.max()), 2)}
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _rerun(at, accion):
+    # Aplica la acción (cambio de filtro) y mide el rerun completo
+    inicio = time.perf_counter()
+    accion(at)
+    duracion = time.perf_counter() - inicio
+    if at.exception:
+        raise RuntimeError(f"La app falló durante el benchmark: {at.exception[0].value}")
+    return duracion
+
+
+def _pico_memoria(at, acciones):
+    # Pico de memoria de Python (MB) durante los reruns; tracemalloc vuelve lento el código, por eso va en una pasada aparte
+    tracemalloc.start()
+    try:
+        for accion in acciones:
+            _rerun(at, accion)
+        return round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+    finally:
+        tracemalloc.stop()
+
+
+def _rss_max_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2)       # ru_maxrss está en KB en Linux
+
+
+def _acciones(pestaña, clave, valores):
+    # Una acción por valor: seleccionar la institución, el sector o el año del reporte dentro de la pestaña.
+    # AppTest no reenvía el estado de st.tabs, así que la pestaña se vuelve a fijar antes de cada rerun.
+    def accion(valor):
+        def ejecutar(at):
+            at.session_state["pestaña"] = pestaña
+            at.selectbox(key=clave).set_value(valor).run()
+        return ejecutar
+    return [accion(v) for v in valores]
+
+
+def medir(at, pestaña, clave, valores):
+    at.session_state["pestaña"] = pestaña
+    if clave == "institucion":
+        at.selectbox(key="sector").set_value("Todas")
+    at.run()
+
+    acciones = _acciones(pestaña, clave, valores)
+    frio = [_rerun(at, accion) for accion in acciones]                    # Primera visita de cada selección
+    caliente = [_rerun(at, accion) for accion in acciones]                # Misma selección otra vez (cachés llenas)
+    return {"frio": percentiles(frio), "caliente": percentiles(caliente),
+            "pico_memoria_mb": _pico_memoria(at, acciones), "rss_max_mb": _rss_max_mb()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la app con AppTest sobre datos sintéticos")
+    parser.add_argument("--escala", type=float, default=1, help="Multiplica el número de instituciones y sectores base")
+    parser.add_argument("--años", type=int, nargs="+", default=list(AÑOS))
+    parser.add_argument("--muestras", type=int, default=10, help="Selecciones distintas por tipo")
+    parser.add_argument("--salida", default=None, help="Archivo JSON de resultados (por omisión se imprime)")
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    instituciones = max(1, int(INSTITUCIONES * args.escala))
+    sectores = max(1, int(SECTORES * args.escala))
+
+    with tempfile.TemporaryDirectory(prefix="sicoin_bench_") as temporal:
+        carpeta = os.path.join(temporal, "datos")
+        tablas = generar(instituciones, sectores, tuple(args.años))
+        escribir(tablas, carpeta)
+        os.environ["SICOIN_FUENTE"] = carpeta                                  # Descarga desde la carpeta local (sin Drive)
+        os.environ["SICOIN_CACHE"] = os.path.join(temporal, "cache")           # Descargas e instantáneas aisladas del uso normal
+
+        at = AppTest.from_file(APP, default_timeout=args.timeout)
+        arranque = _rerun(at, lambda at: at.run())                          # Ingesta, limpieza, índices y cubo en frío
+        rss_arranque = _rss_max_mb()
+
+        opciones_inst = list(at.selectbox(key="institucion").options)
+        opciones_sector = [s for s in at.selectbox(key="sector").options if s != "Todas"]
+        paso_inst = max(1, len(opciones_inst) // args.muestras)
+        paso_sector = max(1, len(opciones_sector) // args.muestras)
+        selecciones = {"institucion": opciones_inst[::paso_inst][:args.muestras],
+                       "sector": opciones_sector[::paso_sector][:args.muestras]}
+
+        resultados = {}
+        for pestaña in ("PTAR", "PTCI"):
+            for tipo, valores in selecciones.items():
+                resultados[f"{pestaña}/{tipo}"] = medir(at, pestaña, tipo, valores)
+
+        # Reporte nacional: un rerun por año (frío = primer cálculo del año; caliente = reporte ya en la caché compartida)
+        at.session_state["pestaña"] = "REPORTES"
+        at.run()
+        resultados["REPORTES/año"] = medir(at, "REPORTES", "reporte_año", list(at.selectbox(key="reporte_año").options))
+
+    reporte = {
+        "commit": _commit(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "entorno": {"python": platform.python_version(), "pandas": pd.__version__, "streamlit": st.__version__},
+        "escala": {"factor": args.escala, "instituciones": instituciones, "sectores": sectores, "años": args.años,
+                   "filas": {nombre: len(df) for nombre, df in tablas.items()}},
+        "arranque": {"ms": round(arranque * 1000, 2), "rss_max_mb": rss_arranque},
+        "resultados": resultados,
+    }
+    texto = json.dumps(reporte, ensure_ascii=False, indent=2)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    print(texto)
+
+
+if __name__ == "__main__":
+    main()
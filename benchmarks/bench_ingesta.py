@@ -0,0 +1,114 @@
+#================================================== BENCHMARK DE INGESTA: LECTURA, LIMPIEZA E ÍNDICES ==================================================
+# Escribe libros PTAR/ACTRI/PTCI/AMTRI realistas (openpyxl) a escalas crecientes y mide por separado, para cada estrategia de lectura:
+#   - lectura:   del .xlsx a DataFrame (sicoin.lectores) o de la instantánea Arrow ya guardada ("instantanea")
+#   - limpieza:  limpiar_datos (incluye el esquema de tipos; el lector flujo limpia cada bloque dentro de la lectura)
+#   - indices:   índice de facetas y cubo de agregados
+#   - pico:      con --memoria, el máximo de memoria reservada (tracemalloc) al leer un archivo, en una pasada aparte
+# También verifica que cada estrategia produzca las mismas tablas limpias que pd.read_excel.
+# Uso:  python -m benchmarks.bench_ingesta [--instituciones 30 300 3000] [--memoria] [--salida ingesta.json]
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.datos_sinteticos import AÑOS, INSTITUCIONES, SECTORES, escribir, generar
+from sicoin.agregados import CuboAgregados
+from sicoin.esquema import ESQUEMAS, limpiar_datos
+from sicoin.facetas import IndiceFacetas
+from sicoin.lectores import LECTORES
+from sicoin.snapshots import AlmacenSnapshots
+
+
+def _cronometrar(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return resultado, time.perf_counter() - inicio
+
+
+def _pico_mb(funcion):
+    tracemalloc.start()
+    try:
+        funcion()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def _equivalentes(referencia, tablas):
+    # Compara sobre las columnas de cada tabla (la proyección puede traer menos columnas que la referencia)
+    try:
+        for nombre, df in tablas.items():
+            pd.testing.assert_frame_equal(referencia[nombre][df.columns], df)
+    except (AssertionError, KeyError):
+        return False
+    return True
+
+
+def medir_estrategia(leer, limpiar=True):
+    # leer(nombre) -> DataFrame; las instantáneas y el lector flujo ya vienen limpios (limpiar=False)
+    lectura = limpieza = 0.0
+    tablas = {}
+    for nombre in ESQUEMAS:
+        crudo, t = _cronometrar(lambda: leer(nombre))
+        lectura += t
+        tablas[nombre], t = _cronometrar(lambda: limpiar_datos(crudo, nombre) if limpiar else crudo)
+        limpieza += t
+    _, indices = _cronometrar(lambda: (IndiceFacetas(tablas), CuboAgregados(tablas)))
+    return tablas, {"lectura_s": round(lectura, 4), "limpieza_s": round(limpieza, 4), "indices_s": round(indices, 4),
+                    "total_s": round(lectura + limpieza + indices, 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de ingesta por estrategia de lectura")
+    parser.add_argument("--instituciones", type=int, nargs="+", default=[30, 300, 3000])
+    parser.add_argument("--años", type=int, nargs="+", default=list(AÑOS))
+    parser.add_argument("--estrategias", nargs="+", default=list(LECTORES), choices=list(LECTORES))
+    parser.add_argument("--memoria", action="store_true", help="Mide también el pico de memoria de la lectura (más lento)")
+    parser.add_argument("--salida", default=None, help="Archivo JSON de resultados")
+    args = parser.parse_args()
+
+    resultados = []
+    print(f"{'instituciones':>13} {'filas':>8} {'estrategia':>12} {'lectura':>9} {'limpieza':>9} {'índices':>9} {'total':>9}"
+          f"{' pico_MB' if args.memoria else ''}  iguales")
+    for instituciones in args.instituciones:
+        with tempfile.TemporaryDirectory(prefix="sicoin_ingesta_") as temporal:
+            datos = generar(instituciones, max(1, instituciones * SECTORES // INSTITUCIONES), tuple(args.años))
+            escribir(datos, temporal)
+            filas = sum(len(df) for df in datos.values())
+
+            def ruta(nombre):
+                return os.path.join(temporal, f"{nombre}.xlsx")
+            referencia = {nombre: limpiar_datos(LECTORES["pandas"](ruta(nombre)), nombre) for nombre in ESQUEMAS}
+
+            for estrategia in args.estrategias:
+                lector = LECTORES[estrategia]
+                tablas, tiempos = medir_estrategia(lambda nombre: lector(ruta(nombre)), limpiar=not lector.limpia)
+                resultados.append({"instituciones": instituciones, "filas": filas, "estrategia": estrategia, **tiempos,
+                                   "iguales": _equivalentes(referencia, tablas)})
+                if args.memoria:
+                    resultados[-1]["pico_mb"] = round(max(_pico_mb(lambda: lector(ruta(nombre))) for nombre in ESQUEMAS), 1)
+
+            # Instantánea Arrow ya guardada (lo que pasa cuando el archivo no cambió desde la última ingesta)
+            almacen = AlmacenSnapshots(os.path.join(temporal, "snapshots"), version="bench")
+            for nombre, df in referencia.items():
+                almacen.escribir(nombre, "0" * 64, df)
+            tablas, tiempos = medir_estrategia(lambda nombre: almacen.leer(nombre, "0" * 64), limpiar=False)
+            resultados.append({"instituciones": instituciones, "filas": filas, "estrategia": "instantanea", **tiempos,
+                               "iguales": _equivalentes(referencia, tablas)})
+
+        for r in resultados[-len(args.estrategias) - 1:]:
+            pico = f" {r['pico_mb']:>7.1f}" if "pico_mb" in r else (" " * 8 if args.memoria else "")
+            print(f"{r['instituciones']:>13} {r['filas']:>8} {r['estrategia']:>12} {r['lectura_s']:>9.3f} {r['limpieza_s']:>9.3f}"
+                  f" {r['indices_s']:>9.3f} {r['total_s']:>9.3f}{pico}  {'sí' if r['iguales'] else 'NO'}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
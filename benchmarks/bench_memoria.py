@@ -0,0 +1,136 @@
+#================================================== MEMORIA RESIDENTE (RSS) CONTRA SESIONES CONCURRENTES ==================================================
+# Genera datos sintéticos y mide el RSS del proceso a medida que se suman sesiones simuladas. Dos modos:
+#   - app:   cada sesión es un AppTest vivo (estado de widgets y árbol de elementos) con su propia selección de institución/sector;
+#            todas comparten las tablas, el índice de facetas y el cubo publicados por el actualizador
+#   - cubo:  cada sesión conserva el detalle (ACTRI, PTCI, AMTRI) de su selección; compara las rebanadas sin copia de
+#            CuboAgregados.seleccionar contra el filtrado booleano df[(df[alcance] == valor) & (df['Año'] == año)]
+# Uso:  python -m benchmarks.bench_memoria [--modo app|cubo] [--escala 10] [--sesiones 1 2 4 8 16 32] [--salida memoria.json]
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+
+from benchmarks.bench_app import APP
+from benchmarks.datos_sinteticos import AÑOS, INSTITUCIONES, SECTORES, escribir, generar
+
+
+def rss_mb():
+    # RSS actual (no el máximo) en Linux; en otros sistemas se usa el máximo como aproximación
+    gc.collect()
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20, 2)
+    except OSError:
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2)
+
+
+def _curva(sesiones, agregar_sesion):
+    # agregar_sesion(i) crea la sesión i y la mantiene viva; se mide el RSS al llegar a cada número de sesiones
+    base = rss_mb()
+    curva, vivas = [], []
+    for i in range(max(sesiones)):
+        vivas.append(agregar_sesion(i))
+        if i + 1 in sesiones:
+            rss = rss_mb()
+            curva.append({"sesiones": i + 1, "rss_mb": rss, "incremento_mb": round(rss - base, 2),
+                          "por_sesion_mb": round((rss - base) / (i + 1), 3)})
+    return {"rss_base_mb": base, "curva": curva}
+
+
+def _en_proceso_aparte(funcion):
+    # Corre en un proceso hijo (fork, solo Linux/macOS) para que una variante no reutilice la memoria que liberó la otra
+    contexto = multiprocessing.get_context("fork")
+    receptor, emisor = contexto.Pipe(duplex=False)
+    hijo = contexto.Process(target=lambda: emisor.send(funcion()))
+    hijo.start()
+    resultado = receptor.recv()
+    hijo.join()
+    return resultado
+
+
+def medir_app(sesiones, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    arranque = AppTest.from_file(APP, default_timeout=timeout)
+    arranque.run()                                                            # Primera carga: tablas, facetas y cubo compartidos
+    instituciones = list(arranque.selectbox(key="institucion").options)
+    sectores = [s for s in arranque.selectbox(key="sector").options if s != "Todas"]
+    for pestaña in ("PTCI", "PTAR"):                                          # Importaciones y cachés de ambas pestañas antes de la línea base
+        arranque.session_state["pestaña"] = pestaña
+        arranque.run()
+
+    def agregar_sesion(i):
+        at = AppTest.from_file(APP, default_timeout=timeout)
+        at.session_state["pestaña"] = ("PTAR", "PTCI")[i % 2]
+        at.run()
+        at.session_state["pestaña"] = ("PTAR", "PTCI")[i % 2]                   # AppTest no reenvía el estado de st.tabs
+        if i % 3 == 2:
+            at.selectbox(key="sector").set_value(sectores[i % len(sectores)]).run()
+        else:
+            at.selectbox(key="institucion").set_value(instituciones[i % len(instituciones)]).run()
+        if at.exception:
+            raise RuntimeError(f"La app falló en la sesión {i}: {at.exception[0].value}")
+        return at
+
+    return {"app": _curva(sesiones, agregar_sesion)}
+
+
+def medir_cubo(sesiones):
+    from sicoin.actualizador import Actualizador
+    from sicoin.descarga import fuente_desde_entorno
+    from sicoin.ingesta import Ingesta
+
+    publicacion = Actualizador(Ingesta(fuente_desde_entorno([f"{n}.xlsx" for n in ("PTAR", "ACTRI", "PTCI", "AMTRI")]))).iniciar()
+    datos, cubo, facetas = publicacion.datos, publicacion.cubo, publicacion.facetas
+    selecciones = ([("Institución", valor, año) for valor in facetas.instituciones for año in facetas.años(valor, "Todas")] +
+                   [("Sector", valor, año) for valor in facetas.sectores for año in facetas.años(None, valor)])
+
+    def rebanadas(i):
+        alcance, valor, año = selecciones[i % len(selecciones)]
+        return [cubo.seleccionar(base, alcance, valor, año) for base in ("ACTRI", "PTCI", "AMTRI")]
+
+    def copias(i):
+        alcance, valor, año = selecciones[i % len(selecciones)]
+        return [df[(df[alcance] == valor) & (df["Año"] == año)] for df in (datos["ACTRI"], datos["PTCI"], datos["AMTRI"])]
+
+    return {"rebanadas": _en_proceso_aparte(lambda: _curva(sesiones, rebanadas)),
+            "copias": _en_proceso_aparte(lambda: _curva(sesiones, copias))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RSS contra número de sesiones simuladas")
+    parser.add_argument("--modo", choices=["app", "cubo"], default="app")
+    parser.add_argument("--escala", type=float, default=1, help="Multiplica el número de instituciones y sectores base")
+    parser.add_argument("--años", type=int, nargs="+", default=list(AÑOS))
+    parser.add_argument("--sesiones", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--salida", default=None, help="Archivo JSON de resultados (por omisión se imprime)")
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    instituciones = max(1, int(INSTITUCIONES * args.escala))
+    sectores = max(1, int(SECTORES * args.escala))
+
+    with tempfile.TemporaryDirectory(prefix="sicoin_memoria_") as temporal:
+        carpeta = os.path.join(temporal, "datos")
+        tablas = generar(instituciones, sectores, tuple(args.años))
+        escribir(tablas, carpeta)
+        del tablas
+        os.environ["SICOIN_FUENTE"] = carpeta
+        os.environ["SICOIN_CACHE"] = os.path.join(temporal, "cache")
+        sesiones = sorted(set(args.sesiones))
+        resultados = medir_app(sesiones, args.timeout) if args.modo == "app" else medir_cubo(sesiones)
+
+    reporte = {"modo": args.modo, "escala": {"factor": args.escala, "instituciones": instituciones, "sectores": sectores,
+                                             "años": args.años}, "resultados": resultados}
+    texto = json.dumps(reporte, ensure_ascii=False, indent=2)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#================================================== MICROBENCHMARK: TABLAS HTML (iterrows vs. por columnas) ==================================================
+# Compara el armado anterior de la tabla de ACTRI (iterrows + concatenación de cadenas) con sicoin.tablas para 10 a 100,000 filas.
+# Uso:  python -m benchmarks.bench_tablas [--filas 10 100 1000 10000 100000] [--repeticiones 3]
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from sicoin.tablas import CELDA_JUSTIFICADA, Columna, columna, porcentaje, tabla_html
+
+CELDA = "padding:12px; text-align:center; border:1px solid #ddd;"
+
+
+def datos_actri(filas, semilla=0):
+    rng = np.random.default_rng(semilla)
+    avance = rng.integers(0, 101, filas).astype("float64")
+    avance[rng.random(filas) < 0.05] = np.nan
+    return pd.DataFrame({
+        "Año": pd.array(np.full(filas, 2024), dtype="Int16"),
+        "Siglas": pd.Categorical(rng.choice(["SA", "SB", "SC", "SD"], filas)),
+        "Riesgo": rng.integers(1, 20, filas),
+        "Descripción_del_Riesgo": [f"Riesgo <{i}> de la acción & control" for i in range(filas)],
+        "AC": rng.integers(1, 10, filas),
+        "Descripcion": [f"Descripción de la acción de control número {i}" for i in range(filas)],
+        "Avance_Institución": avance,
+        "Avance_OIC": avance[::-1].copy(),
+    })
+
+
+def tabla_iterrows(df):
+    # Versión anterior de app.py (sin escapar valores)
+    html = "<div style='overflow-x:auto;'><table style='width:100%; border-collapse:collapse; margin-bottom:20px;'><tr>"
+    for _, row in df.iterrows():
+        avance_inst = f"{round(row['Avance_Institución'], 2)}%" if pd.notna(row['Avance_Institución']) else ""
+        avance_oic = f"{round(row['Avance_OIC'], 2)}%" if pd.notna(row['Avance_OIC']) else ""
+        html += "<tr>"
+        for col in ["Año", "Siglas", "Riesgo", "Descripción_del_Riesgo", "AC"]:
+            html += f"<td style='{CELDA}'>{row.get(col, '')}</td>"
+        html += f"<td style='{CELDA_JUSTIFICADA}'>{row.get('Descripcion', '')}</td>"
+        html += f"<td style='{CELDA}'>{avance_inst}</td>"
+        html += f"<td style='{CELDA}'>{avance_oic}</td>"
+        html += "</tr>"
+    return html + "</table></div>"
+
+
+def tabla_columnas(df):
+    return tabla_html([
+        Columna("Año", columna(df, "Año")),
+        Columna("Siglas", columna(df, "Siglas")),
+        Columna("Riesgo", columna(df, "Riesgo")),
+        Columna("Descripción del Riesgo", columna(df, "Descripción_del_Riesgo")),
+        Columna("No. de AC", columna(df, "AC")),
+        Columna("Descripción", columna(df, "Descripcion"), CELDA_JUSTIFICADA),
+        Columna("Avance Institución", porcentaje(df["Avance_Institución"])),
+        Columna("Avance OIC", porcentaje(df["Avance_OIC"])),
+    ], contenedor="overflow-x:auto;", tabla="width:100%; border-collapse:collapse; margin-bottom:20px;")
+
+
+def medir(funcion, df, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(df)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark del armado de tablas HTML")
+    parser.add_argument("--filas", type=int, nargs="+", default=[10, 100, 1_000, 10_000, 100_000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'filas':>8} {'iterrows (s)':>14} {'columnas (s)':>14} {'aceleración':>12}")
+    for filas in args.filas:
+        df = datos_actri(filas)
+        antes = medir(tabla_iterrows, df, args.repeticiones)
+        despues = medir(tabla_columnas, df, args.repeticiones)
+        print(f"{filas:>8} {antes:>14.4f} {despues:>14.4f} {antes / despues:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#================================================== DATOS SINTÉTICOS DE SICOIN PARA PRUEBAS DE RENDIMIENTO ==================================================
+# Genera PTAR, ACTRI, PTCI y AMTRI con los nombres de columna reales a la escala que se pida (instituciones, sectores y años).
+# Igual que en los archivos reales, ACTRI y AMTRI traen renglones de encabezado repetidos y el nombre " Institución " con espacios.
+# Uso:  python -m benchmarks.datos_sinteticos <carpeta> [--instituciones 30] [--sectores 10] [--años 2023 2024]
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from sicoin.esquema import (columnas_actri, columnas_amtri, cuadrante_cols, detalle_cols, estados, estrategia_cols,
+                            risk_cols, trimestres)
+
+INSTITUCIONES = 30
+SECTORES = 10
+AÑOS = (2023, 2024)
+
+
+def _base(instituciones, sectores, años):
+    # Una fila por (institución, año)
+    i = np.repeat(np.arange(instituciones), len(años))
+    return pd.DataFrame({
+        "Año": np.tile(np.asarray(años), instituciones),
+        "Institución": [f"Institución {k:05d}" for k in i],
+        "Sector": [f"Sector {k % sectores:03d}" for k in i],
+        "Siglas": [f"I{k:05d}" for k in i],
+    })
+
+
+def _trimestres(rng, filas):
+    columnas = {}
+    for t in trimestres:
+        for e in estados:
+            columnas[f"{t}{e}"] = (rng.integers(0, 101, filas).astype(float) if e == "Cumplimiento"
+                                   else rng.integers(0, 6, filas))
+    return columnas
+
+
+def _expandir(base, veces):
+    # Repite cada fila de la base `veces[i]` veces y devuelve también el número de renglón dentro de cada grupo
+    repetida = base.loc[base.index.repeat(veces)].reset_index(drop=True)
+    inicio = np.repeat(np.cumsum(veces) - veces, veces)
+    return repetida, np.arange(len(repetida)) - inicio
+
+
+def _con_encabezados(df, cada=500):
+    # Inserta renglones con los nombres de las columnas (como en las exportaciones de SICOIN)
+    encabezado = pd.DataFrame([dict(zip(df.columns, df.columns))])
+    partes = []
+    for inicio in range(0, len(df), cada):
+        partes += [df.iloc[inicio:inicio + cada], encabezado]
+    return pd.concat(partes, ignore_index=True) if partes else df
+
+
+def generar(instituciones=INSTITUCIONES, sectores=SECTORES, años=AÑOS, semilla=0):
+    rng = np.random.default_rng(semilla)
+    base = _base(instituciones, sectores, años)
+    n = len(base)
+
+    #--------------- PTAR: una fila por institución y año ---------------#
+    ptar = base.assign(**{c: rng.integers(0, 5, n) for c in risk_cols + cuadrante_cols + estrategia_cols})
+    ptar["AC_Total"] = rng.integers(1, 9, n)
+    ptar["Riesgos_Totales"] = ptar[risk_cols].sum(axis=1)
+    ptar = ptar.assign(**_trimestres(rng, n))
+
+    #--------------- ACTRI: una fila por acción de control (AC_Total por institución y año) ---------------#
+    actri, k = _expandir(base, ptar["AC_Total"].to_numpy())
+    m = len(actri)
+    actri["Riesgo"] = [f"R{j}" for j in k]
+    actri["Descripción_del_Riesgo"] = [f"Riesgo {j} de incumplimiento en el proceso & control <{j}>" for j in k]
+    actri["AC"] = [f"{j}.1" for j in k]
+    actri["Descripcion"] = [f"Acción de control número {j} para mitigar el riesgo" for j in k]
+    actri["Avance_Institución"] = np.where(rng.random(m) < 0.05, np.nan, rng.integers(0, 101, m))
+    actri["Avance_OIC"] = rng.integers(0, 101, m).astype(float)
+    actri = actri[list(dict.fromkeys(["Año", "Institución", "Sector"] + list(columnas_actri)))]
+
+    #--------------- PTCI: una fila por institución y año ---------------#
+    ptci = base.assign(
+        Cumplimiento_General_de_las_NGCI=rng.integers(0, 101, n) + 0.5,
+        Informe_Anual_Finalizado=rng.choice(["Sí", "No"], n),
+        SUBIO_ARCHIVO=rng.choice(["Sí", "No"], n),
+        Se_Actualizó_el_Programa=rng.choice(["Sí", "No"], n),
+        No_Se_Actualizó_el_Programa=rng.choice(["Sí", "No"], n),
+        Acciones_de_Mejora_Programa_Original=rng.integers(0, 10, n),
+        TotalAcciones_de_Mejora_Programa_Actualizado=rng.integers(0, 10, n),
+    ).assign(**_trimestres(rng, n))
+
+    #--------------- AMTRI: acciones de mejora por institución, año y trimestre ---------------#
+    amtri, k = _expandir(base, np.full(n, 2 * 3))
+    m = len(amtri)
+    amtri["Trimestre"] = k // 3 + 1
+    amtri["Procesos"] = [f"Proceso {j % 3}" for j in k]
+    amtri["AM"] = (k % 3).astype(str)
+    amtri["Descripcion"] = [f"Acción de mejora {j % 3} del proceso" for j in k]
+    amtri["Fecha_Inicio"] = pd.Timestamp("2024-01-01")
+    amtri["Fecha_Termino"] = pd.Timestamp("2024-12-31")
+    amtri["Avance_Institución"] = rng.integers(0, 101, m).astype(float)
+    amtri["Avance_OIC"] = rng.integers(0, 101, m).astype(float)
+    for c in ["¿Evaluado?", "¿Favorable?", "¿AM_Congruete?", "¿Contribuye?"]:
+        amtri[c] = rng.choice(["Sí", "No"], m)
+    amtri = amtri.assign(**{c: rng.integers(0, 3, m) for c in detalle_cols})
+    amtri = amtri[list(dict.fromkeys(["Año", "Trimestre", "Institución", "Sector"] + list(columnas_amtri) + detalle_cols))]
+
+    return {"PTAR": ptar, "ACTRI": _con_encabezados(actri), "PTCI": ptci, "AMTRI": _con_encabezados(amtri)}
+
+
+def escribir(tablas, carpeta):
+    os.makedirs(carpeta, exist_ok=True)
+    for nombre, df in tablas.items():
+        if nombre in ("ACTRI", "AMTRI"):
+            df = df.rename(columns={"Institución": " Institución "})
+        df.to_excel(os.path.join(carpeta, f"{nombre}.xlsx"), index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera archivos sintéticos de SICOIN")
+    parser.add_argument("carpeta")
+    parser.add_argument("--instituciones", type=int, default=INSTITUCIONES)
+    parser.add_argument("--sectores", type=int, default=SECTORES)
+    parser.add_argument("--años", type=int, nargs="+", default=list(AÑOS))
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    tablas = generar(args.instituciones, args.sectores, tuple(args.años), args.semilla)
+    escribir(tablas, args.carpeta)
+    for nombre, df in tablas.items():
+        print(f"{nombre}: {len(df):,} filas")
+
+
+if __name__ == "__main__":
+    main()
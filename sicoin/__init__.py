@@ -0,0 +1,3 @@
+#=============================== PAQUETE DE APOYO DE LA APP DEL SISTEMA DE CONTROL INTERNO (SICOIN) ===============================
+# Aquí viven las piezas que no dependen de Streamlit (descarga, carga y preparación de datos) para que
+# app.py se mantenga enfocado en mostrar resultados y para poder reutilizarlas desde scripts y pruebas.
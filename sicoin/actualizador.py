@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from sicoin.agregados import BASES, CuboAgregados
+from sicoin.busqueda import IndiceTexto
+from sicoin.conciliacion import Conciliacion, conciliar, conciliar_cambios
+from sicoin.facetas import IndiceFacetas
+from sicoin.incremental import Cambios, detectar_cambios
+from sicoin.ingesta import Datasets
+from sicoin.metricas import METRICAS
+
+
+#================================================== ACTUALIZACIÓN EN SEGUNDO PLANO (stale-while-revalidate) ==================================================
+# Un hilo de trabajo repite la ingesta cada SICOIN_REFRESCO_MIN minutos. Mientras tanto las sesiones siguen leyendo la versión
+# publicada. La nueva versión se arma completa (tablas, índice de facetas y cubo) y se valida antes de publicarla, y la
+# publicación es una sola asignación de referencia. Si la actualización falla se conserva la última versión buena.
+# Solo la primera carga del proceso es síncrona, porque todavía no hay nada que mostrar.
+# Si solo cambiaron algunos renglones, facetas y cubo se derivan de la versión anterior recalculando únicamente los alcances
+# afectados (sicoin/incremental.py); la publicación lleva esos cambios para que la caché de vistas conserve lo demás.
+INTERVALO_MIN = float(os.environ.get("SICOIN_REFRESCO_MIN", "60"))
+COLUMNAS_CLAVE = ("Año", "Institución", "Sector")
+
+
+@dataclass(frozen=True)
+class Publicacion:
+    datos: Datasets
+    facetas: IndiceFacetas
+    cubo: CuboAgregados
+    fecha: float                  # time.time() de la publicación
+    cambios: Optional[Cambios] = None   # Alcances que cambiaron respecto a la publicación anterior (None = todo es nuevo)
+    conciliacion: Optional[Conciliacion] = None   # Discrepancias entre las bases por alcance (sicoin/conciliacion.py)
+    busqueda: Optional[IndiceTexto] = None        # Índice de texto de ACTRI y AMTRI (sicoin/busqueda.py)
+
+    @property
+    def version(self):
+        return self.datos.version
+
+
+def validar_datos(datos):
+    # Una versión incompleta (archivo vacío, descarga truncada, columnas renombradas en SICOIN) no se publica
+    for nombre in BASES:
+        if nombre not in datos.tablas:
+            raise ValueError(f"Falta la base {nombre}")
+        df = datos[nombre]
+        if df.empty:
+            raise ValueError(f"La base {nombre} no tiene registros")
+        faltantes = [c for c in COLUMNAS_CLAVE if c not in df.columns]
+        if faltantes:
+            raise ValueError(f"A la base {nombre} le faltan las columnas {', '.join(faltantes)}")
+
+
+def construir_publicacion(datos, anterior=None):
+    validar_datos(datos)
+    cambios = detectar_cambios(anterior.datos, datos) if anterior is not None else None
+    if cambios is None:
+        with METRICAS.tramo("conciliacion"):
+            conciliacion = conciliar(datos)
+        with METRICAS.tramo("indice_busqueda"):
+            busqueda = IndiceTexto.construir(datos)
+        return Publicacion(datos, IndiceFacetas(datos), CuboAgregados(datos), time.time(), conciliacion=conciliacion, busqueda=busqueda)
+    with METRICAS.tramo("recalculo_incremental"):
+        return Publicacion(datos, anterior.facetas.actualizado(datos, cambios), anterior.cubo.actualizado(datos, cambios),
+                           time.time(), cambios, conciliar_cambios(anterior.conciliacion, datos, cambios),
+                           anterior.busqueda.actualizado(datos, cambios))
+
+
+class Actualizador:
+    def __init__(self, ingesta, intervalo_min=INTERVALO_MIN, construir=construir_publicacion):
+        self.ingesta = ingesta
+        self.intervalo = intervalo_min * 60
+        self.construir = construir
+        self.actual = None                                                     # Última Publicacion buena (se reemplaza, nunca se modifica)
+        self.refrescos = 0
+        self.fallos = 0
+        self.ultimo_error = None
+        self._candado = threading.Lock()                                      # Un solo refresco a la vez
+        self._despertar = threading.Event()
+        self._detenido = False
+        self._hilo = None
+
+    def refrescar(self):
+        # Devuelve True si la versión publicada quedó al día; ante cualquier error se sigue sirviendo la anterior
+        with self._candado, METRICAS.tramo("refresco"):
+            anterior = self.actual
+            try:
+                datos = self.ingesta.ejecutar()
+                if anterior is None or datos.version != anterior.version:
+                    self.actual = self.construir(datos, anterior)
+            except Exception as e:
+                self.fallos += 1
+                self.ultimo_error = f"{time.strftime('%Y-%m-%d %H:%M:%S')} {type(e).__name__}: {e}"
+                if anterior is not None:
+                    self.ingesta.actual = anterior.datos                       # La ingesta no debe reutilizar una versión rechazada
+                return False
+            self.refrescos += 1
+            return True
+
+    def iniciar(self):
+        # Primera carga síncrona (lanza la excepción si falla) y después el hilo de trabajo; llamarla de nuevo no hace nada
+        if self.actual is None and not self.refrescar():
+            raise RuntimeError(self.ultimo_error)
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._ciclo, name="sicoin-actualizador", daemon=True)
+            self._hilo.start()
+            METRICAS.fuente("actualizador", self.estado)
+        return self.actual
+
+    def solicitar(self):
+        # Adelanta el siguiente refresco sin esperarlo
+        self._despertar.set()
+
+    def detener(self):
+        self._detenido = True
+        self._despertar.set()
+
+    def _ciclo(self):
+        while True:
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            if self._detenido:
+                return
+            self.refrescar()
+
+    def estado(self):
+        actual = self.actual
+        return {
+            "version": actual.version if actual else None,
+            "edad_s": time.time() - actual.fecha if actual else 0.0,
+            "refrescos": self.refrescos,
+            "fallos": self.fallos,
+            "alcances_cambiados": len(actual.cambios.afectados) if actual and actual.cambios else None,   # None: última publicación completa
+            "ultimo_error": self.ultimo_error,
+        }
@@ -0,0 +1,170 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from pandas.arrays import NumpyExtensionArray
+
+from sicoin.facetas import ALCANCES, mascara_llaves, ordenar_llaves, posicion_llave
+
+
+#============================================ CUBO DE AGREGADOS POR ALCANCE (Institución/Sector × Año) ============================================
+# Se calcula una sola vez por versión de datos con groupby. Para cada base (PTAR, ACTRI, PTCI, AMTRI) y alcance guarda solo
+# arreglos planos (ningún diccionario por llave), con una posición por llave en orden (valor, año):
+#   - valores, años:   la llave; se busca con bisección sobre valores y searchsorted sobre los años de ese valor (posicion_llave)
+#   - ordenado:        la tabla reacomodada (orden estable) para que las filas de cada alcance queden contiguas
+#   - inicios/finales: el rango [inicio, fin) de cada alcance en ordenado; así el detalle es una rebanada (vista sin copia)
+#   - sumas:           suma de cada columna numérica (vacíos = 0), como filtered.sum(numeric_only=True)
+#   - medias:          promedio de cada columna numérica contando los vacíos como 0, como .fillna(0).mean()
+#   - medias_validas:  promedio ignorando los vacíos, como .mean()
+# Las tres matrices tienen una fila por llave y una columna por nombre de `numericas`. El primer registro del alcance
+# (filtered.iloc[0]) es la fila `inicio` de ordenado y sus instituciones salen de la rebanada, así que no se guardan aparte.
+# Con una versión nueva que solo cambió algunos alcances (sicoin/incremental.py), actualizado() recalcula solo esas llaves.
+
+BASES = ("PTAR", "ACTRI", "PTCI", "AMTRI")
+MATRICES = ("sumas", "medias", "medias_validas")
+
+
+@dataclass(frozen=True)
+class Agregado:
+    filas: int = 0
+    sumas: dict = field(default_factory=dict)
+    medias: dict = field(default_factory=dict)
+    medias_validas: dict = field(default_factory=dict)
+    primeros: dict = field(default_factory=dict)
+    instituciones: list = field(default_factory=list)
+
+
+def _ordenar(df, alcance):
+    # Reacomodo estable por (valor, año); los renglones sin llave no pertenecen a ningún alcance.
+    # Una sola copia compartida por (base, alcance); si la tabla ya viene en ese orden no se copia nada.
+    orden, llaves = ordenar_llaves(df[alcance], df["Año"])
+    identidad = len(orden) == len(df) and bool((orden == np.arange(len(df))).all())
+    return {"ordenado": df if identidad else df.take(orden), **llaves}
+
+
+def _agregar(tabla):
+    # Matrices de agregados de una tabla ya ordenada: un grupo por llave, en el mismo orden que valores/años
+    ordenado = tabla["ordenado"]
+    numericas = [c for c in ordenado.select_dtypes("number").columns if c != "Año"]
+    llaves = len(tabla["inicios"])
+    grupo = np.repeat(np.arange(llaves), tabla["finales"] - tabla["inicios"])
+    valores = ordenado[numericas].astype("float64").set_axis(range(len(ordenado)))
+    matrices = {"sumas": valores.groupby(grupo).sum(),
+                "medias": valores.fillna(0).groupby(grupo).mean(),
+                "medias_validas": valores.groupby(grupo).mean()}
+    return {"numericas": numericas,
+            **{nombre: np.ascontiguousarray(m.to_numpy(dtype="float64").reshape(llaves, len(numericas))) for nombre, m in matrices.items()}}
+
+
+def _tabla(df, alcance):
+    tabla = _ordenar(df, alcance)
+    return {**tabla, **_agregar(tabla)}
+
+
+def _llaves(tabla):
+    return pd.MultiIndex.from_arrays([tabla["valores"].to_pylist(), tabla["años"]])
+
+
+def _retabular(anterior, df, alcance, llaves):
+    # Reacomodo completo (las posiciones cambian en toda la tabla; es vectorizado) y agregados solo de las llaves afectadas;
+    # las demás conservan su fila de la versión anterior. Cada agregado depende únicamente de los renglones de su llave
+    # (en su orden), así que el resultado es igual al de recalcular todo.
+    tabla = _ordenar(df, alcance)
+    parcial = _tabla(df[mascara_llaves(df, alcance, llaves)], alcance)
+    if parcial["numericas"] != anterior["numericas"]:
+        return {**tabla, **_agregar(tabla)}
+    nuevas = _llaves(tabla)
+    de_parcial, de_anterior = _llaves(parcial).get_indexer(nuevas), _llaves(anterior).get_indexer(nuevas)
+    recalculadas = de_parcial >= 0
+    tabla["numericas"] = parcial["numericas"]
+    for nombre in MATRICES:
+        matriz = np.empty((len(nuevas), len(tabla["numericas"])), dtype="float64")
+        matriz[recalculadas] = parcial[nombre][de_parcial[recalculadas]]
+        matriz[~recalculadas] = anterior[nombre][de_anterior[~recalculadas]]
+        tabla[nombre] = matriz
+    return tabla
+
+
+def _columnas(ordenado):
+    # {columna: arreglo} de la tabla (vistas, sin copia) para leer un elemento sin pasar por el indexado de pandas
+    return {columna: serie.to_numpy() if isinstance(serie.array, NumpyExtensionArray) else serie.array
+            for columna, serie in ordenado.items()}
+
+
+def _distintos(valores, inicio, fin):
+    # Valores distintos de valores[inicio:fin] en orden de aparición (en una categoría basta con los códigos)
+    if isinstance(valores, pd.Categorical):
+        return [valores.categories[c] if c >= 0 else np.nan for c in dict.fromkeys(valores.codes[inicio:fin].tolist())]
+    return list(dict.fromkeys(valores[inicio:fin].tolist()))
+
+
+def _fila(columnas, posicion):
+    # Como ordenado.iloc[posicion].to_dict() (valores de Python), leyendo un elemento por columna
+    fila = {}
+    for columna, valores in columnas.items():
+        valor = valores[posicion]
+        fila[columna] = valor.item() if isinstance(valor, np.generic) else valor
+    return fila
+
+
+class CuboAgregados:
+    def __init__(self, datos, bases=BASES):
+        self._datos = {base: datos[base] for base in bases}
+        self._tablas = {(base, alcance): _tabla(df, alcance) for base, df in self._datos.items() for alcance in ALCANCES
+                        if alcance in df.columns and "Año" in df.columns}
+        self._columnas = {}                                                    # _columnas() de cada tabla, la primera vez que se consulta
+
+    def actualizado(self, datos, cambios):
+        # Cubo de la versión nueva: las bases sin cambios se reutilizan y en las demás solo se recalculan las llaves afectadas
+        nuevo = CuboAgregados.__new__(CuboAgregados)
+        nuevo._datos = {base: datos[base] for base in self._datos}
+        nuevo._tablas = {}
+        nuevo._columnas = {}
+        for (base, alcance), anterior in self._tablas.items():
+            llaves = cambios.llaves.get((base, alcance))
+            if not llaves:                                                     # Mismo contenido por llave: el reacomodo anterior sigue siendo válido
+                nuevo._tablas[(base, alcance)] = anterior
+            else:
+                nuevo._tablas[(base, alcance)] = _retabular(anterior, nuevo._datos[base], alcance, llaves)
+        return nuevo
+
+    def consultar(self, base, alcance, valor, año):
+        # Búsqueda por posición; un alcance sin registros devuelve un Agregado vacío
+        tabla = self._tablas.get((base, alcance))
+        posicion = -1 if tabla is None else posicion_llave(tabla, valor, año)
+        if posicion < 0:
+            return Agregado()
+        inicio, fin = int(tabla["inicios"][posicion]), int(tabla["finales"][posicion])
+        columnas = self._columnas.get((base, alcance))
+        if columnas is None:
+            columnas = self._columnas[(base, alcance)] = _columnas(tabla["ordenado"])
+        return Agregado(
+            filas=fin - inicio,
+            **{nombre: dict(zip(tabla["numericas"], tabla[nombre][posicion].tolist())) for nombre in MATRICES},
+            primeros=_fila(columnas, inicio),
+            instituciones=_distintos(columnas["Institución"], inicio, fin) if "Institución" in columnas else [],
+        )
+
+    def seleccionar(self, base, alcance, valor, año):
+        # Filas del alcance (equivale a df[(df[alcance] == valor) & (df['Año'] == año)] sin recorrer la tabla).
+        # Es una rebanada de la tabla compartida: no copia datos y, con copy-on-write, modificarla nunca altera la original.
+        tabla = self._tablas.get((base, alcance))
+        if tabla is None:
+            return self._datos[base].iloc[:0]
+        posicion = posicion_llave(tabla, valor, año)
+        if posicion < 0:
+            return tabla["ordenado"].iloc[:0]
+        return tabla["ordenado"].iloc[int(tabla["inicios"][posicion]):int(tabla["finales"][posicion])]
+
+    #--------------- Como arreglos y valores de JSON (para guardarlo sin pickle) ---------------#
+    def partes(self):
+        return {"bases": list(self._datos),
+                "tablas": [{"base": base, "alcance": alcance, **tabla} for (base, alcance), tabla in self._tablas.items()]}
+
+    @classmethod
+    def desde_partes(cls, partes, datos):
+        cubo = cls.__new__(cls)
+        cubo._datos = {base: datos[base] for base in partes["bases"]}
+        cubo._tablas = {(tabla.pop("base"), tabla.pop("alcance")): tabla for tabla in partes["tablas"]}
+        cubo._columnas = {}
+        return cubo
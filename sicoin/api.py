@@ -0,0 +1,277 @@
+import argparse
+import json
+import math
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from sicoin.actualizador import Actualizador
+from sicoin.cache import CacheLRU
+from sicoin.metricas import METRICAS
+from sicoin.paquete import IngestaPaquete, ingesta_desde_entorno
+from sicoin.resumen import resumen_ptar, resumen_ptci
+
+
+#================================================== API JSON DE SOLO LECTURA (mismos datos y valores que la app) ==================================================
+# `python -m sicoin.api` levanta un servidor HTTP con la misma ingesta que la app (SICOIN_PAQUETE, SICOIN_FUENTE o Google Drive,
+# con las mismas instantáneas en SICOIN_CACHE) y el mismo actualizador en segundo plano. Los valores salen de las mismas funciones
+# que usan las pestañas PTAR y PTCI y la exportación (sicoin/resumen.py), así que siempre coinciden con lo que muestra la app.
+#   GET /version                                  versión de datos, fecha de publicación y renglones por base
+#   GET /filtros                                  instituciones, sectores y sus años, sectores y siglas (índice de facetas)
+#   GET /ptar?institucion=...&anio=2025           valores de la pestaña PTAR (o ?sector=...&anio=... para un sector)
+#   GET /ptci?institucion=...&anio=2025           valores de la pestaña PTCI (Cumplimiento General de las NGCI, etc.)
+#   GET /actri?institucion=...&anio=2025          renglones de ACTRI del alcance (desde y limite para paginar)
+#   GET /amtri?institucion=...&anio=2025          renglones de AMTRI del alcance (trimestre opcional; desde y limite)
+#   GET /salud, GET /metrics                      estado del actualizador y métricas en formato Prometheus
+# Cada respuesta 200 de datos lleva ETag = versión de datos: con If-None-Match igual (y parámetros válidos) se contesta 304;
+# los errores no llevan ETag, así que nunca se revalidan. El cuerpo JSON ya serializado se guarda en una caché LRU por
+# (ruta, parámetros) que conserva, como la de la app, lo que no cambió entre versiones.
+HOST = os.environ.get("SICOIN_API_HOST", "127.0.0.1")
+PUERTO = int(os.environ.get("SICOIN_API_PUERTO", "8502"))
+LIMITE_RENGLONES = 5000           # Renglones por respuesta de /actri y /amtri como máximo
+
+
+class ErrorAPI(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def _valor(valor):
+    # Tipos de numpy, NaN y fechas de pandas -> tipos de JSON
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    if isinstance(valor, pd.Timestamp):
+        return None if pd.isna(valor) else valor.isoformat()
+    if valor is pd.NaT or valor is pd.NA:
+        return None
+    return valor
+
+
+def _json(objeto):
+    return json.dumps(objeto, ensure_ascii=False, default=_valor).encode("utf-8")
+
+
+#------------------------------------------------ Parámetros ------------------------------------------------#
+def _parametro(parametros, *nombres, requerido=False):
+    for nombre in nombres:
+        if nombre in parametros:
+            return parametros[nombre]
+    if requerido:
+        raise ErrorAPI(400, f"Falta el parámetro {nombres[0]}")
+    return None
+
+
+def _entero(parametros, *nombres, requerido=False, defecto=None):
+    texto = _parametro(parametros, *nombres, requerido=requerido)
+    if texto is None:
+        return defecto
+    try:
+        return int(texto)
+    except ValueError:
+        raise ErrorAPI(400, f"El parámetro {nombres[0]} debe ser un número entero") from None
+
+
+def _filtro(parametros):
+    # (institucion, año, sector) con la convención de la app: sector = "Todas" filtra por institución
+    año = _entero(parametros, "anio", "año", requerido=True)
+    sector = _parametro(parametros, "sector") or "Todas"
+    institucion = _parametro(parametros, "institucion", "institución")
+    if sector == "Todas" and not institucion:
+        raise ErrorAPI(400, "Indique institucion o sector")
+    return institucion, año, sector
+
+
+def alcance_de(parametros):
+    # Alcance del que depende la respuesta (para conservarla en la caché cuando cambian otros alcances)
+    institucion, año, sector = _filtro(parametros)
+    return [("Sector", sector, año)] if sector != "Todas" else [("Institución", institucion, año)]
+
+
+#------------------------------------------------ Respuestas ------------------------------------------------#
+def version(publicacion, parametros):
+    datos = publicacion.datos
+    return {"version": datos.version, "fecha": publicacion.fecha, "filas": {nombre: len(df) for nombre, df in datos.tablas.items()}}
+
+
+def filtros(publicacion, parametros):
+    facetas = publicacion.facetas
+    return {"instituciones": facetas.instituciones, "sectores": facetas.sectores,
+            "años_por_institucion": facetas.años_por_institucion, "años_por_sector": facetas.años_por_sector,
+            "sectores_por_institucion": facetas.sectores_por_institucion, "siglas_por_institucion": facetas.siglas_por_institucion}
+
+
+def _encabezado(institucion, año, sector):
+    if sector != "Todas":
+        return {"alcance": "Sector", "sector": sector, "año": año}
+    return {"alcance": "Institución", "institucion": institucion, "año": año}
+
+
+def ptar(publicacion, parametros):
+    institucion, año, sector = _filtro(parametros)
+    agregado, data = resumen_ptar(publicacion.cubo, institucion, año, sector)
+    if agregado.filas == 0:
+        raise ErrorAPI(404, "No hay registros de PTAR para el alcance indicado")
+    encabezado = _encabezado(institucion, año, sector)
+    if sector != "Todas":
+        encabezado["instituciones"] = agregado.instituciones
+    else:
+        encabezado.update(sector=agregado.primeros.get("Sector"), siglas=agregado.primeros.get("Siglas"))
+    return {**encabezado, "valores": {llave: _valor(valor) for llave, valor in data.items()}}
+
+
+def ptci(publicacion, parametros):
+    institucion, año, sector = _filtro(parametros)
+    resumen = resumen_ptci(publicacion.cubo, institucion, año, sector)
+    if resumen is None:
+        raise ErrorAPI(404, "No hay registros de PTCI para el alcance indicado")
+    cum_ngci, valores_ptci, detalle, seguimiento = resumen
+    return {**_encabezado(institucion, año, sector), "Cumplimiento_General_de_las_NGCI": _valor(cum_ngci),
+            "programa": {llave: _valor(valor) for llave, valor in valores_ptci.items()}, "detalle": detalle, "seguimiento": seguimiento}
+
+
+def _renglones(publicacion, parametros, base):
+    institucion, año, sector = _filtro(parametros)
+    alcance, valor = ("Sector", sector) if sector != "Todas" else ("Institución", institucion)
+    df = publicacion.cubo.seleccionar(base, alcance, valor, año)
+    trimestre = _parametro(parametros, "trimestre")
+    if trimestre is not None and "Trimestre" in df:
+        df = df[df["Trimestre"].astype(str) == trimestre]
+    desde = max(0, _entero(parametros, "desde", defecto=0))
+    limite = min(LIMITE_RENGLONES, max(0, _entero(parametros, "limite", defecto=LIMITE_RENGLONES)))
+    pagina = df.iloc[desde:desde + limite]
+    # to_json serializa el DataFrame completo en C (NaN -> null, fechas ISO) y se inserta tal cual en la respuesta
+    registros = pagina.to_json(orient="records", force_ascii=False, date_format="iso") if len(pagina) else "[]"
+    encabezado = _json({**_encabezado(institucion, año, sector), "total": len(df), "desde": desde})
+    return encabezado[:-1] + b', "registros": ' + registros.encode("utf-8") + b"}"
+
+
+RUTAS = {
+    "/version": (version, None),
+    "/filtros": (filtros, None),
+    "/ptar": (ptar, alcance_de),
+    "/ptci": (ptci, alcance_de),
+    "/actri": (lambda publicacion, parametros: _renglones(publicacion, parametros, "ACTRI"), alcance_de),
+    "/amtri": (lambda publicacion, parametros: _renglones(publicacion, parametros, "AMTRI"), alcance_de),
+}
+
+
+#================================================== SERVIDOR ==================================================
+class Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, direccion, actualizador, cache=None):
+        super().__init__(direccion, Manejador)
+        self.actualizador = actualizador
+        self.cache = cache if cache is not None else CacheLRU()
+        METRICAS.fuente("cache_api", self.cache.estadisticas)
+
+    def publicacion(self):
+        # Una sola lectura de la versión publicada por petición; si solo cambiaron algunos alcances se conservan las demás respuestas
+        publicacion = self.actualizador.actual
+        if publicacion.cambios is not None:
+            self.cache.avanzar(publicacion.version, publicacion.cambios.version_anterior, publicacion.cambios.afectados)
+        return publicacion
+
+    def responder(self, ruta, parametros):
+        # (estado, tipo, cuerpo, etag)
+        if ruta == "/metrics":
+            return 200, "text/plain; version=0.0.4", METRICAS.prometheus().encode("utf-8"), None
+        if ruta == "/salud":
+            return 200, "application/json", _json(self.actualizador.estado()), None
+        if ruta not in RUTAS:
+            raise ErrorAPI(404, f"Ruta desconocida: {ruta}")
+        publicacion = self.publicacion()
+        funcion, alcances = RUTAS[ruta]
+        llave = (ruta,) + tuple(sorted(parametros.items()))
+
+        def calcular():
+            cuerpo = funcion(publicacion, parametros)
+            return cuerpo if isinstance(cuerpo, bytes) else _json(cuerpo)
+
+        cuerpo = self.cache.obtener(publicacion.version, llave, calcular, frozenset(alcances(parametros)) if alcances else None)
+        return 200, "application/json", cuerpo, f'"{publicacion.version}"'
+
+
+def _coincide(etag, if_none_match):
+    # Comparación débil de If-None-Match (RFC 9110): lista separada por comas de etiquetas, con o sin W/, o "*"
+    if not if_none_match:
+        return False
+    etiquetas = [e.strip().removeprefix("W/") for e in if_none_match.split(",")]
+    return "*" in etiquetas or etag.removeprefix("W/") in etiquetas
+
+
+class Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"                 # Conexiones persistentes (keep-alive)
+    server_version = "SICOIN-API"
+    wbufsize = 64 * 1024                          # Encabezados y cuerpo salen en un solo envío...
+    disable_nagle_algorithm = True                # ...y sin esperar el ACK retrasado del cliente (~40 ms por petición)
+
+    def do_GET(self):
+        with METRICAS.tramo("api"):
+            partes = urlsplit(self.path)
+            parametros = {nombre: valores[-1] for nombre, valores in parse_qs(partes.query).items()}
+            try:
+                estado, tipo, cuerpo, etag = self.server.responder(partes.path, parametros)
+            except ErrorAPI as e:
+                estado, tipo, cuerpo, etag = e.estado, "application/json", _json({"error": str(e)}), None
+            except Exception as e:
+                estado, tipo, cuerpo, etag = 500, "application/json", _json({"error": f"{type(e).__name__}: {e}"}), None
+            if etag is not None and _coincide(etag, self.headers.get("If-None-Match")):
+                return self._enviar(304, None, b"", etag)                     # El cliente ya tiene esta versión (y los parámetros son válidos)
+            self._enviar(estado, tipo, cuerpo, etag)
+
+    def _enviar(self, estado, tipo, cuerpo, etag):
+        self.send_response(estado)
+        if tipo:
+            self.send_header("Content-Type", f"{tipo}; charset=utf-8" if tipo == "application/json" else tipo)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")                     # Siempre revalidar (304 si no cambió la versión)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass                                      # Las peticiones se cuentan en METRICAS (tramo "api"), no en la consola
+
+
+def crear_servidor(host=HOST, puerto=PUERTO, actualizador=None):
+    if actualizador is None:
+        ingesta = ingesta_desde_entorno()
+        paquete = {"intervalo_min": ingesta.intervalo_min, "construir": ingesta.construir} if isinstance(ingesta, IngestaPaquete) else {}
+        actualizador = Actualizador(ingesta, **paquete)
+    actualizador.iniciar()                        # Primera carga síncrona; después se actualiza en segundo plano
+    return Servidor((host, puerto), actualizador)
+
+
+#================================================== USO DESDE LA LÍNEA DE COMANDOS ==================================================
+#   python -m sicoin.api [--host 0.0.0.0] [--puerto 8502]
+# Los datos se obtienen como en la app (SICOIN_PAQUETE, SICOIN_FUENTE con una carpeta local o URL, o Google Drive).
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m sicoin.api", description="API JSON de solo lectura con los datos de la app")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    servidor = crear_servidor(args.host, args.puerto)
+    print(f"API de SICOIN en http://{args.host}:{servidor.server_address[1]} (versión {servidor.actualizador.actual.version}, "
+          f"carga {time.perf_counter() - inicio:.1f} s)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.actualizador.detener()
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
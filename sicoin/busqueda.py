@@ -0,0 +1,224 @@
+import bisect
+import math
+from dataclasses import dataclass, fields
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from sicoin.facetas import mascara_llaves
+
+
+#================================================== BÚSQUEDA DE TEXTO EN ACTRI Y AMTRI (índice invertido) ==================================================
+# Cada renglón de ACTRI (Descripción_del_Riesgo y Descripcion de la AC) y cada Acción de Mejora de AMTRI (Procesos y Descripcion;
+# la misma AM reportada en varios trimestres es un solo documento) se parte en términos normalizados: minúsculas, sin acentos
+# ni diéresis (la ñ queda como n), sin etiquetas HTML y sin palabras vacías. Cada término apunta a los documentos que lo
+# contienen con su frecuencia, y la consulta se resuelve con esos arreglos (numpy) y se ordena con BM25. Los postings de todos
+# los términos están en dos arreglos planos (documentos y frecuencias) con el corte de cada término, como en un CSR.
+#   - todos los términos de la consulta deben aparecer; los de 3 letras o más también encuentran palabras que empiezan igual
+#     ("contrat" encuentra "contrato" y "contratación")
+#   - el índice está en segmentos inmutables: con una versión que solo cambió algunas instituciones (sicoin/incremental.py)
+#     se marcan como borrados sus documentos y se agrega un segmento con los nuevos; si hay demasiados segmentos o borrados
+#     se reconstruye completo
+STOPWORDS = frozenset("""a al ante con contra de del desde el en entre la las lo los o para por que se sin sobre su sus un una
+                         unos unas y e u ni es son como mas""".split())
+MAX_SEGMENTOS = 4
+MAX_BORRADOS = 0.3                # Fracción de documentos borrados a partir de la cual conviene reconstruir
+MAX_EXPANSIONES = 64              # Palabras distintas que puede abarcar un prefijo
+K1, B = 1.2, 0.75                 # Parámetros de BM25
+
+# Columnas de cada documento y campos de texto por base (las columnas que falten se dejan vacías)
+CAMPOS = {"ACTRI": ("AC", ["Descripción_del_Riesgo", "Descripcion"]), "AMTRI": ("AM", ["Procesos", "Descripcion"])}
+COLUMNAS = ["Base", "Año", "Institución", "Sector", "Siglas", "Identificador", "Riesgo", "Trimestres", "Texto 1", "Texto 2"]
+TIPOS = {c: "Int16" if c == "Año" else "str" for c in COLUMNAS}             # Sin columnas object: el índice se guarda como arreglos
+
+
+def normalizar(textos):
+    # Serie de textos -> Serie de términos, un renglón por término (el índice es la posición del texto de origen)
+    limpios = (textos.fillna("").astype(str).str.replace(r"<[^>]*>", " ", regex=True).str.lower()
+               .str.normalize("NFKD").str.replace("[\u0300-\u036f]", "", regex=True))
+    terminos = limpios.str.findall(r"[a-z0-9]+").explode().dropna()
+    return terminos[(terminos.str.len() > 1) & ~terminos.isin(STOPWORDS)]
+
+
+def terminos_consulta(consulta):
+    return list(dict.fromkeys(normalizar(pd.Series([consulta], dtype=object))))
+
+
+def _documentos(datos, base, llaves=None):
+    # Un DataFrame con COLUMNAS por documento; si llaves no es None, solo de esas (Institución, Año)
+    df = datos[base]
+    if llaves is not None:
+        df = df[mascara_llaves(df, "Institución", llaves)]
+    identificador, campos = CAMPOS[base]
+    columnas = {c: (df[c].astype(object) if c in df else pd.Series(None, index=df.index, dtype=object))
+                for c in ["Año", "Institución", "Sector", "Siglas", identificador, "Riesgo", "Trimestre"] + campos}
+    docs = pd.DataFrame(columnas)
+    if base == "AMTRI":                                                        # Una AM reportada en varios trimestres es un solo documento
+        claves = ["Año", "Institución", identificador] + campos
+        codigo = docs.groupby(claves, sort=False, dropna=False).ngroup().to_numpy()
+        trimestres = pd.Series("", index=range(codigo.max() + 1 if len(codigo) else 0), dtype=object)
+        for trimestre in sorted(docs["Trimestre"].dropna().unique(), key=str):
+            presente = np.zeros(len(trimestres), dtype=bool)
+            presente[codigo[(docs["Trimestre"] == trimestre).to_numpy()]] = True
+            trimestres[presente] += f", {trimestre}"
+        primeros = ~pd.Series(codigo).duplicated().to_numpy()
+        docs = docs[primeros].assign(Trimestres=trimestres.str[2:].replace("", None).to_numpy()[codigo[primeros]])
+    else:
+        docs["Trimestres"] = None
+    return pd.DataFrame({"Base": base, "Año": docs["Año"], "Institución": docs["Institución"], "Sector": docs["Sector"],
+                         "Siglas": docs["Siglas"], "Identificador": docs[identificador], "Riesgo": docs["Riesgo"],
+                         "Trimestres": docs["Trimestres"], "Texto 1": docs[campos[0]], "Texto 2": docs[campos[1]]}).reset_index(drop=True).astype(TIPOS)
+
+
+@dataclass(frozen=True)
+class Segmento:
+    documentos: pd.DataFrame      # COLUMNAS, un renglón por documento (su posición es el id dentro del segmento)
+    longitudes: np.ndarray        # Términos por documento (BM25)
+    vocabulario: pa.Array         # Términos ordenados (bisección para el término exacto y los prefijos)
+    cortes: np.ndarray            # Postings del término i: docs[cortes[i]:cortes[i + 1]] (len(vocabulario) + 1 posiciones)
+    docs: np.ndarray              # Ids de documento int32, por término y después por documento
+    frecuencias: np.ndarray       # Veces que aparece el término en cada documento (int32)
+
+
+def _segmento(documentos):
+    # Los textos se repiten mucho (la misma descripción en varios años o instituciones) y las palabras todavía más: se separa cada
+    # texto distinto en palabras con pyarrow y solo se normaliza cada palabra distinta
+    texto = documentos["Texto 1"].fillna("").astype(str) + " " + documentos["Texto 2"].fillna("").astype(str)
+    codigos, unicos = pd.factorize(texto)
+    limpios = pd.Series(unicos, dtype=object).str.replace(r"<[^>]*>", " ", regex=True).str.lower()
+    palabras = pc.utf8_split_whitespace(pa.array(limpios, type=pa.large_string()))
+    palabra, crudas = pd.factorize(pc.list_flatten(palabras).to_numpy(zero_copy_only=False))
+    por_palabra = normalizar(pd.Series(crudas, dtype=object))                 # Una palabra puede dar varios términos ("riesgo/control")
+    termino, vocabulario = pd.factorize(por_palabra.to_numpy(), sort=True)
+
+    # Frecuencia de cada término en cada texto distinto y después en cada documento (cada documento tiene un solo texto)
+    ocurrencias = pd.DataFrame({"texto": np.asarray(pc.list_parent_indices(palabras)), "palabra": palabra}).merge(
+        pd.DataFrame({"palabra": por_palabra.index.to_numpy(), "termino": termino}), on="palabra")
+    por_texto = ocurrencias.groupby(["texto", "termino"], sort=False).size()
+    textos = por_texto.index.get_level_values(0).to_numpy()
+    longitudes = np.bincount(textos, weights=por_texto.to_numpy(), minlength=len(unicos))[codigos]
+
+    orden = np.argsort(codigos, kind="stable")                                 # Documentos agrupados por texto
+    inicios = np.searchsorted(codigos[orden], np.arange(len(unicos) + 1))
+    repeticiones = np.diff(inicios)[textos]                                    # Documentos con el texto de cada par (texto, término)
+    desplazamiento = np.arange(repeticiones.sum()) - np.repeat(np.cumsum(repeticiones) - repeticiones, repeticiones)
+    docs = orden[np.repeat(inicios[textos], repeticiones) + desplazamiento]
+    terminos = np.repeat(por_texto.index.get_level_values(1).to_numpy(), repeticiones)
+    frecuencias = np.repeat(por_texto.to_numpy(dtype=np.int32), repeticiones)
+    orden = np.lexsort((docs, terminos))
+    docs, terminos, frecuencias = docs[orden].astype(np.int32), terminos[orden], frecuencias[orden]
+    cortes = np.searchsorted(terminos, np.arange(len(vocabulario) + 1)).astype(np.int64)
+    return Segmento(documentos, longitudes.astype(np.int32), pa.array(list(vocabulario), type=pa.string()), cortes, docs, frecuencias)
+
+
+def _texto(escalar):
+    return escalar.as_py()
+
+
+def _expandir(segmento, termino):
+    # Rango [inicio, fin) del vocabulario con el término exacto y, si tiene 3 letras o más, las palabras que empiezan con él
+    vocabulario = segmento.vocabulario
+    inicio = bisect.bisect_left(vocabulario, termino, key=_texto)
+    if len(termino) < 3:
+        return inicio, inicio + int(inicio < len(vocabulario) and vocabulario[inicio].as_py() == termino)
+    fin = bisect.bisect_left(vocabulario, termino + "\uffff", inicio, key=_texto)
+    return inicio, min(fin, inicio + MAX_EXPANSIONES)
+
+
+class IndiceTexto:
+    def __init__(self, segmentos, vivos):
+        self.segmentos = tuple(segmentos)
+        self.vivos = tuple(vivos)                                              # Un arreglo booleano por segmento (False = borrado)
+        self.documentos = sum(int(v.sum()) for v in self.vivos)
+        total = sum(int(s.longitudes[v].sum()) for s, v in zip(self.segmentos, self.vivos))
+        self.longitud_media = total / self.documentos if self.documentos else 0.0
+
+    @classmethod
+    def construir(cls, datos):
+        documentos = pd.concat([_documentos(datos, base) for base in CAMPOS if base in datos.tablas], ignore_index=True)
+        segmento = _segmento(documentos)
+        return cls([segmento], [np.ones(len(documentos), dtype=bool)])
+
+    def actualizado(self, datos, cambios):
+        # Borra los documentos de las (Institución, Año) afectadas y los vuelve a indexar en un segmento nuevo
+        llaves = {base: cambios.llaves.get((base, "Institución")) for base in CAMPOS}
+        if not any(llaves.values()):
+            return self
+        vivos = []
+        for segmento, vivo in zip(self.segmentos, self.vivos):
+            docs = segmento.documentos
+            borrar = np.zeros(len(docs), dtype=bool)
+            for base, afectadas in llaves.items():
+                if afectadas:
+                    borrar |= (docs["Base"] == base).to_numpy() & mascara_llaves(docs, "Institución", afectadas)
+            vivos.append(vivo & ~borrar)
+        nuevos = pd.concat([_documentos(datos, base, afectadas) for base, afectadas in llaves.items() if afectadas], ignore_index=True)
+        segmentos = list(self.segmentos) + [_segmento(nuevos)]
+        vivos.append(np.ones(len(nuevos), dtype=bool))
+
+        borrados = sum(int((~v).sum()) for v in vivos) / max(1, sum(len(v) for v in vivos))
+        if len(segmentos) > MAX_SEGMENTOS or borrados > MAX_BORRADOS:
+            return IndiceTexto.construir(datos)
+        return IndiceTexto(segmentos, vivos)
+
+    #--------------- Como arreglos y valores de JSON (para guardarlo sin pickle) ---------------#
+    def partes(self):
+        return {"segmentos": [{campo.name: getattr(segmento, campo.name) for campo in fields(Segmento)} for segmento in self.segmentos],
+                "vivos": list(self.vivos)}
+
+    @classmethod
+    def desde_partes(cls, partes):
+        return cls([Segmento(**segmento) for segmento in partes["segmentos"]], partes["vivos"])
+
+    def buscar(self, consulta, limite=50, base=None):
+        # DataFrame de los mejores `limite` documentos (Puntaje + COLUMNAS), del más al menos relevante
+        terminos = terminos_consulta(consulta)
+        if not terminos or not self.documentos:
+            return pd.DataFrame(columns=["Puntaje"] + COLUMNAS)
+
+        # Documentos (vivos) con cada término en cada segmento, para el idf global
+        coincidencias = []
+        for segmento, vivo in zip(self.segmentos, self.vivos):
+            por_termino = []
+            for termino in terminos:
+                inicio, fin = _expandir(segmento, termino)
+                if inicio == fin:
+                    por_termino.append(None)
+                    continue
+                postings = slice(segmento.cortes[inicio], segmento.cortes[fin])          # Los términos del rango son contiguos
+                docs, frecuencias = segmento.docs[postings], segmento.frecuencias[postings]
+                docs, inversa = np.unique(docs, return_inverse=True)           # Varias palabras del mismo prefijo en un documento
+                frecuencias = np.bincount(inversa, weights=frecuencias)
+                validos = vivo[docs]
+                por_termino.append((docs[validos], frecuencias[validos]))
+            coincidencias.append(por_termino)
+
+        n = self.documentos
+        idf = [math.log(1 + (n - df + 0.5) / (df + 0.5))
+               for df in (sum(len(p[i][0]) for p in coincidencias if p[i] is not None) for i in range(len(terminos)))]
+
+        resultados = []
+        for segmento, vivo, por_termino in zip(self.segmentos, self.vivos, coincidencias):
+            if any(p is None for p in por_termino):                            # Todos los términos deben aparecer
+                continue
+            puntajes = np.zeros(len(vivo))
+            encontrados = np.zeros(len(vivo), dtype=np.int32)
+            normal = K1 * (1 - B + B * segmento.longitudes / (self.longitud_media or 1))
+            for (docs, frecuencias), peso in zip(por_termino, idf):
+                puntajes[docs] += peso * frecuencias * (K1 + 1) / (frecuencias + normal[docs])
+                encontrados[docs] += 1
+            candidatos = np.flatnonzero(encontrados == len(terminos))
+            if base is not None:
+                candidatos = candidatos[(segmento.documentos["Base"].to_numpy()[candidatos] == base)]
+            if len(candidatos) > limite:
+                candidatos = candidatos[np.argpartition(-puntajes[candidatos], limite)[:limite]]
+            if len(candidatos):
+                resultados.append(segmento.documentos.iloc[candidatos].assign(Puntaje=puntajes[candidatos].round(3)))
+
+        if not resultados:
+            return pd.DataFrame(columns=["Puntaje"] + COLUMNAS)
+        hits = pd.concat(resultados, ignore_index=True)
+        orden = ["Puntaje", "Año", "Siglas", "Identificador"]
+        return hits.sort_values(orden, ascending=[False, False, True, True], kind="stable").head(limite)[["Puntaje"] + COLUMNAS].reset_index(drop=True)
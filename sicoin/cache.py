@@ -0,0 +1,138 @@
+import dataclasses
+import functools
+import os
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+
+
+#============================================ CACHÉ COMPARTIDA DE RESULTADOS (LRU) ENTRE TODAS LAS SESIONES ============================================
+# Guarda los resultados de las funciones que construyen las vistas (encabezados, tablas HTML, diccionarios de datos y reportes).
+# Cada entrada se guarda con la versión de los datos con que se calculó. Cuando cambian los datos hay sesiones que siguen en la
+# versión anterior y otras que ya están en la nueva, así que se conservan las VERSIONES_VIVAS más recientes y ninguna desplaza
+# las entradas de la otra; al llegar una versión más, se descartan las entradas de la más antigua. Si la versión nueva trae
+# los alcances que cambiaron (avanzar), las entradas de la anterior que no dependen de ellos pasan a la nueva.
+# Se limita por número de entradas y por tamaño aproximado; al rebasar cualquiera se descartan las menos usadas recientemente.
+MAX_ENTRADAS = int(os.environ.get("SICOIN_CACHE_ENTRADAS", "2000"))
+MAX_MB = float(os.environ.get("SICOIN_CACHE_MB", "64"))
+VERSIONES_VIVAS = 2
+
+
+def _tamaño(valor):
+    # Tamaño aproximado en bytes (los resultados son sobre todo cadenas HTML, números y diccionarios pequeños)
+    if isinstance(valor, str):
+        return len(valor) + 50
+    if isinstance(valor, bytes):                                               # Libros de Excel exportados
+        return len(valor) + 33
+    if isinstance(valor, (tuple, list)):
+        return 56 + sum(_tamaño(v) for v in valor)
+    if isinstance(valor, (dict, MappingProxyType)):
+        return 64 + sum(_tamaño(k) + _tamaño(v) for k, v in valor.items())
+    if hasattr(valor, "memory_usage"):                                         # DataFrame/Series (p. ej. los reportes anuales)
+        uso = valor.memory_usage(index=True, deep=True)
+        return int(uso.sum() if hasattr(uso, "sum") else uso)
+    if dataclasses.is_dataclass(valor) and not isinstance(valor, type):
+        return 56 + sum(_tamaño(getattr(valor, campo.name)) for campo in dataclasses.fields(valor))
+    return 32
+
+
+class CacheLRU:
+    def __init__(self, max_entradas=MAX_ENTRADAS, max_mb=MAX_MB):
+        self.max_entradas = max_entradas
+        self.max_bytes = int(max_mb * 2**20)
+        self.version = None                                                     # La versión más reciente que se ha visto
+        self.aciertos = 0
+        self.fallos = 0
+        self.descartes = 0
+        self.invalidaciones = 0
+        self.conservadas = 0                                                    # Entradas que pasaron a una versión nueva
+        self._entradas = OrderedDict()                                         # {(versión, llave): (valor, tamaño, alcances)}
+        self._vivas = []                                                       # Versiones con entradas, de la más antigua a la más nueva
+        self._bytes = 0
+        self._candado = threading.Lock()
+
+    def _registrar(self, version):
+        # Una versión que no se había visto es la más nueva; las que salen de las VERSIONES_VIVAS pierden sus entradas.
+        # Una versión que ya se vio (una sesión que sigue en la anterior) no cambia nada.
+        if version in self._vivas:
+            return
+        self._vivas.append(version)
+        self.version = version
+        while len(self._vivas) > VERSIONES_VIVAS:
+            vieja = self._vivas.pop(0)
+            descartadas = [llave for llave in self._entradas if llave[0] == vieja]
+            if descartadas:
+                self.invalidaciones += 1
+            for llave in descartadas:
+                self._bytes -= self._entradas.pop(llave)[1]
+
+    def avanzar(self, version, anterior=None, afectados=None):
+        # Registra `version` y le pasa las entradas de `anterior` que no dependen de ningún alcance afectado (las que sí
+        # dependen se quedan en `anterior` para las sesiones que todavía la usan). Si `version` ya se había visto no hace nada.
+        with self._candado:
+            if version in self._vivas:
+                return
+            if afectados is not None and anterior in self._vivas:
+                entradas = OrderedDict()
+                for (v, llave), entrada in self._entradas.items():
+                    if v == anterior and entrada[2] is not None and afectados.isdisjoint(entrada[2]):
+                        v = version
+                        self.conservadas += 1
+                    entradas[(v, llave)] = entrada
+                self._entradas = entradas
+            self._registrar(version)
+
+    def obtener(self, version, llave, calcular, alcances=None):
+        # alcances: {(alcance, valor, año)} de los que depende el resultado, o None si depende de todos los datos
+        llave = (version, llave)
+        with self._candado:
+            self._registrar(version)
+            if llave in self._entradas:
+                self._entradas.move_to_end(llave)
+                self.aciertos += 1
+                return self._entradas[llave][0]
+            self.fallos += 1
+
+        # Se calcula fuera del candado para no bloquear a otras sesiones
+        valor = calcular()
+        tamaño = _tamaño(valor)
+        with self._candado:
+            if version in self._vivas and llave not in self._entradas:
+                self._entradas[llave] = (valor, tamaño, alcances)
+                self._bytes += tamaño
+                while self._entradas and (len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes):
+                    _, (_, descartado, _) = self._entradas.popitem(last=False)
+                    self._bytes -= descartado
+                    self.descartes += 1
+        return valor
+
+    def limpiar(self):
+        with self._candado:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estadisticas(self):
+        with self._candado:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+                "descartes": self.descartes,
+                "invalidaciones": self.invalidaciones,
+                "conservadas": self.conservadas,
+            }
+
+
+def memorizar(cache, version, alcances=None):
+    # Decorador: la llave es (nombre de la función, argumentos) y la versión se obtiene al momento de cada llamada.
+    # alcances(*args) indica de qué alcances depende el resultado; sin ella, cualquier cambio de datos lo descarta
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args):
+            return cache.obtener(version(), (funcion.__name__,) + args, lambda: funcion(*args),
+                                 frozenset(alcances(*args)) if alcances else None)
+        return envoltura
+    return decorador
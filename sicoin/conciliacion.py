@@ -0,0 +1,200 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from sicoin.esquema import estados, trimestres
+from sicoin.facetas import ALCANCES, mascara_llaves, ordenar_llaves, posicion_llave
+
+
+#================================================== CONCILIACIÓN DE LAS BASES (una vez por versión de datos) ==================================================
+# Cruza las cuatro bases para todos los alcances (Institución × Año y Sector × Año) con unos cuantos groupby por base:
+#   - AC_PTAR_ACTRI:    Acciones de Control del PTAR (AC_Total) contra los renglones de ACTRI (el aviso de la pestaña PTAR)
+#   - AM_PTCI_AMTRI:    Acciones de Mejora del programa actualizado (PTCI) contra las Acciones de Mejora distintas de AMTRI
+#   - AM_REGISTRADAS:   Acciones de Mejora Registradas (AMTRI) contra los renglones de AMTRI
+#   - ESTATUS_AC_T{n}:  Sin avances + En proceso + Concluidas del trimestre contra AC_Total (PTAR)
+#   - ESTATUS_AM_T{n}:  lo mismo contra el total de Acciones de Mejora del programa actualizado (PTCI)
+# Los valores siguen las reglas de las pestañas: en PTAR una institución toma su primer registro y un sector la suma; en PTCI
+# y AMTRI siempre se suma. Los trimestres que todavía no se reportan (estatus en 0) no se comparan.
+# El resultado es un índice de discrepancias ordenado por alcance: cada vista encuentra su rango por posición (posicion_llave).
+COLUMNAS = ["Alcance", "Nombre", "Año", "Regla", "Descripción", "Esperado", "Encontrado", "Diferencia"]
+ESTATUS = [e for e in estados if e != "Cumplimiento"]
+TOTAL_AM = "TotalAcciones_de_Mejora_Programa_Actualizado"
+
+
+@dataclass(frozen=True)
+class Regla:
+    nombre: str
+    descripcion: str
+    esperado: str                 # Columna de la tabla de totales por alcance
+    encontrado: str
+    omitir_sin_reporte: bool = False   # No compara si `encontrado` es 0 (trimestre sin reportar)
+
+
+REGLAS = [
+    Regla("AC_PTAR_ACTRI", "Acciones de Control del PTAR (AC_Total) contra renglones de ACTRI", "PTAR.AC_Total", "ACTRI.renglones"),
+    Regla("AM_PTCI_AMTRI", "Acciones de Mejora del programa actualizado (PTCI) contra Acciones de Mejora distintas en AMTRI",
+          f"PTCI.{TOTAL_AM}", "AMTRI.acciones"),
+    Regla("AM_REGISTRADAS", "Acciones de Mejora Registradas (AMTRI) contra renglones de AMTRI", "AMTRI.Registradas", "AMTRI.renglones"),
+    *[Regla(f"ESTATUS_AC_T{t}", f"Trimestre {t}: Sin avances + En proceso + Concluidas contra AC_Total (PTAR)",
+            "PTAR.AC_Total", f"PTAR.estatus_{t}", True) for t in trimestres],
+    *[Regla(f"ESTATUS_AM_T{t}", f"Trimestre {t}: Sin avances + En proceso + Concluidas contra Acciones de Mejora del programa (PTCI)",
+            f"PTCI.{TOTAL_AM}", f"PTCI.estatus_{t}", True) for t in trimestres],
+]
+
+
+def _por_alcance(df, alcance, columnas, primero):
+    # Totales por (valor, año): primer registro (como la pestaña PTAR para una institución) o suma
+    columnas = [c for c in columnas if c in df.columns]
+    claves = [alcance, "Año"]
+    if primero:
+        tabla = df.dropna(subset=claves).drop_duplicates(claves).set_index(claves)[columnas]   # Sin los renglones sin año (como groupby)
+    else:
+        tabla = df[claves + columnas].groupby(claves, observed=True, sort=False)[columnas].sum()
+    return tabla.astype("float64").fillna(0)
+
+
+def _estatus(tabla, base):
+    # Suma de los estatus de cada trimestre (sin Cumplimiento, que es un porcentaje)
+    return pd.DataFrame({f"{base}.estatus_{t}": tabla[[f"{t}{e}" for e in ESTATUS if f"{t}{e}" in tabla]].sum(axis=1)
+                         for t in trimestres}, index=tabla.index)
+
+
+def totales(datos, alcance):
+    # Tabla con una fila por (valor, año) y una columna por cada total que usan las REGLAS (vacíos = 0)
+    columnas_estatus = [f"{t}{e}" for t in trimestres for e in ESTATUS]
+    partes = []
+    ptar, actri, ptci, amtri = (datos[base] for base in ("PTAR", "ACTRI", "PTCI", "AMTRI"))
+    if alcance in ptar:
+        tabla = _por_alcance(ptar, alcance, ["AC_Total"] + columnas_estatus, primero=alcance == "Institución")
+        partes += [tabla[["AC_Total"]].add_prefix("PTAR."), _estatus(tabla, "PTAR")]
+    if alcance in actri:
+        partes.append(actri.groupby([alcance, "Año"], observed=True, sort=False).size().rename("ACTRI.renglones").to_frame())
+    if alcance in ptci:
+        tabla = _por_alcance(ptci, alcance, [TOTAL_AM] + columnas_estatus, primero=False)
+        partes += [tabla[[c for c in [TOTAL_AM] if c in tabla]].add_prefix("PTCI."), _estatus(tabla, "PTCI")]
+    if alcance in amtri:
+        grupos = amtri.groupby([alcance, "Año"], observed=True, sort=False)
+        partes.append(grupos.size().rename("AMTRI.renglones").to_frame())
+        if "Registradas" in amtri:
+            partes.append(grupos["Registradas"].sum().astype("float64").rename("AMTRI.Registradas").to_frame())
+        if "AM" in amtri:                                                      # Una Acción de Mejora reportada en varios trimestres cuenta una vez
+            distintas = amtri.dropna(subset=["AM"]).drop_duplicates(list(dict.fromkeys([alcance, "Año", "Institución", "AM"])))
+            partes.append(distintas.groupby([alcance, "Año"], observed=True, sort=False).size().rename("AMTRI.acciones").to_frame())
+    if not partes:
+        return pd.DataFrame()
+    tabla = pd.concat(partes, axis=1).fillna(0)                                # Un alcance sin renglones en una base tiene 0 en esa base
+    tabla.index = tabla.index.set_names(["Nombre", "Año"])
+    return tabla
+
+
+def _discrepancias(tabla, alcance):
+    filas = []
+    for regla in REGLAS:
+        if regla.esperado not in tabla or regla.encontrado not in tabla:
+            continue
+        esperado = tabla[regla.esperado].round().astype("int64")
+        encontrado = tabla[regla.encontrado].round().astype("int64")
+        distinto = esperado != encontrado
+        if regla.omitir_sin_reporte:
+            distinto &= encontrado != 0
+        if distinto.any():
+            sub = tabla.index[distinto.to_numpy()].to_frame(index=False)
+            filas.append(sub.assign(Alcance=alcance, Regla=regla.nombre, Descripción=regla.descripcion,
+                                    Esperado=esperado[distinto].to_numpy(), Encontrado=encontrado[distinto].to_numpy()))
+    if not filas:
+        return pd.DataFrame(columns=COLUMNAS)
+    resultado = pd.concat(filas, ignore_index=True)
+    resultado["Nombre"] = resultado["Nombre"].astype("str")
+    resultado["Diferencia"] = resultado["Encontrado"] - resultado["Esperado"]
+    return resultado[COLUMNAS]
+
+
+@dataclass(frozen=True)
+class Conciliacion:
+    discrepancias: pd.DataFrame   # Una fila por (alcance, nombre, año, regla) que no cuadra, ordenadas por alcance
+    alcances: int                 # Alcances revisados
+    _rangos: dict = field(repr=False, default_factory=dict)    # {alcance: llaves (nombre, año) con su rango [inicio, fin) en discrepancias}
+
+    @property
+    def con_discrepancias(self):
+        return sum(len(rangos["inicios"]) for rangos in self._rangos.values())
+
+    def de(self, alcance, valor, año):
+        # Discrepancias de un alcance (rebanada sin copia; vacía si todo cuadra)
+        rangos = self._rangos.get(alcance)
+        posicion = -1 if rangos is None else posicion_llave(rangos, valor, año)
+        if posicion < 0:
+            return self.discrepancias.iloc[:0]
+        return self.discrepancias.iloc[int(rangos["inicios"][posicion]):int(rangos["finales"][posicion])]
+
+    def cuadra(self, alcance, valor, año, regla):
+        discrepancias = self.de(alcance, valor, año)
+        return not (discrepancias["Regla"] == regla).any()
+
+    def resumen(self):
+        # Discrepancias por regla y alcance
+        return (self.discrepancias.groupby(["Regla", "Alcance"], sort=False).size().unstack(fill_value=0)
+                .reindex([r.nombre for r in REGLAS], fill_value=0).reindex(columns=list(ALCANCES), fill_value=0))
+
+    def csv(self):
+        return self.discrepancias.to_csv(index=False).encode("utf-8-sig")     # BOM para que Excel respete los acentos
+
+    #--------------- Como arreglos y valores de JSON (para guardarlo sin pickle) ---------------#
+    def partes(self):
+        return {"discrepancias": self.discrepancias, "alcances": self.alcances,
+                "rangos": [{"alcance": alcance, **rangos} for alcance, rangos in self._rangos.items()]}
+
+    @classmethod
+    def desde_partes(cls, partes):
+        return cls(partes["discrepancias"], partes["alcances"], {rangos.pop("alcance"): rangos for rangos in partes["rangos"]})
+
+
+def _indexar(discrepancias, revisados):
+    # Ordena por alcance y guarda, por alcance, las llaves (nombre, año) con el rango [inicio, fin) de cada una.
+    # Las filas de un alcance son contiguas y ya vienen en el orden de ordenar_llaves, así que basta desplazar sus rangos.
+    discrepancias = discrepancias.sort_values(["Alcance", "Nombre", "Año"], kind="stable").reset_index(drop=True)
+    rangos = {}
+    for alcance in ALCANCES:
+        filas = np.flatnonzero((discrepancias["Alcance"] == alcance).to_numpy())
+        if len(filas):
+            _, llaves = ordenar_llaves(discrepancias["Nombre"].iloc[filas], discrepancias["Año"].iloc[filas])
+            rangos[alcance] = {**llaves, "inicios": llaves["inicios"] + filas[0], "finales": llaves["finales"] + filas[0]}
+    return Conciliacion(discrepancias, revisados, rangos)
+
+
+def _unir(partes):
+    partes = [p for p in partes if len(p)]
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=COLUMNAS)
+
+
+def conciliar(datos):
+    partes, revisados = [], 0
+    for alcance in ALCANCES:
+        tabla = totales(datos, alcance)
+        revisados += len(tabla)
+        partes.append(_discrepancias(tabla, alcance))
+    return _indexar(_unir(partes), revisados)
+
+
+def _contar_alcances(datos, alcance):
+    # (valor, año) distintos en cualquiera de las bases (lo mismo que len(totales(datos, alcance)), sin calcular los totales)
+    llaves = [df[[alcance, "Año"]].astype({alcance: object}) for df in datos.tablas.values() if alcance in df]
+    return len(pd.concat(llaves).dropna().drop_duplicates()) if llaves else 0
+
+
+def conciliar_cambios(anterior, datos, cambios):
+    # Solo vuelve a revisar los alcances afectados (sicoin/incremental.py); las discrepancias de los demás se conservan
+    partes, revisados = [], 0
+    conservar = np.ones(len(anterior.discrepancias), dtype=bool)
+    for alcance in ALCANCES:
+        revisados += _contar_alcances(datos, alcance)
+        llaves = set().union(*(llaves for (_, a), llaves in cambios.llaves.items() if a == alcance))
+        if not llaves:
+            continue
+        subconjunto = {base: df[mascara_llaves(df, alcance, llaves)] if alcance in df else df.iloc[:0] for base, df in datos.tablas.items()}
+        partes.append(_discrepancias(totales(subconjunto, alcance), alcance))
+        previas = anterior.discrepancias
+        conservar &= ~((previas["Alcance"] == alcance).to_numpy()
+                       & mascara_llaves(previas.rename(columns={"Nombre": alcance}), alcance, llaves))
+    return _indexar(_unir([anterior.discrepancias[conservar]] + partes), revisados)
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import gdown
+
+from sicoin.metricas import METRICAS
+
+#================================================== DIRECTORIO DE TRABAJO PARA DESCARGAS Y CACHÉS ==================================================
+DIRECTORIO_TRABAJO = os.environ.get("SICOIN_CACHE", ".sicoin")
+
+
+#================================================== ARCHIVOS DE SICOIN EN GOOGLE DRIVE ==================================================
+ARCHIVOS = {
+    "PTAR.xlsx": "1U2vlwj4cVRiMUc9v9WECXZQ1cYVby0mr",      # PTAR BASE
+    "ACTRI.xlsx": "1Ix69LpGafKmqfmePZaaWcQ9dsmURiRfT",     # ACTRI BASE
+    "PTCI.xlsx": "1FTsOOyJqIYZf-6n6Mz0yPbPW49IM5aup",      # PTCI BASE
+    "AMTRI.xlsx": "1fRoHNDgNYMyckXaKidVcRcpD9LAymX3-"      # AMTRI BASE
+}
+
+
+#============================================ FUENTES DE DATOS (Google Drive, carpeta local o servidor HTTP) ============================================
+# Todas las fuentes exponen la misma interfaz:
+#   - nombres():                 lista de archivos que ofrece la fuente
+#   - huella(nombre):            cadena barata que cambia cuando cambia el archivo (tamaño/fecha/etag), o None si no se puede saber
+#   - descargar(nombre, ruta):   copia el archivo completo a la ruta indicada
+
+def _huella_http(url):
+    # Consulta solo los encabezados (HEAD) para no transferir el archivo
+    try:
+        peticion = urllib.request.Request(url, method="HEAD")
+        with urllib.request.urlopen(peticion, timeout=15) as respuesta:
+            partes = [respuesta.headers.get(h) for h in ("ETag", "Last-Modified", "Content-Length")]
+    except Exception:
+        return None
+    if not any(partes):
+        return None
+    return "|".join(p or "" for p in partes)
+
+
+class FuenteDrive:
+    def __init__(self, ids):
+        self.ids = dict(ids)                                                   # {"PTAR.xlsx": "<id de Drive>", ...}
+
+    def nombres(self):
+        return list(self.ids)
+
+    def huella(self, nombre):
+        return _huella_http(f"https://drive.usercontent.google.com/download?id={self.ids[nombre]}&export=download")
+
+    def descargar(self, nombre, ruta):
+        gdown.download(f"https://drive.google.com/uc?id={self.ids[nombre]}", ruta, quiet=True)
+
+
+class FuenteDirectorio:
+    def __init__(self, directorio, nombres):
+        self.directorio = directorio
+        self._nombres = list(nombres)
+
+    def nombres(self):
+        return list(self._nombres)
+
+    def huella(self, nombre):
+        info = os.stat(os.path.join(self.directorio, nombre))
+        return f"{info.st_size}|{info.st_mtime_ns}"
+
+    def descargar(self, nombre, ruta):
+        shutil.copyfile(os.path.join(self.directorio, nombre), ruta)
+
+
+class FuenteHTTP:
+    def __init__(self, url_base, nombres):
+        self.url_base = url_base.rstrip("/")
+        self._nombres = list(nombres)
+
+    def nombres(self):
+        return list(self._nombres)
+
+    def huella(self, nombre):
+        return _huella_http(f"{self.url_base}/{nombre}")
+
+    def descargar(self, nombre, ruta):
+        with urllib.request.urlopen(f"{self.url_base}/{nombre}", timeout=60) as respuesta, open(ruta, "wb") as salida:
+            shutil.copyfileobj(respuesta, salida)
+
+
+def fuente_desde_entorno(archivos):
+    # SICOIN_FUENTE permite sustituir Drive por una carpeta local o un servidor HTTP (p. ej. en pruebas)
+    origen = os.environ.get("SICOIN_FUENTE", "").strip()
+    if not origen:
+        return FuenteDrive(archivos)
+    if origen.startswith(("http://", "https://")):
+        return FuenteHTTP(origen, archivos)
+    return FuenteDirectorio(origen, archivos)
+
+
+#============================================ SINCRONIZACIÓN CONCURRENTE Y DETECCIÓN DE CAMBIOS ============================================
+@dataclass(frozen=True)
+class ArchivoSincronizado:
+    nombre: str
+    ruta: str
+    sha256: str
+    cambiado: bool          # True si el contenido es distinto al de la última sincronización
+    descargado: bool        # True si hubo transferencia (False cuando la huella no cambió)
+
+
+def _sha256(ruta):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+class Descargador:
+    def __init__(self, fuente, destino=None):
+        self.fuente = fuente
+        self.destino = destino or os.path.join(DIRECTORIO_TRABAJO, "descargas")
+        os.makedirs(self.destino, exist_ok=True)
+        self._ruta_estado = os.path.join(self.destino, "huellas.json")
+        self._candado = threading.Lock()
+        try:
+            with open(self._ruta_estado, encoding="utf-8") as f:
+                self.estado = json.load(f)                                     # {nombre: {"huella": ..., "sha256": ...}}
+        except (OSError, ValueError):
+            self.estado = {}
+
+    def _sincronizar_uno(self, nombre):
+        ruta = os.path.join(self.destino, nombre)
+        previo = self.estado.get(nombre)
+        huella = self.fuente.huella(nombre)
+
+        # Si la fuente confirma que no hubo cambios y el archivo sigue en disco, no se descarga de nuevo
+        if huella is not None and previo and previo.get("huella") == huella and os.path.exists(ruta):
+            return ArchivoSincronizado(nombre, ruta, previo["sha256"], cambiado=False, descargado=False)
+
+        # Descarga a un archivo temporal y lo publica al final para no dejar archivos a medias
+        temporal = f"{ruta}.parcial"
+        with METRICAS.tramo("descarga"):
+            self.fuente.descargar(nombre, temporal)
+        sha = _sha256(temporal)
+        os.replace(temporal, ruta)
+        with self._candado:
+            self.estado[nombre] = {"huella": huella, "sha256": sha}
+        return ArchivoSincronizado(nombre, ruta, sha, cambiado=not previo or previo.get("sha256") != sha, descargado=True)
+
+    @METRICAS.medir("sincronizacion")
+    def sincronizar(self):
+        # Descarga todos los archivos en paralelo: el tiempo total queda acotado por el archivo más lento
+        nombres = self.fuente.nombres()
+        with ThreadPoolExecutor(max_workers=max(1, len(nombres))) as pool:
+            resultados = dict(zip(nombres, pool.map(self._sincronizar_uno, nombres)))
+        with self._candado:
+            temporal = f"{self._ruta_estado}.parcial"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(self.estado, f, indent=2)
+            os.replace(temporal, self._ruta_estado)
+        return resultados
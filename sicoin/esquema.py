@@ -0,0 +1,162 @@
+import argparse
+import logging
+import os
+
+import pandas as pd
+
+
+#================================== NOMBRES DE LAS VARIABLES QUE USAN LOS REPORTES (PTAR, PTCI y AMTRI) ==================================
+risk_cols = ['Sustantivo','Administrativo','Financiero','Presupuestal','Servicios', 'Seguridad','Obra_Pública','Recursos_Humanos','Imagen','TICs','Salud', 'Otro','Corrupción','Legal']
+cuadrante_cols = ['I','II','III','IV']
+estrategia_cols = ['Evitar','Reducir','Asumir','Transferir','Compartir']
+estados = ['Sin_Avances', 'En_Proceso', 'Concluidas', 'Cumplimiento']
+trimestres = ['1', '2', '3', '4']
+detalle_cols = ["Registradas", "Localizadas", "No_localizadas", "Suficientes", "Parcielmente_Suficientes", "Insuficientes"]
+
+columnas_estado = [f"{t}{e}" for t in trimestres for e in estados if e != "Cumplimiento"]        # Conteos por trimestre ({t}{estado})
+columnas_cumplimiento = [f"{t}Cumplimiento" for t in trimestres]                                # Porcentajes por trimestre
+
+# Columnas (y títulos) de las secciones de detalle: Descripción de los Riesgos (ACTRI) y de las Acciones de Mejora (AMTRI)
+columnas_actri = {"Año": "Año", "Siglas": "Siglas", "Riesgo": "Riesgo", "Descripción_del_Riesgo": "Descripción del Riesgo",
+                  "AC": "No. de AC", "Descripcion": "Descripción", "Avance_Institución": "Avance Institución", "Avance_OIC": "Avance OIC"}
+columnas_amtri = {c: c for c in ["Año", "Trimestre", "Siglas", "Procesos", "AM", "Descripcion", "Fecha_Inicio", "Fecha_Termino",
+                                 "Avance_Institución", "Avance_OIC", "¿Evaluado?", "¿Favorable?", "¿AM_Congruete?", "¿Contribuye?"]}
+
+
+#================================================== ESQUEMA DECLARADO POR BASE DE DATOS ==================================================
+#   - categorias:   textos repetidos (se guardan como category: un código pequeño por fila en lugar de un string)
+#   - conteos:      enteros no negativos (vacíos = 0) que se reducen al entero más pequeño que los contenga
+#   - porcentajes:  decimales (se conservan los vacíos) guardados como float64 (float32 agrega ruido de redondeo: 85.1 -> 85.09999);
+#                   una columna sin vacíos ni decimales queda como entero, igual que la lee pd.read_excel (se muestra 85%, no 85.0%)
+# Las columnas que no aparecen en el archivo simplemente se ignoran.
+ESQUEMAS = {
+    "PTAR": {
+        "categorias": ["Institución", "Sector", "Siglas"],
+        "conteos": risk_cols + cuadrante_cols + estrategia_cols + columnas_estado + ["AC_Total", "Riesgos_Totales"],
+        "porcentajes": columnas_cumplimiento,
+    },
+    "ACTRI": {
+        "categorias": ["Institución", "Sector", "Siglas", "Riesgo"],
+        "conteos": [],
+        "porcentajes": ["Avance_Institución", "Avance_OIC"],
+    },
+    "PTCI": {
+        "categorias": ["Institución", "Sector", "Siglas", "Informe_Anual_Finalizado", "SUBIO_ARCHIVO",
+                       "Se_Actualizó_el_Programa", "No_Se_Actualizó_el_Programa"],
+        "conteos": columnas_estado + ["Acciones_de_Mejora_Programa_Original", "TotalAcciones_de_Mejora_Programa_Actualizado"],
+        "porcentajes": columnas_cumplimiento + ["Cumplimiento_General_de_las_NGCI"],
+    },
+    "AMTRI": {
+        "categorias": ["Institución", "Sector", "Siglas", "Trimestre", "Procesos",
+                       "¿Evaluado?", "¿Favorable?", "¿AM_Congruete?", "¿Contribuye?"],
+        "conteos": detalle_cols,
+        "porcentajes": ["Avance_Institución", "Avance_OIC"],
+    },
+}
+
+# Columnas que usa la app de cada base (el lector con proyección omite las demás al leer el Excel)
+COLUMNAS_USADAS = {
+    nombre: list(dict.fromkeys(["Año", "Institución", "Sector", "Siglas"] + esquema["categorias"] + esquema["conteos"]
+                               + esquema["porcentajes"] + list({"ACTRI": columnas_actri, "AMTRI": columnas_amtri}.get(nombre, {}))))
+    for nombre, esquema in ESQUEMAS.items()
+}
+
+# Se guarda la memoria antes y después de aplicar el esquema: {"PTAR": (bytes_antes, bytes_despues), ...}
+REPORTE_MEMORIA = {}
+
+
+def memoria(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def _texto(serie):
+    # Como astype(str).str.strip() conservando los vacíos, pero una columna de números enteros que quedó como decimal por
+    # tener vacíos se escribe igual que sin ellos ("1" y no "1.0"): el resultado no depende de cómo se partió la tabla en bloques
+    if pd.api.types.is_float_dtype(serie.dtype) and (serie.dropna() % 1 == 0).all():
+        serie = serie.astype('Int64')
+    return serie.astype(str).str.strip()
+
+
+def tipar(nombre, df):
+    # Tipos del esquema de la base, fila por fila (no depende de las demás filas salvo la elección entre entero y decimal y
+    # la reducción al entero más pequeño, que al unir bloques se resuelven promoviendo tipos), así que también se puede
+    # aplicar a cada bloque de una lectura por partes (sicoin/lectores.py)
+    esquema = ESQUEMAS[nombre]
+    df = df.copy()
+
+    # Año: entero pequeño que admite vacíos (Int16); las filas sin año se conservan como en pd.read_excel
+    if 'Año' in df.columns:
+        df['Año'] = df['Año'].astype('Int16')
+
+    for col in esquema["categorias"]:
+        if col in df.columns:
+            df[col] = _texto(df[col]).astype('category')
+
+    for col in esquema["conteos"]:
+        if col in df.columns:
+            numeros = pd.to_numeric(df[col], errors='coerce').fillna(0)
+            entero = (numeros % 1 == 0).all()
+            df[col] = pd.to_numeric(numeros, downcast='integer') if entero else numeros.astype('float64')
+
+    for col in esquema["porcentajes"]:
+        if col in df.columns:
+            numeros = pd.to_numeric(df[col], errors='coerce')
+            entero = numeros.notna().all() and (numeros % 1 == 0).all()
+            df[col] = pd.to_numeric(numeros, downcast='integer') if entero else numeros.astype('float64')
+
+    return df.reset_index(drop=True)
+
+
+def registrar_memoria(nombre, antes, despues):
+    REPORTE_MEMORIA[nombre] = (antes, despues)
+    logging.getLogger(__name__).info("%s: %.2f MB -> %.2f MB", nombre, antes / 2**20, despues / 2**20)
+
+
+def aplicar_esquema(nombre, df):
+    antes = memoria(df)
+    df = tipar(nombre, df)
+    registrar_memoria(nombre, antes, memoria(df))
+    return df
+
+
+def formatear_reporte_memoria(reporte=None):
+    lineas = [f"{'Base':<8}{'Antes (MB)':>12}{'Después (MB)':>14}{'Ahorro':>9}"]
+    for nombre, (antes, despues) in (reporte or REPORTE_MEMORIA).items():
+        ahorro = 1 - despues / antes if antes else 0
+        lineas.append(f"{nombre:<8}{antes / 2**20:>12.2f}{despues / 2**20:>14.2f}{ahorro:>9.0%}")
+    return "\n".join(lineas)
+
+
+#================================================== LIMPIEZA DE DATOS ==================================================
+VERSION_LIMPIEZA = "4"   # <--- Subir este número al cambiar limpiar_datos o ESQUEMAS (invalida las instantáneas guardadas en disco)
+
+def limpiar_datos(df, nombre=None, reportar=True):
+    # reportar=False: no registra la memoria en REPORTE_MEMORIA (la lectura por bloques la registra una vez para la tabla completa)
+    df = df.copy()                                                               # No se modifica el DataFrame recibido
+    df.columns = df.columns.str.strip()                                          # Normaliza nombres de las columnas
+    if 'Año' in df.columns:
+        df = df[df['Año'] != 'Año'].infer_objects()                              # Elimina filas duplicadas con encabezados (y recupera los tipos: fechas, números)
+        df['Año'] = pd.to_numeric(df['Año'], errors='coerce')                    # Normaliza Año y convierte a Número
+    if 'Institución' in df.columns:
+        df['Institución'] = _texto(df['Institución'])                            # Normaliza Institución y convierte a Texto
+    if 'Sector' in df.columns:
+        df['Sector'] = _texto(df['Sector'])                                      # Normaliza Institución y convierte a Texto
+    if nombre in ESQUEMAS:
+        df = aplicar_esquema(nombre, df) if reportar else tipar(nombre, df)      # Tipos definitivos (categorías, enteros y decimales pequeños)
+    return df
+
+
+#================================================== REPORTE DE MEMORIA DESDE LA LÍNEA DE COMANDOS ==================================================
+#   python -m sicoin.esquema <carpeta con PTAR.xlsx, ACTRI.xlsx, PTCI.xlsx y AMTRI.xlsx>
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m sicoin.esquema", description="Memoria por base antes y después de aplicar el esquema")
+    parser.add_argument("carpeta")
+    args = parser.parse_args(argv)
+
+    for nombre in ESQUEMAS:
+        limpiar_datos(pd.read_excel(os.path.join(args.carpeta, f"{nombre}.xlsx")), nombre)
+    print(formatear_reporte_memoria())
+
+
+if __name__ == "__main__":
+    main()
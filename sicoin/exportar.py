@@ -0,0 +1,154 @@
+import argparse
+import itertools
+import math
+import re
+import time
+
+import numpy as np
+
+from sicoin.esquema import cuadrante_cols, detalle_cols, estados, estrategia_cols, risk_cols, trimestres
+from sicoin.resumen import resumen_ptar, resumen_ptci
+
+
+#================================================== EXPORTACIÓN MASIVA A EXCEL (institución × año y sectores) ==================================================
+# Escribe en un solo libro los valores de las pestañas PTAR y PTCI de cada alcance (institución × año y, si se pide, sector × año),
+# calculados con las mismas funciones que usa la app (sicoin/resumen.py):
+#   - formato "tabla": una hoja "Reporte" con una fila por alcance
+#   - formato "hojas": una hoja por institución o sector con una fila por indicador y una columna por año
+# El libro se escribe con openpyxl en modo write_only (las filas se van a disco conforme se calculan). El cálculo es en serie:
+# cada alcance es una consulta al cubo y el tiempo se va en escribir el libro, así que repartirlo entre procesos (copiando
+# el cubo a cada uno) solo agrega costo.
+FORMATOS = ("tabla", "hojas")
+
+NGCI = "Cumplimiento_General_de_las_NGCI"
+COLUMNAS_ALCANCE = ["Alcance", "Nombre", "Sector", "Siglas", "Año"]
+ESTATUS = [f"{t}{e}" for t in trimestres for e in estados]                   # Llaves del estatus por trimestre (PTAR y PTCI)
+INDICADORES_PTAR = ["AC_Total", "Riesgos_Totales"] + risk_cols + cuadrante_cols + estrategia_cols
+COLUMNAS_PTAR = INDICADORES_PTAR + [f"AC_{llave}" for llave in ESTATUS]
+COLUMNAS_PTCI = ([NGCI, "Acciones_de_Mejora_Programa_Original", "Se_Actualizó_el_Programa", "No_Se_Actualizó_el_Programa",
+                  "TotalAcciones_de_Mejora_Programa_Actualizado"] + detalle_cols + [f"AM_{llave}" for llave in ESTATUS])
+COLUMNAS = COLUMNAS_ALCANCE + COLUMNAS_PTAR + COLUMNAS_PTCI
+
+
+def _celda(valor):
+    # openpyxl no acepta tipos de numpy ni NaN; los vacíos quedan como celdas vacías
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+        return None
+    return valor
+
+
+def alcances(facetas, sector=None, incluir_sectores=True):
+    # [(alcance, valor, año)]: cada institución × año (de un sector o de todos) y, opcionalmente, el agregado de cada sector × año
+    sectores = [sector] if sector else facetas.sectores
+    lista = []
+    for s in sectores:
+        if incluir_sectores:
+            lista += [("Sector", s, año) for año in facetas.años(None, s)]
+        for institucion in facetas.instituciones_por_sector.get(s, []):
+            lista += [("Institución", institucion, año) for año in facetas.años(institucion, "Todas")]
+    return list(dict.fromkeys(lista))                                         # Sin repetir (una institución que cambió de sector)
+
+
+def valores_alcance(cubo, alcance, valor, año):
+    # Una fila con el orden de COLUMNAS; los mismos números que generate_dashboard y generate_ptci
+    institucion, sector = (valor, "Todas") if alcance == "Institución" else (None, valor)
+    agregado, data = resumen_ptar(cubo, institucion, año, sector)
+    fila = {"Alcance": alcance, "Nombre": valor, "Año": año,
+            "Sector": agregado.primeros.get("Sector") if alcance == "Institución" else valor,
+            "Siglas": agregado.primeros.get("Siglas") if alcance == "Institución" else None}
+    if agregado.filas:
+        fila.update({c: data.get(c) for c in INDICADORES_PTAR})
+        fila.update({f"AC_{llave}": data.get(llave) for llave in ESTATUS})
+
+    ptci = resumen_ptci(cubo, institucion, año, sector)
+    if ptci is not None:
+        cum_ngci, valores_ptci, detalle, seguimiento = ptci
+        fila[NGCI] = cum_ngci
+        fila.update(valores_ptci)
+        fila.update(detalle)
+        fila.update({f"AM_{llave}": v for llave, v in seguimiento.items()})
+    return [_celda(fila.get(c)) for c in COLUMNAS]
+
+
+def iterar_filas(cubo, lista):
+    # Genera las filas en el orden de `lista` conforme se calculan (la memoria no crece con el número de alcances)
+    for a in lista:
+        yield valores_alcance(cubo, *a)
+
+
+#--------------- Escritura en streaming (openpyxl write_only) ---------------#
+def _nombre_hoja(fila, usados):
+    # Excel: máximo 31 caracteres, sin []:*?/\ y sin repetir
+    _, nombre, _, siglas, _ = fila[:len(COLUMNAS_ALCANCE)]
+    base = re.sub(r"[\[\]:*?/\\]", " ", str(siglas or nombre))[:31].strip()
+    candidato, n = base, 1
+    while candidato.lower() in usados:
+        n += 1
+        candidato = f"{base[:31 - len(str(n)) - 1]}~{n}"
+    usados.add(candidato.lower())
+    return candidato
+
+
+def escribir_xlsx(destino, filas, formato="tabla"):
+    # destino: ruta o archivo binario (p. ej. io.BytesIO); devuelve el número de alcances escritos
+    from openpyxl import Workbook
+
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato '{formato}' no disponible; opciones: {', '.join(FORMATOS)}")
+    libro = Workbook(write_only=True)
+    total = 0
+    if formato == "tabla":
+        hoja = libro.create_sheet("Reporte")
+        hoja.append(COLUMNAS)
+        for fila in filas:
+            hoja.append(fila)
+            total += 1
+    else:
+        # Las filas de un mismo alcance llegan juntas (ver alcances), así que cada hoja se escribe completa y se libera
+        usados = set()
+        inicio = COLUMNAS.index("Año") + 1
+        for _, grupo in itertools.groupby(filas, key=lambda fila: tuple(fila[:2])):
+            grupo = list(grupo)
+            hoja = libro.create_sheet(_nombre_hoja(grupo[0], usados))
+            for columna, valor in zip(COLUMNAS_ALCANCE[:-1], grupo[0]):      # Alcance, Nombre, Sector y Siglas
+                hoja.append([columna, valor])
+            hoja.append(["Indicador"] + [fila[inicio - 1] for fila in grupo])  # Un año por columna
+            for i, columna in enumerate(COLUMNAS[inicio:], start=inicio):
+                hoja.append([columna] + [fila[i] for fila in grupo])
+            total += len(grupo)
+    libro.save(destino)
+    return total
+
+
+def exportar(publicacion, destino, sector=None, formato="tabla", incluir_sectores=True):
+    lista = alcances(publicacion.facetas, sector, incluir_sectores)
+    return escribir_xlsx(destino, iterar_filas(publicacion.cubo, lista), formato)
+
+
+#================================================== USO DESDE LA LÍNEA DE COMANDOS ==================================================
+#   python -m sicoin.exportar reporte.xlsx [--sector "Sector X"] [--formato tabla|hojas]
+# Los datos se obtienen como en la app (SICOIN_FUENTE, SICOIN_LECTOR e instantáneas de SICOIN_CACHE).
+def main(argv=None):
+    from sicoin.actualizador import construir_publicacion
+    from sicoin.descarga import ARCHIVOS, fuente_desde_entorno
+    from sicoin.ingesta import Ingesta
+    from sicoin.lectores import LECTOR_POR_OMISION
+
+    parser = argparse.ArgumentParser(prog="python -m sicoin.exportar", description="Exporta los valores de PTAR y PTCI por institución y año a Excel")
+    parser.add_argument("destino")
+    parser.add_argument("--sector", default=None, help="Solo las instituciones de este sector")
+    parser.add_argument("--formato", choices=FORMATOS, default="tabla")
+    parser.add_argument("--sin-sectores", action="store_true", help="No incluir las filas agregadas por sector")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    publicacion = construir_publicacion(Ingesta(fuente_desde_entorno(ARCHIVOS), lector=LECTOR_POR_OMISION).ejecutar())
+    carga = time.perf_counter() - inicio
+    total = exportar(publicacion, args.destino, args.sector, args.formato, not args.sin_sectores)
+    print(f"{total} alcances escritos en {args.destino} (carga {carga:.2f} s, exportación {time.perf_counter() - inicio - carga:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import bisect
+import copy
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+#============================================ ÍNDICE DE FACETAS PARA LOS FILTROS (selectbox) DE LA APP ============================================
+# Se construye una sola vez por versión de datos con groupby (sin ciclos de Python sobre instituciones o sectores).
+# Después, cada lista de opciones de un filtro es una búsqueda: en un diccionario para las relaciones globales y, para las
+# opciones por alcance y año (muchas llaves), por posición sobre arreglos planos ordenados (ordenar_llaves); así el índice
+# ocupa poca memoria y se puede guardar y cargar como arreglos y no como objetos de Python.
+
+ALCANCES = ("Institución", "Sector")        # Un filtro se aplica por Institución (sector = "Todas") o por Sector
+RELACIONES = ("años_por_institucion", "años_por_sector", "sectores_por_institucion", "instituciones_por_sector",
+              "siglas_por_institucion", "instituciones_por_siglas")
+
+
+def ordenar_llaves(valores, años):
+    # Orden estable por (valor, año) de los renglones con llave completa (valores en orden alfabético) y, para cada llave
+    # distinta, su valor, su año y su rango [inicio, fin) en ese orden; los renglones sin valor o sin año no pertenecen a ninguna
+    codigos, vocabulario = pd.factorize(np.asarray(valores, dtype=object), sort=True)
+    años = años.to_numpy(dtype="float64", na_value=np.nan)
+    validos = np.flatnonzero((codigos >= 0) & ~np.isnan(años))
+    llave = (codigos[validos].astype("int64") << 16) | años[validos].astype("int64")
+    orden = np.argsort(llave, kind="stable")
+    llave, orden = llave[orden], validos[orden]
+    inicios = np.flatnonzero(np.r_[True, llave[1:] != llave[:-1]]) if len(llave) else np.zeros(0, dtype="int64")
+    return orden, {"valores": pa.array(vocabulario.take(llave[inicios] >> 16).tolist(), type=pa.string()),
+                   "años": (llave[inicios] & 0xFFFF).astype("int16"),
+                   "inicios": inicios.astype("int64"),
+                   "finales": np.append(inicios[1:], len(llave)).astype("int64")}
+
+
+def posicion_llave(llaves, valor, año):
+    # Posición de (valor, año) en las llaves de ordenar_llaves, o -1 si no existe: bisección sobre los valores (arreglo de
+    # Arrow, sin convertirlo a objetos de Python) y searchsorted sobre los años de ese valor, que son pocos
+    if not isinstance(valor, str) or año is None:
+        return -1
+    valores, años = llaves["valores"], llaves["años"]
+    inicio = bisect.bisect_left(valores, valor, key=_texto)
+    fin = bisect.bisect_right(valores, valor, lo=inicio, key=_texto)
+    posicion = inicio + int(np.searchsorted(años[inicio:fin], año))
+    return posicion if posicion < fin and años[posicion] == año else -1
+
+
+def _texto(escalar):
+    return escalar.as_py()
+
+
+def _agrupar(df, clave, columna):
+    # {valor de la clave: [valores de columna ordenados y sin repetir]}
+    if columna == clave or columna not in df.columns or clave not in df.columns:
+        return {}
+    sub = df[[clave, columna]].dropna().drop_duplicates().sort_values([clave, columna])
+    sub[columna] = sub[columna].astype(object)                               # Valores de Python (str/int) como los de .unique().tolist()
+    return sub.groupby(clave, observed=True, sort=False)[columna].agg(list).to_dict()
+
+
+def mascara_llaves(df, alcance, llaves):
+    # Renglones de la tabla que pertenecen a alguna de las llaves (valor, año) de un alcance
+    if not llaves:
+        return np.zeros(len(df), dtype=bool)
+    return pd.MultiIndex.from_arrays([df[alcance], df["Año"]]).isin(list(llaves))
+
+
+def _reagrupar(anterior, df, clave, columna, llaves):
+    # _agrupar solo para las llaves indicadas; las demás se conservan de la versión anterior
+    if not llaves:
+        return anterior
+    mascara = df[clave].isin(list(llaves)).to_numpy() if clave in df.columns else np.zeros(len(df), dtype=bool)
+    resultado = {k: v for k, v in anterior.items() if k not in llaves}
+    resultado.update(_agrupar(df[mascara], clave, columna))
+    return resultado
+
+
+def _renglones_opciones(df, alcance, columna):
+    # Renglones (valor, año, opción) sin repetir y en el orden de _agrupar; vacío si falta alguna columna
+    if columna == alcance or any(c not in df.columns for c in (alcance, "Año", columna)):
+        return pd.DataFrame({alcance: pd.Series(dtype=object), "Año": pd.Series(dtype="Int16"), columna: pd.Series(dtype=object)})
+    return df[[alcance, "Año", columna]].dropna().drop_duplicates().sort_values([alcance, "Año", columna])
+
+
+def _opciones(renglones, alcance, columna):
+    # Las opciones de todas las llaves (valor, año) en un solo arreglo, agrupadas por llave (ordenar_llaves conserva su orden)
+    orden, llaves = ordenar_llaves(renglones[alcance], renglones["Año"])
+    return {**llaves, "opciones": pa.array(renglones[columna].astype(object).to_numpy()[orden].tolist())}
+
+
+def _reopciones(anterior, df, alcance, columna, llaves):
+    # _opciones solo para las llaves indicadas; los renglones de las demás se conservan de la versión anterior
+    if not llaves:
+        return anterior
+    repeticiones = anterior["finales"] - anterior["inicios"]
+    previos = pd.DataFrame({alcance: np.repeat(np.asarray(anterior["valores"].to_pylist(), dtype=object), repeticiones),
+                            "Año": pd.array(np.repeat(anterior["años"], repeticiones), dtype="Int16"),
+                            columna: anterior["opciones"].to_pylist()})
+    previos = previos[~mascara_llaves(previos, alcance, llaves)]
+    nuevos = _renglones_opciones(df[mascara_llaves(df, alcance, llaves)] if alcance in df.columns else df, alcance, columna)
+    return _opciones(pd.concat([previos, nuevos.astype({alcance: object, columna: object})], ignore_index=True), alcance, columna)
+
+
+def _valores(df, columna):
+    if columna not in df.columns:
+        return []
+    return sorted(df[columna].dropna().unique().tolist())
+
+
+class IndiceFacetas:
+    def __init__(self, datos):
+        ptar = datos["PTAR"]
+
+        #--------------- Listas globales de los filtros principales (tomadas de PTAR, igual que antes) ---------------#
+        self.instituciones = _valores(ptar, "Institución")
+        self.sectores = _valores(ptar, "Sector")
+
+        #--------------- Relaciones entre facetas en ambos sentidos (PTAR) ---------------#
+        self.años_por_institucion = _agrupar(ptar, "Institución", "Año")
+        self.años_por_sector = _agrupar(ptar, "Sector", "Año")
+        self.sectores_por_institucion = _agrupar(ptar, "Institución", "Sector")
+        self.instituciones_por_sector = _agrupar(ptar, "Sector", "Institución")
+        self.siglas_por_institucion = _agrupar(ptar, "Institución", "Siglas")
+        self.instituciones_por_siglas = _agrupar(ptar, "Siglas", "Institución")
+
+        #--------------- Opciones por alcance y año de cada base: {(base, columna, alcance): arreglos de _opciones} ---------------#
+        self._opciones = {}
+        for base, columnas in {"PTAR": ["Institución", "Siglas"],
+                               "ACTRI": ["Institución", "Siglas"],
+                               "PTCI": ["Institución", "Siglas"],
+                               "AMTRI": ["Institución", "Siglas", "Trimestre"]}.items():
+            df = datos[base]
+            for alcance in ALCANCES:
+                for columna in columnas:
+                    self._opciones[(base, columna, alcance)] = _opciones(_renglones_opciones(df, alcance, columna), alcance, columna)
+
+    def actualizado(self, datos, cambios):
+        # Índice de la versión nueva recalculando solo las entradas de los alcances que cambiaron (sicoin/incremental.py)
+        nuevo = copy.copy(self)
+        nuevo._opciones = {(base, columna, alcance): _reopciones(opciones, datos[base], alcance, columna,
+                                                                cambios.llaves.get((base, alcance)))
+                           for (base, columna, alcance), opciones in self._opciones.items()}
+        if ("PTAR", "Institución") not in cambios.llaves:                      # PTAR no cambió: las relaciones globales siguen igual
+            return nuevo
+
+        ptar = datos["PTAR"]
+        instituciones = {valor for valor, _ in cambios.llaves[("PTAR", "Institución")]}
+        sectores = {valor for valor, _ in cambios.llaves.get(("PTAR", "Sector"), ())}
+        siglas = {s for i in instituciones for s in self.siglas_por_institucion.get(i, [])}     # Las de antes y las de ahora
+        siglas |= set(ptar.loc[ptar["Institución"].isin(list(instituciones)), "Siglas"].dropna().tolist()) if "Siglas" in ptar else set()
+
+        nuevo.instituciones = _valores(ptar, "Institución")
+        nuevo.sectores = _valores(ptar, "Sector")
+        nuevo.años_por_institucion = _reagrupar(self.años_por_institucion, ptar, "Institución", "Año", instituciones)
+        nuevo.años_por_sector = _reagrupar(self.años_por_sector, ptar, "Sector", "Año", sectores)
+        nuevo.sectores_por_institucion = _reagrupar(self.sectores_por_institucion, ptar, "Institución", "Sector", instituciones)
+        nuevo.instituciones_por_sector = _reagrupar(self.instituciones_por_sector, ptar, "Sector", "Institución", sectores)
+        nuevo.siglas_por_institucion = _reagrupar(self.siglas_por_institucion, ptar, "Institución", "Siglas", instituciones)
+        nuevo.instituciones_por_siglas = _reagrupar(self.instituciones_por_siglas, ptar, "Siglas", "Institución", siglas)
+        return nuevo
+
+    def años(self, institucion, sector):
+        # Años disponibles según la opción de sector o institución
+        if sector != "Todas":
+            return self.años_por_sector.get(sector, [])
+        return self.años_por_institucion.get(institucion, [])
+
+    def opciones(self, base, columna, alcance, valor, año):
+        tabla = self._opciones.get((base, columna, alcance))
+        posicion = -1 if tabla is None else posicion_llave(tabla, valor, año)
+        if posicion < 0:
+            return []
+        return tabla["opciones"][int(tabla["inicios"][posicion]):int(tabla["finales"][posicion])].to_pylist()
+
+    #--------------- Como arreglos y valores de JSON (para guardarlo sin pickle) ---------------#
+    def partes(self):
+        return {"instituciones": self.instituciones, "sectores": self.sectores,
+                "relaciones": {nombre: list(getattr(self, nombre).items()) for nombre in RELACIONES},
+                "opciones": [{"base": base, "columna": columna, "alcance": alcance, **tabla}
+                             for (base, columna, alcance), tabla in self._opciones.items()]}
+
+    @classmethod
+    def desde_partes(cls, partes):
+        indice = cls.__new__(cls)
+        indice.instituciones, indice.sectores = partes["instituciones"], partes["sectores"]
+        for nombre in RELACIONES:
+            setattr(indice, nombre, {clave: valores for clave, valores in partes["relaciones"][nombre]})
+        indice._opciones = {(tabla.pop("base"), tabla.pop("columna"), tabla.pop("alcance")): tabla for tabla in partes["opciones"]}
+        return indice
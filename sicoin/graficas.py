@@ -0,0 +1,44 @@
+import pandas as pd
+import plotly.express as px
+
+from sicoin.esquema import estados, trimestres
+from sicoin.metricas import METRICAS
+
+
+#================================================== GRÁFICA DE ESTATUS POR TRIMESTRE (PTAR y PTCI) ==================================================
+# El marco largo (Trimestre, Estado, Cantidad) se obtiene con un solo reacomodo de las columnas {t}{estado}.
+# La figura terminada no depende de la sesión, así que la app la guarda por (alcance, versión de datos) y la reutiliza.
+
+COLORES_ESTADO = {'Sin_Avances': '#dc3545', 'En_Proceso': '#ffc107', 'Concluidas': '#28a745', 'Cumplimiento': '#6610f2'}
+
+
+def marco_trimestres(data):
+    # {"1Sin_Avances": 3, ...} -> una fila por (trimestre, estado); las llaves que no existan valen 0
+    llaves = pd.MultiIndex.from_product([trimestres, estados], names=["Trimestre", "Estado"])
+    cantidades = pd.Series(dict(data)).reindex(llaves.map("".join), fill_value=0)
+    marco = pd.DataFrame({"Cantidad": cantidades.to_numpy()}, index=llaves).reset_index()
+    marco["Trimestre"] = " " + marco["Trimestre"]                          # Etiqueta del eje como antes (" 1", " 2", ...)
+    return marco
+
+
+@METRICAS.medir("figura_plotly")
+def figura_trimestres(data):
+    fig = px.bar(marco_trimestres(data), x='Trimestre', y='Cantidad', color='Estado',
+                 barmode='group', height=400, color_discrete_map=COLORES_ESTADO)
+
+    #--------------  Da el formato a a la gráfica  ------------------#
+    fig.update_layout(
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(color='#333'),
+        xaxis=dict(title=None, gridcolor='#f0f0f0'),
+        yaxis=dict(title=None, gridcolor='#f0f0f0'),
+        legend=dict(title=None),
+        margin=dict(l=20, r=20, t=50, b=20)
+    )
+    #--------------  Etiqueta de porcentaje en las barras de Cumplimiento (ya que este valor es porcentaje) -----------------#
+    for trace in fig.data:
+        if trace.name == "Cumplimiento":
+            trace.text = [f"{y}%" for y in trace.y]
+            trace.textposition = 'outside'
+    return fig
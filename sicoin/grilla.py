@@ -0,0 +1,41 @@
+import math
+
+
+#================================================== GRILLA PAGINADA PARA LAS SECCIONES DE DETALLE ==================================================
+# En lugar de mandar todas las filas al navegador como una sola cadena HTML, se filtra y ordena del lado del servidor
+# y solo se envía la página visible (st.dataframe la serializa en formato columnar Arrow).
+# El formato de porcentaje se aplica únicamente a las filas de la página.
+
+TAMAÑOS_PAGINA = (25, 50, 100)
+
+
+def filtrar(df, filtros):
+    # filtros = {columna: texto}; conserva las filas cuyo valor contiene el texto (sin distinguir mayúsculas)
+    for col, texto in filtros.items():
+        texto = str(texto).strip()
+        if texto and col in df.columns:
+            valores = df[col].astype(object).where(df[col].notna(), "").astype(str)
+            df = df[valores.str.contains(texto, case=False, regex=False).to_numpy()]
+    return df
+
+
+def ordenar(df, columna=None, ascendente=True):
+    # Orden estable sobre los valores originales (los porcentajes se ordenan como números, no como texto)
+    if columna is None or columna not in df.columns:
+        return df
+    return df.sort_values(columna, ascending=ascendente, kind="stable", na_position="last")
+
+
+def total_paginas(filas, tamaño):
+    return max(1, math.ceil(filas / tamaño))
+
+
+def pagina(df, numero, tamaño, columnas, formatos=None):
+    # Filas de la página `numero` (desde 1) con las columnas renombradas {columna: título} y los formatos {columna: función} aplicados
+    numero = min(max(1, int(numero)), total_paginas(len(df), tamaño))
+    inicio = (numero - 1) * tamaño
+    visible = df.iloc[inicio:inicio + tamaño][[c for c in columnas if c in df.columns]]
+    for col, formato in (formatos or {}).items():
+        if col in visible.columns:
+            visible = visible.assign(**{col: formato(visible[col])})
+    return visible.rename(columns=columnas).reset_index(drop=True)
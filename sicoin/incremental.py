@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from sicoin.agregados import BASES
+from sicoin.facetas import ALCANCES
+
+
+#================================================== DETECCIÓN DE CAMBIOS POR RENGLÓN ENTRE DOS VERSIONES ==================================================
+# Cuando SICOIN actualiza un trimestre o el renglón de una institución, el resto de los alcances no cambia. Para saber cuáles sí:
+#   - cada renglón se resume en un hash de todas sus columnas (pd.util.hash_pandas_object)
+#   - cada alcance (Institución × Año y Sector × Año) tiene una firma: el XOR de los hashes de sus renglones mezclados con su
+#     posición dentro del alcance, así que cambia si se agrega, quita, modifica o reordena cualquiera de sus renglones
+#   - los alcances afectados son los que tienen firma distinta o solo existen en una de las dos versiones
+# Todo es vectorizado; después el cubo, el índice de facetas y la caché de vistas solo recalculan (o descartan) esos alcances.
+# Si cambian las columnas o sus tipos, los renglones sin año (no pertenecen a ningún alcance pero sí cuentan en las listas
+# globales y en la búsqueda), o el cambio toca más de FRACCION_MAXIMA de los alcances, se reconstruye todo.
+FRACCION_MAXIMA = 0.5
+
+
+@dataclass(frozen=True)
+class Cambios:
+    version_anterior: str
+    llaves: dict                  # {(base, alcance): frozenset((valor, año))} solo de las bases cuya tabla cambió
+    total_llaves: int             # Alcances de la versión nueva (para saber qué fracción cambió)
+
+    @property
+    def afectados(self):
+        # {(alcance, valor, año)} de todas las bases; es lo que usan las vistas memorizadas
+        return frozenset((alcance, valor, año) for (_, alcance), llaves in self.llaves.items() for valor, año in llaves)
+
+    @property
+    def fraccion(self):
+        cambiadas = sum(len(llaves) for llaves in self.llaves.values())
+        return cambiadas / self.total_llaves if self.total_llaves else 1.0
+
+
+def _tipos(df):
+    # Las categorías pueden ganar o perder valores sin que cambie la estructura de la tabla
+    return [(c, "category" if isinstance(t, pd.CategoricalDtype) else str(t)) for c, t in df.dtypes.items()]
+
+
+def firmas(df, alcance, hashes=None):
+    # Serie {(valor, año): firma uint64} de cada alcance de la tabla
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy() if hashes is None else hashes
+    grupos = df.groupby([alcance, "Año"], observed=True, sort=False)
+    codigos = grupos.ngroup().to_numpy()
+    posiciones = grupos.cumcount().fillna(0).to_numpy().astype(np.uint64)        # Los renglones sin año no tienen posición
+    mezcla = pd.util.hash_array(hashes ^ (posiciones * np.uint64(0x9E3779B97F4A7C15)))
+    validos = codigos >= 0                                                     # Renglones sin alcance (vacíos) no pertenecen a ninguno
+    orden = np.argsort(codigos[validos], kind="stable")
+    ordenados = codigos[validos][orden]
+    if len(ordenados) == 0:
+        return pd.Series([], dtype="uint64", index=pd.MultiIndex.from_tuples([], names=[alcance, "Año"]))
+    inicios = np.flatnonzero(np.r_[True, ordenados[1:] != ordenados[:-1]])
+    return pd.Series(np.bitwise_xor.reduceat(mezcla[validos][orden], inicios), index=grupos.size().index)
+
+
+def llaves_afectadas(anterior, nueva):
+    # Une las firmas de las dos versiones y devuelve las llaves (valor, año) que no coinciden
+    comunes = anterior.index.intersection(nueva.index)
+    distintas = comunes[anterior.loc[comunes].to_numpy() != nueva.loc[comunes].to_numpy()]
+    return frozenset(distintas.append([anterior.index.difference(nueva.index), nueva.index.difference(anterior.index)]).tolist())
+
+
+def detectar_cambios(anteriores, nuevos):
+    # Devuelve Cambios, o None si hay que reconstruir todo (otra estructura de tabla o un cambio demasiado grande)
+    llaves, total = {}, 0
+    for base in BASES:
+        anterior, nueva = anteriores.tablas.get(base), nuevos.tablas.get(base)
+        if anterior is None or nueva is None:
+            return None
+        alcances = [a for a in ALCANCES if a in nueva.columns and "Año" in nueva.columns]
+        total += sum(nueva.groupby([a, "Año"], observed=True).ngroups for a in alcances)
+        if nueva is anterior:                                                  # La ingesta reutiliza las tablas de los archivos sin cambios
+            continue
+        if _tipos(anterior) != _tipos(nueva):
+            return None
+        hashes_anterior = pd.util.hash_pandas_object(anterior, index=False).to_numpy()
+        hashes_nueva = pd.util.hash_pandas_object(nueva, index=False).to_numpy()
+        if "Año" in nueva.columns and not np.array_equal(hashes_anterior[anterior["Año"].isna().to_numpy()],
+                                                         hashes_nueva[nueva["Año"].isna().to_numpy()]):
+            return None
+        for alcance in alcances:
+            llaves[(base, alcance)] = llaves_afectadas(firmas(anterior, alcance, hashes_anterior), firmas(nueva, alcance, hashes_nueva))
+    cambios = Cambios(anteriores.version, llaves, total)
+    return cambios if cambios.fraccion <= FRACCION_MAXIMA else None
+
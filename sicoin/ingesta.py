@@ -0,0 +1,71 @@
+import hashlib
+from dataclasses import dataclass
+from types import MappingProxyType
+
+import pandas as pd
+
+from sicoin.descarga import Descargador
+from sicoin.esquema import VERSION_LIMPIEZA, limpiar_datos
+from sicoin.lectores import obtener_lector
+from sicoin.metricas import METRICAS
+from sicoin.snapshots import AlmacenSnapshots
+
+
+#================================================== DATOS INMUTABLES ==================================================
+# Con copy-on-write ningún filtro o asignación posterior puede modificar las tablas compartidas (en pandas >= 3 siempre está activo)
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+
+@dataclass(frozen=True)
+class Datasets:
+    version: str                  # Token de versión: cambia solo si cambia algún archivo o la limpieza
+    tablas: MappingProxyType      # {"PTAR": df1, "ACTRI": df2, "PTCI": df3, "AMTRI": df4}
+    hashes: MappingProxyType      # {"PTAR": sha256 del .xlsx, ...}
+
+    def __getitem__(self, nombre):
+        return self.tablas[nombre]
+
+
+def calcular_version(hashes, firma=""):
+    h = hashlib.sha256(f"{VERSION_LIMPIEZA}{firma}".encode())
+    for nombre in sorted(hashes):
+        h.update(f"{nombre}={hashes[nombre]};".encode())
+    return h.hexdigest()[:16]
+
+
+#============================================ INGESTA EN UN SOLO PASO: DESCARGA -> LECTURA -> LIMPIEZA ============================================
+class Ingesta:
+    def __init__(self, fuente, snapshots=None, lector=None):
+        self.descargador = Descargador(fuente)
+        self.lector = lector if callable(lector) else obtener_lector(lector)   # Nombre de estrategia (SICOIN_LECTOR) o función de lectura
+        self.firma = getattr(self.lector, "firma", "")                         # Distingue lo leído con proyección de columnas
+        self.snapshots = snapshots or AlmacenSnapshots(version=f"{VERSION_LIMPIEZA}{self.firma}")
+        self.actual = None                                                     # Último Datasets construido
+
+    def _leer_y_limpiar(self, nombre, ruta):
+        if getattr(self.lector, "limpia", False):                              # El lector ya limpia cada bloque al leerlo
+            with METRICAS.tramo("lectura_excel"):
+                return self.lector(ruta)
+        with METRICAS.tramo("lectura_excel"):
+            crudo = self.lector(ruta)
+        with METRICAS.tramo("limpieza"):
+            return limpiar_datos(crudo, nombre)
+
+    def _preparar(self, nombre, archivo):
+        # Reutiliza la tabla ya preparada si el archivo no cambió; si cambió, usa la instantánea o lee y limpia el Excel
+        if self.actual is not None and self.actual.hashes.get(nombre) == archivo.sha256:
+            return self.actual[nombre]
+        return self.snapshots.obtener(archivo.nombre, archivo.sha256, lambda: self._leer_y_limpiar(nombre, archivo.ruta))
+
+    @METRICAS.medir("ingesta")
+    def ejecutar(self):
+        archivos = {a.nombre.removesuffix(".xlsx"): a for a in self.descargador.sincronizar().values()}
+        hashes = {nombre: a.sha256 for nombre, a in archivos.items()}
+        version = calcular_version(hashes, self.firma)
+        if self.actual is not None and self.actual.version == version:
+            return self.actual
+
+        tablas = {nombre: self._preparar(nombre, archivo) for nombre, archivo in archivos.items()}
+        self.actual = Datasets(version, MappingProxyType(tablas), MappingProxyType(hashes))
+        return self.actual
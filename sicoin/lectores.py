@@ -0,0 +1,163 @@
+import importlib.util
+import os
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from sicoin.esquema import COLUMNAS_USADAS, ESQUEMAS, limpiar_datos, memoria, registrar_memoria
+
+
+#================================================== ESTRATEGIAS DE LECTURA DE LOS ARCHIVOS EXCEL ==================================================
+# Todas devuelven lo mismo que pd.read_excel (primera hoja, primera fila como encabezado) para que limpiar_datos no cambie
+# (salvo flujo, que devuelve la tabla ya limpia):
+#   - pandas:     pd.read_excel con su motor por omisión (openpyxl)
+#   - openpyxl:   openpyxl en modo de solo lectura (streaming de filas, sin estilos ni celdas intermedias)
+#   - proyeccion: igual que openpyxl, pero solo arma las columnas que usa la app (COLUMNAS_USADAS)
+#   - flujo:      proyección por bloques de TAMAÑO_BLOQUE filas (leer_bloques): descarta al vuelo las filas vacías y los
+#                 encabezados repetidos, y limpia y tipa cada bloque en cuanto lo lee (categorías, enteros pequeños), así que
+#                 nunca se tienen todas las filas sin tipar; devuelve la tabla ya limpia (limpia=True) y el pico de memoria
+#                 es una fracción del de proyeccion
+#   - calamine:   pd.read_excel(engine="calamine"), solo si python-calamine está instalado
+# La estrategia se elige con SICOIN_LECTOR (por omisión "pandas"); python -m benchmarks.bench_ingesta compara todas.
+LECTOR_POR_OMISION = os.environ.get("SICOIN_LECTOR", "pandas")
+TAMAÑO_BLOQUE = int(os.environ.get("SICOIN_BLOQUE_FILAS", "5000"))
+
+
+def _leer_pandas(ruta, columnas=None):
+    return pd.read_excel(ruta)
+
+
+def _leer_calamine(ruta, columnas=None):
+    return pd.read_excel(ruta, engine="calamine")
+
+
+def _abrir_hoja(ruta, columnas):
+    # (libro, filas restantes, nombres de las columnas elegidas, función que toma esas columnas de una fila)
+    from openpyxl import load_workbook
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    filas = libro.worksheets[0].iter_rows(values_only=True)
+    encabezado = ["" if h is None else str(h) for h in next(filas, ())]
+    indices = [i for i, h in enumerate(encabezado) if columnas is None or h.strip() in columnas]
+    ancho = len(encabezado)
+    tomar = itemgetter(*indices) if len(indices) > 1 else (lambda fila: tuple(fila[i] for i in indices))
+    return libro, filas, [encabezado[i] for i in indices], lambda fila: tomar(fila if len(fila) >= ancho else fila + (None,) * (ancho - len(fila)))
+
+
+def _leer_openpyxl(ruta, columnas=None):
+    libro, filas, nombres, tomar = _abrir_hoja(ruta, columnas)
+    try:
+        registros = [tomar(fila) for fila in filas]
+    finally:
+        libro.close()
+
+    while registros and all(v is None for v in registros[-1]):               # Como pd.read_excel: sin filas vacías al final
+        registros.pop()
+    return pd.DataFrame.from_records(registros, columns=nombres)
+
+
+def leer_bloques(ruta, columnas=None, tamaño=TAMAÑO_BLOQUE):
+    # Genera DataFrames de hasta `tamaño` filas con las columnas indicadas, sin filas vacías ni los encabezados repetidos
+    # que limpiar_datos quitaría después (Año == "Año"); siempre genera al menos un bloque (vacío si la hoja no tiene datos)
+    libro, filas, nombres, tomar = _abrir_hoja(ruta, columnas)
+    año = next((i for i, nombre in enumerate(nombres) if nombre.strip() == "Año"), None)
+    try:
+        bloque, generados = [], 0
+        for fila in filas:
+            valores = tomar(fila)
+            if (año is not None and valores[año] == "Año") or all(v is None for v in valores):
+                continue
+            bloque.append(valores)
+            if len(bloque) == tamaño:
+                yield pd.DataFrame.from_records(bloque, columns=nombres)
+                bloque, generados = [], generados + 1
+        if bloque or not generados:
+            yield pd.DataFrame.from_records(bloque, columns=nombres)
+    finally:
+        libro.close()
+
+
+def _a_objetos(parte):
+    # Como quedaría la columna completa en un DataFrame de objetos: los enteros que el bloque convirtió a decimal por
+    # tener vacíos vuelven a ser enteros y los vacíos son None
+    if not pd.api.types.is_float_dtype(parte.dtype):
+        return parte.astype(object)
+    return pd.Series([None if v != v else int(v) if v.is_integer() else v for v in parte.tolist()], dtype=object)
+
+
+def _unir_columna(partes):
+    # Una columna a partir de sus partes ya tipadas (una por bloque), decidiendo el tipo común solo con los tipos de las partes
+    if isinstance(partes[0].dtype, pd.CategoricalDtype):                     # Categorías del esquema (siempre de texto)
+        return pd.Series(union_categoricals([p.array for p in partes], sort_categories=True))
+    vacias = [p for p in partes if not p.notna().any()]
+    tipos = list(dict.fromkeys(p.dtype for p in partes if p.notna().any())) or [partes[0].dtype]
+    if len(tipos) == 1:
+        comun = tipos[0]
+    elif all(isinstance(t, np.dtype) and t.kind in "iuf" for t in tipos):
+        comun = np.result_type(*tipos)
+    else:
+        comun = np.dtype(object)
+    if vacias and isinstance(comun, np.dtype) and comun.kind in "iub":        # Los vacíos no caben en enteros ni en booleanos
+        comun = np.dtype("float64") if comun.kind in "iu" else np.dtype(object)
+    if comun == object:
+        partes = [_a_objetos(p) for p in partes]
+    return pd.concat([p.astype(comun) for p in partes], ignore_index=True)
+
+
+def _unir_bloques(bloques):
+    # Bloques ya limpios y con los tipos del esquema: solo se concatenan (las categorías se unen con union_categoricals)
+    if len(bloques) == 1:
+        return bloques[0]
+    return pd.DataFrame({col: _unir_columna([b[col] for b in bloques]) for col in bloques[0].columns})
+
+
+def _leer_flujo(ruta, columnas=None, nombre=None):
+    # Cada bloque se limpia y se tipa en cuanto se lee, así que solo se acumulan bloques ya reducidos (categorías y enteros
+    # pequeños); la memoria antes y después del esquema se registra una vez, para la tabla completa
+    bloques, antes = [], 0
+    for bloque in leer_bloques(ruta, columnas):
+        antes += memoria(bloque)
+        bloques.append(limpiar_datos(bloque, nombre, reportar=False))
+    df = _unir_bloques(bloques)
+    if nombre in ESQUEMAS:
+        registrar_memoria(nombre, antes, memoria(df))
+    return df
+
+
+@dataclass(frozen=True)
+class Lector:
+    nombre: str
+    leer: Callable
+    proyeccion: bool = False          # True: solo se leen las columnas de COLUMNAS_USADAS (cambia el contenido de las tablas)
+    limpia: bool = False              # True: devuelve la tabla ya limpia (limpiar_datos con el nombre de la base)
+
+    @property
+    def firma(self):
+        # Se agrega a la versión de los datos y de las instantáneas cuando el contenido leído es distinto
+        return "+proyeccion" if self.proyeccion else ""
+
+    def __call__(self, ruta):
+        base = os.path.splitext(os.path.basename(ruta))[0]
+        columnas = COLUMNAS_USADAS.get(base) if self.proyeccion else None
+        return self.leer(ruta, columnas, base) if self.limpia else self.leer(ruta, columnas)
+
+
+LECTORES = {
+    "pandas": Lector("pandas", _leer_pandas),
+    "openpyxl": Lector("openpyxl", _leer_openpyxl),
+    "proyeccion": Lector("proyeccion", _leer_openpyxl, proyeccion=True),
+    "flujo": Lector("flujo", _leer_flujo, proyeccion=True, limpia=True),       # Mismas tablas limpias que proyeccion (misma firma)
+}
+if importlib.util.find_spec("python_calamine") is not None:
+    LECTORES["calamine"] = Lector("calamine", _leer_calamine)
+
+
+def obtener_lector(nombre=None):
+    nombre = nombre or LECTOR_POR_OMISION
+    if nombre not in LECTORES:
+        raise ValueError(f"Lector '{nombre}' no disponible; opciones: {', '.join(LECTORES)}")
+    return LECTORES[nombre]
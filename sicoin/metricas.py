@@ -0,0 +1,179 @@
+import bisect
+import functools
+import os
+import threading
+import time
+from collections import deque
+
+
+#================================================== MÉTRICAS DE RENDIMIENTO POR ETAPA ==================================================
+# Cada etapa (descarga, lectura del Excel, limpieza, construcción de vistas, HTML, gráficas...) se mide con un tramo:
+#     with METRICAS.tramo("limpieza"): ...        o        @METRICAS.medir("generate_dashboard")
+# Por etapa se guarda un histograma acumulado (cubetas fijas, como Prometheus) y una ventana con las últimas mediciones
+# para calcular p50/p95 recientes. Además se pueden registrar fuentes de indicadores (p. ej. CacheLRU.estadisticas).
+# Todo queda disponible en el panel de diagnóstico de la app y en formato de texto de Prometheus (archivo metricas.prom).
+# Medir cuesta dos perf_counter y un candado (~1 µs); con SICOIN_METRICAS=0 los tramos no hacen nada.
+HABILITADAS = os.environ.get("SICOIN_METRICAS", "1") != "0"
+VENTANA = int(os.environ.get("SICOIN_METRICAS_VENTANA", "500"))                # Mediciones recientes por etapa para p50/p95
+ARCHIVO = os.environ.get("SICOIN_METRICAS_ARCHIVO",
+                         os.path.join(os.environ.get("SICOIN_CACHE", ".sicoin"), "metricas.prom"))
+LIMITES = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)   # Segundos
+
+
+class Histograma:
+    def __init__(self):
+        self.cubetas = [0] * (len(LIMITES) + 1)                                # La última cubeta es +Inf
+        self.cuenta = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+        self.recientes = deque(maxlen=VENTANA)
+
+    def registrar(self, segundos):
+        self.cubetas[bisect.bisect_left(LIMITES, segundos)] += 1               # Prometheus: la cubeta "le" incluye su límite
+        self.cuenta += 1
+        self.suma += segundos
+        self.maximo = max(self.maximo, segundos)
+        self.recientes.append(segundos)
+
+    def percentil(self, p):
+        if not self.recientes:
+            return 0.0
+        ordenados = sorted(self.recientes)
+        return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+class _Tramo:
+    __slots__ = ("metricas", "etapa", "inicio")
+
+    def __init__(self, metricas, etapa):
+        self.metricas = metricas
+        self.etapa = etapa
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metricas.registrar(self.etapa, time.perf_counter() - self.inicio)
+        return False
+
+
+class _TramoInactivo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_INACTIVO = _TramoInactivo()
+
+
+class Metricas:
+    def __init__(self, habilitadas=HABILITADAS):
+        self.habilitadas = habilitadas
+        self._histogramas = {}                                                 # {etapa: Histograma}
+        self._fuentes = {}                                                     # {nombre: función que devuelve {indicador: número}}
+        self._candado = threading.Lock()
+        self._ultima_escritura = 0.0
+
+    #--------------- Medición ---------------#
+    def registrar(self, etapa, segundos):
+        if not self.habilitadas:
+            return
+        with self._candado:
+            histograma = self._histogramas.get(etapa)
+            if histograma is None:
+                histograma = self._histogramas[etapa] = Histograma()
+            histograma.registrar(segundos)
+
+    def tramo(self, etapa):
+        return _Tramo(self, etapa) if self.habilitadas else _INACTIVO
+
+    def medir(self, etapa=None):
+        # Decorador; debajo de @memorizar solo mide los cálculos reales (los aciertos de caché se ven en la fuente de la caché)
+        def decorador(funcion):
+            nombre = etapa or funcion.__name__
+
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                with self.tramo(nombre):
+                    return funcion(*args, **kwargs)
+            return envoltura
+        return decorador
+
+    def fuente(self, nombre, indicadores):
+        # indicadores() -> {"aciertos": 10, "tasa_aciertos": 0.8, ...}; se consulta solo al exportar
+        with self._candado:
+            self._fuentes[nombre] = indicadores
+
+    def limpiar(self):
+        with self._candado:
+            self._histogramas.clear()
+
+    #--------------- Consulta ---------------#
+    def resumen(self):
+        # Una fila por etapa, de la más costosa a la menos costosa (tiempo total)
+        with self._candado:
+            filas = [{"etapa": etapa, "llamadas": h.cuenta, "p50_ms": h.percentil(50) * 1000,
+                      "p95_ms": h.percentil(95) * 1000, "max_ms": h.maximo * 1000, "total_s": h.suma}
+                     for etapa, h in self._histogramas.items()]
+        return sorted(filas, key=lambda f: f["total_s"], reverse=True)
+
+    def indicadores(self):
+        with self._candado:
+            fuentes = dict(self._fuentes)
+        resultado = {}
+        for nombre, funcion in fuentes.items():
+            try:
+                resultado[nombre] = {k: v for k, v in funcion().items() if isinstance(v, (int, float))}
+            except Exception:                                                  # Una fuente que falla no debe tumbar la exportación
+                continue
+        return resultado
+
+    #--------------- Exportación (formato de texto de Prometheus) ---------------#
+    def prometheus(self):
+        with self._candado:
+            histogramas = {etapa: (list(h.cubetas), h.suma, h.cuenta) for etapa, h in self._histogramas.items()}
+        lineas = ["# HELP sicoin_etapa_segundos Duración de cada etapa de la app en segundos",
+                  "# TYPE sicoin_etapa_segundos histogram"]
+        for etapa, (cubetas, suma, cuenta) in sorted(histogramas.items()):
+            acumulado = 0
+            for limite, n in zip(LIMITES + ("+Inf",), cubetas):
+                acumulado += n
+                lineas.append(f'sicoin_etapa_segundos_bucket{{etapa="{etapa}",le="{limite}"}} {acumulado}')
+            lineas.append(f'sicoin_etapa_segundos_sum{{etapa="{etapa}"}} {suma:.6f}')
+            lineas.append(f'sicoin_etapa_segundos_count{{etapa="{etapa}"}} {cuenta}')
+
+        # Indicadores de las fuentes: una métrica por indicador con la fuente como etiqueta (sicoin_aciertos{fuente="cache_vistas"})
+        por_indicador = {}
+        for fuente, valores in sorted(self.indicadores().items()):
+            for indicador, valor in valores.items():
+                por_indicador.setdefault(indicador, []).append((fuente, valor))
+        for indicador, valores in por_indicador.items():
+            lineas.append(f"# TYPE sicoin_{indicador} gauge")
+            lineas += [f'sicoin_{indicador}{{fuente="{fuente}"}} {float(valor):g}' for fuente, valor in valores]
+        return "\n".join(lineas) + "\n"
+
+    def escribir(self, ruta=ARCHIVO):
+        # Se publica con un reemplazo atómico para que el recolector nunca lea un archivo a medias
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        temporal = f"{ruta}.parcial"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(temporal, ruta)
+        self._ultima_escritura = time.monotonic()
+
+    def publicar(self, intervalo=15.0, ruta=ARCHIVO):
+        # Escribe el archivo como máximo una vez cada `intervalo` segundos (se llama al final de cada rerun)
+        if self.habilitadas and time.monotonic() - self._ultima_escritura >= intervalo:
+            try:
+                self.escribir(ruta)
+            except OSError:
+                pass
+
+
+# Registro único del proceso: lo comparten la ingesta, las funciones de sicoin y todas las sesiones de la app
+METRICAS = Metricas()
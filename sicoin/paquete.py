@@ -0,0 +1,364 @@
+import argparse
+import dataclasses
+import json
+import os
+import struct
+import time
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from sicoin.actualizador import INTERVALO_MIN, Actualizador, Publicacion, construir_publicacion, validar_datos
+from sicoin.agregados import CuboAgregados
+from sicoin.busqueda import IndiceTexto
+from sicoin.conciliacion import Conciliacion
+from sicoin.esquema import VERSION_LIMPIEZA
+from sicoin.facetas import IndiceFacetas
+from sicoin.incremental import Cambios, detectar_cambios
+from sicoin.ingesta import Datasets, Ingesta
+from sicoin.metricas import METRICAS
+from sicoin.snapshots import restaurar_objetos, tabla_arrow
+
+
+#================================================== PAQUETE PRECALCULADO (un solo archivo listo para servir) ==================================================
+# `python -m sicoin.paquete construir` hace fuera de línea todo lo que la app haría al arrancar: descarga (Drive, carpeta local
+# o HTTP), lectura y limpieza de los cuatro Excel, índice de facetas, cubo de agregados, conciliación de las bases e índice de búsqueda.
+# El resultado se guarda en un solo archivo con esta estructura:
+#   MAGICO | longitud del manifiesto (8 bytes) | manifiesto JSON | relleno | secciones alineadas a ALINEACION bytes
+# Cada estructura (cubo, facetas, conciliación, búsqueda) se entrega como arreglos planos y valores de JSON (su método partes()):
+#   - cada DataFrame (las tablas, sus reacomodos del cubo, los documentos del índice de búsqueda) es un archivo Arrow IPC
+#   - cada arreglo de Arrow (llaves ordenadas, vocabulario) es un Arrow IPC de una columna
+#   - cada arreglo de numpy (rangos de llaves, matrices del cubo, postings) son sus bytes tal cual
+#   - lo demás (listas de los filtros, nombres de columnas, cambios) va en una última sección JSON que apunta a las anteriores
+# Al cargar, el archivo se mapea en memoria (pa.memory_map) y las columnas y arreglos son vistas del mapeo (np.frombuffer y
+# to_pandas sin copia para números, categorías y textos; los NaN de las columnas float se guardan como valores y no como nulos
+# para que tampoco se copien). Solo se copian las columnas Int16 y de fechas con vacíos, que son pocas y pequeñas.
+# El manifiesto (versión de datos, sha256 de cada Excel, versión de la limpieza, fecha, filas por base, versión de pandas)
+# se lee sin cargar el resto, así que revisar si el paquete cambió cuesta una lectura de pocos bytes.
+# Con SICOIN_PAQUETE=<ruta> la app arranca desde el paquete sin leer ningún Excel; el actualizador revisa el manifiesto cada
+# REVISION_S segundos (en lugar de cada SICOIN_REFRESCO_MIN minutos) y vuelve a cargar el paquete cuando se reemplaza el archivo
+# (p. ej. un cron que construye en otra ruta del mismo disco y la mueve encima con mv), así que una versión nueva llega a las
+# sesiones a lo más REVISION_S segundos después. Reemplazar, no sobrescribir: copiar encima (cp) modifica las páginas que los
+# procesos en marcha tienen mapeadas.
+#
+# Varias réplicas en el mismo equipo (`python -m sicoin.paquete publicar /dev/shm/sicoin/datos.sicoin`): un solo proceso descarga
+# y recalcula (con el mismo actualizador de la app, incremental incluido) y reemplaza el paquete de forma atómica en cada versión
+# nueva; la ruta funciona como puntero a la versión vigente. Los procesos de Streamlit con SICOIN_PAQUETE en esa ruta mapean el
+# mismo archivo, así que la descarga y la memoria de las tablas se pagan una vez por equipo (en /dev/shm, o en disco mediante la
+# caché de páginas del sistema operativo) y no una vez por proceso. Un archivo reemplazado sigue existiendo mientras algún
+# proceso lo tenga mapeado.
+# Cargar un paquete no ejecuta código (solo JSON, Arrow IPC y bytes de arreglos): un archivo alterado o truncado produce un error.
+RUTA = os.environ.get("SICOIN_PAQUETE", "").strip() or None
+REVISION_S = float(os.environ.get("SICOIN_PAQUETE_REVISION_S", "10"))   # Cada cuántos segundos se revisa el manifiesto del paquete
+MAGICO = b"SICOINPQ"
+FORMATO = 5                       # Cambia si cambia la estructura del archivo o de lo que se serializa
+EXTENSION = ".sicoin"
+ALINEACION = 64                   # Bytes; inicio de la sección de datos y de cada buffer
+
+
+def _version_pandas():
+    return ".".join(pd.__version__.split(".")[:2])
+
+
+def manifiesto_de(publicacion, fuente=""):
+    datos = publicacion.datos
+    return {
+        "formato": FORMATO,
+        "version": datos.version,
+        "limpieza": VERSION_LIMPIEZA,
+        "pandas": _version_pandas(),
+        "fecha": publicacion.fecha,
+        "fuente": fuente,
+        "hashes": dict(datos.hashes),
+        "filas": {nombre: len(df) for nombre, df in datos.tablas.items()},
+    }
+
+
+def _alinear(posicion):
+    return -(-posicion // ALINEACION) * ALINEACION
+
+
+#------------------------------------------------ Contenido: secciones de arreglos y JSON que las referencia ------------------------------------------------#
+def _tabla(df):
+    # Los NaN de las columnas float quedan como valores (sin máscara de nulos de Arrow): al cargar la columna es una vista del mapeo
+    tabla = tabla_arrow(df, preserve_index=None)                              # Un índice que no es RangeIndex (reacomodos del cubo) se conserva
+    for columna, serie in df.items():
+        indice = tabla.schema.get_field_index(columna)
+        if isinstance(serie.dtype, np.dtype) and serie.dtype.kind == "f" and indice >= 0:
+            tabla = tabla.set_column(indice, tabla.schema.field(indice), pa.array(serie.to_numpy(), from_pandas=False))
+    return tabla
+
+
+def _ipc(tabla):
+    salida = pa.BufferOutputStream()
+    with pa.ipc.new_file(salida, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    return salida.getvalue()
+
+
+class _Secciones:
+    # Al codificar, cada DataFrame, arreglo de Arrow o arreglo de numpy se vuelve una sección y en el JSON queda su referencia:
+    # {"$tabla": i}, {"$arrow": i} o {"$arreglo": i, "tipo": ..., "forma": [...]}. Un objeto compartido (la tabla que el cubo
+    # reutiliza cuando ya viene ordenada) se guarda una sola vez y al cargar vuelve a ser un solo objeto.
+    def __init__(self):
+        self.bloques = []
+        self._referencias = {}                                                 # id(objeto) -> referencia
+        self._objetos = []                                                     # Mantiene vivos los objetos (sus id no se reutilizan)
+
+    def _agregar(self, bloque):
+        self.bloques.append(memoryview(bloque).cast("B"))
+        return len(self.bloques) - 1
+
+    def codificar(self, objeto):
+        if isinstance(objeto, dict):
+            return {clave: self.codificar(valor) for clave, valor in objeto.items()}
+        if isinstance(objeto, (list, tuple, frozenset)):
+            return [self.codificar(valor) for valor in objeto]
+        if isinstance(objeto, np.generic):
+            return objeto.item()
+        if not isinstance(objeto, (pd.DataFrame, pa.Array, np.ndarray)):
+            return objeto
+        if id(objeto) not in self._referencias:
+            if isinstance(objeto, pd.DataFrame):
+                referencia = {"$tabla": self._agregar(_ipc(_tabla(objeto)))}
+            elif isinstance(objeto, pa.Array):
+                referencia = {"$arrow": self._agregar(_ipc(pa.table({"valores": objeto})))}
+            elif objeto.dtype.hasobject:
+                raise TypeError("Un arreglo object no se puede guardar en el paquete")
+            else:
+                referencia = {"$arreglo": self._agregar(np.ascontiguousarray(objeto)), "tipo": objeto.dtype.str, "forma": list(objeto.shape)}
+            self._referencias[id(objeto)] = referencia
+            self._objetos.append(objeto)
+        return self._referencias[id(objeto)]
+
+
+class _Lector:
+    # Lo inverso de _Secciones sobre el archivo mapeado: cada referencia se vuelve una vista del mapeo (sin copiar los datos)
+    def __init__(self, mapa, inicio, secciones):
+        self._mapa = mapa
+        self._inicio = inicio
+        self._secciones = secciones
+        self._leidas = {}                                                      # Una sola vista por sección
+
+    def seccion(self, numero):
+        posicion, longitud = self._secciones[numero]
+        return self._mapa.slice(self._inicio + posicion, longitud)
+
+    def decodificar(self, objeto):
+        if isinstance(objeto, list):
+            return [self.decodificar(valor) for valor in objeto]
+        if not isinstance(objeto, dict):
+            return objeto
+        for tipo in ("$tabla", "$arrow", "$arreglo"):
+            if tipo in objeto:
+                if objeto[tipo] not in self._leidas:
+                    self._leidas[objeto[tipo]] = self._leer(tipo, objeto)
+                return self._leidas[objeto[tipo]]
+        return {clave: self.decodificar(valor) for clave, valor in objeto.items()}
+
+    def _leer(self, tipo, referencia):
+        seccion = self.seccion(referencia[tipo])
+        if tipo == "$arreglo":
+            return np.frombuffer(seccion, dtype=np.dtype(referencia["tipo"])).reshape(referencia["forma"])
+        tabla = pa.ipc.open_file(seccion).read_all()
+        if tipo == "$arrow":
+            columna = tabla.column(0)
+            return columna.chunk(0) if columna.num_chunks == 1 else columna.combine_chunks()
+        return restaurar_objetos(tabla.to_pandas(split_blocks=True), tabla)
+
+
+def _contenido(publicacion):
+    cambios = publicacion.cambios
+    return {
+        "tablas": dict(publicacion.datos.tablas),
+        "facetas": publicacion.facetas.partes(),
+        "cubo": publicacion.cubo.partes(),
+        "conciliacion": publicacion.conciliacion.partes() if publicacion.conciliacion is not None else None,
+        "busqueda": publicacion.busqueda.partes() if publicacion.busqueda is not None else None,
+        "cambios": None if cambios is None else {
+            "version_anterior": cambios.version_anterior, "total_llaves": cambios.total_llaves,
+            "llaves": [[base, alcance, llaves] for (base, alcance), llaves in cambios.llaves.items()]},
+    }
+
+
+def _publicacion(manifiesto, contenido):
+    datos = Datasets(manifiesto["version"], MappingProxyType(contenido["tablas"]), MappingProxyType(manifiesto["hashes"]))
+    validar_datos(datos)
+    cambios = contenido["cambios"]
+    if cambios is not None:
+        cambios = Cambios(cambios["version_anterior"], {(base, alcance): frozenset(map(tuple, llaves)) for base, alcance, llaves in cambios["llaves"]},
+                          cambios["total_llaves"])
+    conciliacion, busqueda = contenido["conciliacion"], contenido["busqueda"]
+    return Publicacion(datos, IndiceFacetas.desde_partes(contenido["facetas"]), CuboAgregados.desde_partes(contenido["cubo"], datos),
+                       manifiesto["fecha"], cambios,
+                       Conciliacion.desde_partes(conciliacion) if conciliacion is not None else None,
+                       IndiceTexto.desde_partes(busqueda) if busqueda is not None else None)
+
+
+#------------------------------------------------ Escritura (atómica) ------------------------------------------------#
+def guardar(publicacion, ruta, fuente=""):
+    secciones = _Secciones()
+    estructura = json.dumps(secciones.codificar(_contenido(publicacion)), ensure_ascii=False).encode("utf-8")
+    bloques = secciones.bloques + [memoryview(estructura)]                    # El JSON del contenido es la última sección
+
+    # Posiciones relativas al inicio de la sección de datos, cada una alineada
+    posiciones, posicion = [], 0
+    for bloque in bloques:
+        posicion = _alinear(posicion)
+        posiciones.append([posicion, bloque.nbytes])
+        posicion += bloque.nbytes
+    manifiesto = manifiesto_de(publicacion, fuente)
+    manifiesto.update(secciones=posiciones, contenido=len(bloques) - 1)
+    manifiesto = json.dumps(manifiesto, ensure_ascii=False).encode("utf-8")
+
+    temporal = f"{ruta}.parcial"
+    with open(temporal, "wb") as salida:
+        cabecera = MAGICO + struct.pack("<Q", len(manifiesto)) + manifiesto
+        salida.write(cabecera + bytes(_alinear(len(cabecera)) - len(cabecera)))
+        escrito = 0
+        for (inicio, _), bloque in zip(posiciones, bloques):
+            salida.write(bytes(inicio - escrito))
+            salida.write(bloque)
+            escrito = inicio + bloque.nbytes
+    os.replace(temporal, ruta)
+    return ruta
+
+
+#------------------------------------------------ Lectura (mapeada en memoria) ------------------------------------------------#
+def _abrir(archivo, ruta):
+    if archivo.read(len(MAGICO)) != MAGICO:
+        raise ValueError(f"{ruta} no es un paquete de SICOIN")
+    (longitud,) = struct.unpack("<Q", archivo.read(8))
+    manifiesto = json.loads(archivo.read(longitud).decode("utf-8"))
+    if manifiesto.get("formato") != FORMATO:
+        raise ValueError(f"El paquete usa el formato {manifiesto.get('formato')} y esta versión lee el {FORMATO}; vuelva a construirlo")
+    if manifiesto.get("limpieza") != VERSION_LIMPIEZA:
+        raise ValueError(f"El paquete se limpió con la versión {manifiesto.get('limpieza')} y la app usa la {VERSION_LIMPIEZA}; vuelva a construirlo")
+    if manifiesto.get("pandas") != _version_pandas():
+        raise ValueError(f"El paquete se construyó con pandas {manifiesto.get('pandas')} y aquí está {_version_pandas()}; vuelva a construirlo")
+    return manifiesto
+
+
+def leer_manifiesto(ruta):
+    with open(ruta, "rb") as archivo:
+        return _abrir(archivo, ruta)
+
+
+def cargar(ruta):
+    # Manifiesto y contenido salen del mismo mapeo (aunque otro proceso reemplace el archivo mientras tanto). El mapeo es de
+    # solo lectura y sigue vivo mientras alguna columna o arreglo lo use, aunque el archivo se reemplace o se cierre.
+    with METRICAS.tramo("paquete_lectura"), pa.memory_map(ruta, "r") as archivo:
+        manifiesto = _abrir(archivo, ruta)
+        inicio = _alinear(archivo.tell())
+        archivo.seek(0)
+        lector = _Lector(archivo.read_buffer(), inicio, manifiesto["secciones"])
+        contenido = lector.decodificar(json.loads(lector.seccion(manifiesto["contenido"]).to_pybytes()))
+        return _publicacion(manifiesto, contenido)
+
+
+class IngestaPaquete:
+    # Sustituye a Ingesta en el Actualizador: en lugar de descargar y limpiar los Excel lee el paquete, y solo lo vuelve a
+    # cargar completo si su manifiesto trae otra versión de datos. La publicación ya viene armada (construir no recalcula nada).
+    def __init__(self, ruta, revision_s=REVISION_S):
+        self.ruta = ruta
+        self.intervalo_min = revision_s / 60                                   # Para el Actualizador: revisar el manifiesto cuesta pocos bytes
+        self.actual = None                                                     # Último Datasets cargado
+        self._publicacion = None
+
+    def ejecutar(self):
+        version = leer_manifiesto(self.ruta)["version"]
+        if self.actual is not None and self.actual.version == version:
+            return self.actual
+        self._publicacion = cargar(self.ruta)
+        self.actual = self._publicacion.datos
+        return self.actual
+
+    def construir(self, datos, anterior=None):
+        if self._publicacion is None or self._publicacion.datos is not datos:
+            return construir_publicacion(datos, anterior)
+        # La caché de vistas conserva lo que no cambió entre el paquete anterior y el nuevo: el publicador ya trae los cambios
+        # respecto a su versión anterior; si este proceso se saltó alguna versión se comparan las tablas
+        cambios = self._publicacion.cambios
+        if anterior is None:
+            cambios = None
+        elif cambios is None or cambios.version_anterior != anterior.version:
+            cambios = detectar_cambios(anterior.datos, datos)
+        return dataclasses.replace(self._publicacion, cambios=cambios)
+
+
+def ingesta_desde_entorno():
+    # La ingesta de la app y de la API (sicoin/api.py): el paquete de SICOIN_PAQUETE o los Excel de SICOIN_FUENTE / Google Drive
+    if RUTA:
+        return IngestaPaquete(RUTA)
+    from sicoin.descarga import ARCHIVOS, fuente_desde_entorno
+    from sicoin.lectores import LECTOR_POR_OMISION
+
+    return Ingesta(fuente_desde_entorno(ARCHIVOS), lector=LECTOR_POR_OMISION)
+
+
+#================================================== USO DESDE LA LÍNEA DE COMANDOS ==================================================
+#   python -m sicoin.paquete construir sicoin.sicoin [--fuente carpeta|url]
+#   python -m sicoin.paquete publicar /dev/shm/sicoin/datos.sicoin [--fuente carpeta|url] [--intervalo-min 60]
+#   python -m sicoin.paquete info sicoin.sicoin
+# Sin --fuente los Excel se obtienen como en la app (SICOIN_FUENTE o Google Drive, SICOIN_LECTOR).
+def publicar(ingesta, ruta, fuente, intervalo_min=INTERVALO_MIN):
+    # Proceso publicador: el actualizador de la app, que además escribe el paquete de cada versión nueva antes de publicarla
+    # (si la escritura falla se conserva la versión anterior, en memoria y en disco)
+    def construir(datos, anterior=None):
+        publicacion = construir_publicacion(datos, anterior)
+        with METRICAS.tramo("paquete_escritura"):
+            guardar(publicacion, ruta, fuente)
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} Versión {publicacion.version} publicada en {ruta} "
+              f"({'incremental' if publicacion.cambios else 'completa'}, {os.path.getsize(ruta) / 2**20:.2f} MB)", flush=True)
+        return publicacion
+
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    actualizador = Actualizador(ingesta, intervalo_min, construir=construir)
+    actualizador.iniciar()
+    try:
+        while True:
+            time.sleep(3600)                      # El trabajo lo hace el hilo del actualizador
+    except KeyboardInterrupt:
+        actualizador.detener()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m sicoin.paquete", description="Construye, publica o describe el paquete precalculado de la app")
+    parser.add_argument("accion", choices=["construir", "publicar", "info"])
+    parser.add_argument("ruta", help=f"Archivo del paquete (p. ej. datos{EXTENSION})")
+    parser.add_argument("--fuente", default=None, help="Carpeta local o URL con los cuatro Excel (sustituye a SICOIN_FUENTE)")
+    parser.add_argument("--intervalo-min", type=float, default=None, help="publicar: minutos entre actualizaciones (SICOIN_REFRESCO_MIN)")
+    args = parser.parse_args(argv)
+
+    if args.accion == "info":
+        manifiesto = leer_manifiesto(args.ruta)
+        manifiesto["fecha"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(manifiesto["fecha"]))
+        secciones = manifiesto.pop("secciones")
+        manifiesto["secciones"] = f"{len(secciones)} ({sum(longitud for _, longitud in secciones) / 2**20:.2f} MB mapeables)"
+        del manifiesto["contenido"]
+        print(json.dumps(manifiesto, ensure_ascii=False, indent=2))
+        print(f"Tamaño: {os.path.getsize(args.ruta) / 2**20:.2f} MB")
+        return
+
+    from sicoin.descarga import ARCHIVOS, fuente_desde_entorno
+    from sicoin.lectores import LECTOR_POR_OMISION
+
+    if args.fuente:
+        os.environ["SICOIN_FUENTE"] = args.fuente
+    fuente = os.environ.get("SICOIN_FUENTE", "") or "Google Drive"
+    ingesta = Ingesta(fuente_desde_entorno(ARCHIVOS), lector=LECTOR_POR_OMISION)
+    if args.accion == "publicar":
+        publicar(ingesta, args.ruta, fuente, INTERVALO_MIN if args.intervalo_min is None else args.intervalo_min)
+        return
+    inicio = time.perf_counter()
+    publicacion = construir_publicacion(ingesta.ejecutar())
+    calculo = time.perf_counter() - inicio
+    guardar(publicacion, args.ruta, fuente)
+    print(f"Paquete {publicacion.version} escrito en {args.ruta} ({os.path.getsize(args.ruta) / 2**20:.2f} MB; "
+          f"cálculo {calculo:.2f} s, escritura {time.perf_counter() - inicio - calculo:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from sicoin.esquema import columnas_cumplimiento, trimestres
+
+
+#================================================== REPORTE NACIONAL POR AÑO (RANKINGS Y DISTRIBUCIONES) ==================================================
+# Para un año se calcula, con un groupby por base (PTAR, PTCI y AMTRI), una fila por institución y una por sector con:
+#   - Cumplimiento General de las NGCI (PTCI), Riesgos_Totales y AC_Total (PTAR)
+#   - Cumplimiento por trimestre de las Acciones de Control (PTAR) y de las Acciones de Mejora (PTCI)
+#   - Acciones de Mejora Suficientes e Insuficientes (AMTRI)
+#   - lugar nacional y lugar dentro del sector según el Cumplimiento de las NGCI
+# Los valores siguen las mismas reglas que las pestañas PTAR y PTCI: por institución el primer registro (PTAR/PTCI) o la suma
+# (AMTRI, cumplimiento de AM); por sector sumas, promedios con vacíos = 0 para los cumplimientos trimestrales y promedio de los
+# valores válidos para las NGCI. La app guarda el resultado por (año, versión de datos).
+NGCI = "Cumplimiento_General_de_las_NGCI"
+CUMPLIMIENTO_AC = [f"AC_{t}Cumplimiento" for t in trimestres]                 # PTAR: {t}Cumplimiento
+CUMPLIMIENTO_AM = [f"AM_{t}Cumplimiento" for t in trimestres]                 # PTCI: {t}Cumplimiento
+DETALLE_AM = ["Suficientes", "Insuficientes"]
+RANGOS = [0, 20, 40, 60, 80, 100]
+
+# Columnas (y títulos) de las tablas del reporte
+columnas_instituciones = {
+    "Lugar_NGCI": "Lugar nacional", "Lugar_sector": "Lugar en el sector", "Institución": "Institución", "Siglas": "Siglas",
+    "Sector": "Sector", NGCI: "Cumplimiento NGCI", "Riesgos_Totales": "Riesgos", "AC_Total": "Acciones de Control",
+    **{c: f"Cumpl. AC T{t}" for t, c in zip(trimestres, CUMPLIMIENTO_AC)},
+    **{c: f"Cumpl. AM T{t}" for t, c in zip(trimestres, CUMPLIMIENTO_AM)},
+    "Suficientes": "AM Suficientes", "Insuficientes": "AM Insuficientes",
+}
+columnas_sectores = {
+    "Lugar_NGCI": "Lugar", "Sector": "Sector", "Instituciones": "Instituciones", NGCI: "Cumplimiento NGCI (promedio)",
+    "Riesgos_Totales": "Riesgos", "AC_Total": "Acciones de Control",
+    **{c: f"Cumpl. AC T{t}" for t, c in zip(trimestres, CUMPLIMIENTO_AC)},
+    **{c: f"Cumpl. AM T{t}" for t, c in zip(trimestres, CUMPLIMIENTO_AM)},
+    "Suficientes": "AM Suficientes", "Insuficientes": "AM Insuficientes",
+}
+
+
+@dataclass(frozen=True)
+class ReporteAnual:
+    año: int
+    instituciones: pd.DataFrame        # Una fila por institución, ordenadas por lugar nacional
+    sectores: pd.DataFrame             # Una fila por sector, ordenadas por lugar
+    distribucion: pd.DataFrame         # Instituciones por rango de cumplimiento (filas) e indicador (columnas)
+
+
+def años_disponibles(datos):
+    return sorted(set(datos["PTAR"]["Año"].dropna().tolist()) | set(datos["PTCI"]["Año"].dropna().tolist()))
+
+
+def _del_año(df, año):
+    # Filas del año con Institución y Sector como texto (las categorías de cada base tienen códigos distintos)
+    # y los porcentajes en float64, igual que en el cubo de agregados
+    df = df[df["Año"] == año].dropna(subset=["Institución"])
+    return df.assign(**{c: df[c].astype(object) for c in ("Institución", "Sector", "Siglas") if c in df.columns},
+                     **{c: df[c].astype("float64") for c in columnas_cumplimiento + [NGCI] if c in df.columns})
+
+
+def _redondear(serie, decimales=2):
+    # round de Python (no np.round) para mostrar exactamente lo mismo que las pestañas PTAR y PTCI
+    return serie.map(lambda v: v if pd.isna(v) else round(float(v), decimales)).astype("float64")
+
+
+def _renombrar_cumplimiento(columnas, prefijo):
+    return {f"{t}Cumplimiento": f"{prefijo}_{t}Cumplimiento" for t in trimestres if f"{t}Cumplimiento" in columnas}
+
+
+def _lugares(df, columna, grupos=None):
+    # 1 = mayor cumplimiento; empates comparten lugar; sin dato queda sin lugar
+    valores = df[columna] if grupos is None else df.groupby(grupos, sort=False)[columna]
+    return valores.rank(ascending=False, method="min").astype("Int64")
+
+
+def _por_institucion(ptar, ptci, amtri):
+    ac = _renombrar_cumplimiento(ptar.columns, "AC")
+    am = _renombrar_cumplimiento(ptci.columns, "AM")
+    claves = ["Institución", "Sector", "Siglas"]
+
+    primeros_ptar = ptar.drop_duplicates("Institución").rename(columns=ac)
+    primeros_ptar = primeros_ptar[claves + [c for c in ["Riesgos_Totales", "AC_Total"] + list(ac.values()) if c in primeros_ptar]]
+    primeros_ptci = ptci.drop_duplicates("Institución")[claves + ([NGCI] if NGCI in ptci.columns else [])]
+    suma_am = ptci.groupby("Institución", sort=False)[list(am)].sum().rename(columns=am)
+    suma_detalle = amtri.groupby("Institución", sort=False)[[c for c in DETALLE_AM if c in amtri.columns]].sum()
+
+    tabla = primeros_ptar.set_index("Institución").combine_first(primeros_ptci.set_index("Institución"))
+    tabla = tabla.join(suma_am).join(suma_detalle)
+    for c in ac.values():
+        tabla[c] = _redondear(tabla[c].fillna(0))                             # Como la pestaña PTAR (vacío = 0)
+    if NGCI in tabla:
+        tabla[NGCI] = _redondear(tabla[NGCI])
+    return _enteros(tabla, list(am.values())).reset_index()
+
+
+def _enteros(tabla, cumplimiento_am):
+    # Conteos vacíos = 0; el cumplimiento de AM queda vacío si el alcance no tiene registros de PTCI
+    conteos = [c for c in ["Riesgos_Totales", "AC_Total"] + DETALLE_AM if c in tabla]
+    tabla[conteos] = tabla[conteos].fillna(0).round().astype("int64")
+    tabla[cumplimiento_am] = tabla[cumplimiento_am].astype("float64").round().astype("Int64")
+    return tabla
+
+
+def _por_sector(ptar, ptci, amtri):
+    ac = _renombrar_cumplimiento(ptar.columns, "AC")
+    am = _renombrar_cumplimiento(ptci.columns, "AM")
+    sumas_ptar = ptar.groupby("Sector", sort=False)[[c for c in ["Riesgos_Totales", "AC_Total"] if c in ptar]].sum()
+    medias_ac = ptar[["Sector"] + list(ac)].fillna({c: 0 for c in ac}).groupby("Sector", sort=False).mean().rename(columns=ac)
+    medias_am = ptci[["Sector"] + list(am)].fillna({c: 0 for c in am}).groupby("Sector", sort=False).mean().rename(columns=am)
+    ngci = ptci.groupby("Sector", sort=False)[[NGCI]].mean() if NGCI in ptci else pd.DataFrame()
+    detalle = amtri.groupby("Sector", sort=False)[[c for c in DETALLE_AM if c in amtri.columns]].sum()
+    instituciones = pd.concat([ptar[["Sector", "Institución"]], ptci[["Sector", "Institución"]]]).drop_duplicates()
+
+    tabla = (instituciones.groupby("Sector", sort=False).size().rename("Instituciones").to_frame()
+             .join([sumas_ptar, medias_ac, ngci, medias_am, detalle]))
+    for c in list(ac.values()) + ([NGCI] if NGCI in tabla else []):
+        tabla[c] = _redondear(tabla[c])
+    return _enteros(tabla, list(am.values())).reset_index()
+
+
+def _distribucion(instituciones):
+    # Instituciones por rango de 20 puntos de cada indicador de cumplimiento (más las que no tienen dato)
+    etiquetas = [f"{a}–{b}%" for a, b in zip(RANGOS[:-1], RANGOS[1:])]
+    indicadores = {"Cumplimiento NGCI": NGCI, **{columnas_instituciones[c]: c for c in CUMPLIMIENTO_AC + CUMPLIMIENTO_AM}}
+    distribucion = {}
+    for titulo, columna in indicadores.items():
+        if columna not in instituciones:
+            continue
+        valores = instituciones[columna].astype("float64")
+        rangos = pd.cut(valores.clip(RANGOS[0], RANGOS[-1]), RANGOS, labels=etiquetas, include_lowest=True)
+        conteo = rangos.value_counts(sort=False).reindex(etiquetas, fill_value=0)
+        distribucion[titulo] = np.append(conteo.to_numpy(), valores.isna().sum())
+    return pd.DataFrame(distribucion, index=pd.Index(etiquetas + ["Sin dato"], name="Rango"))
+
+
+def reporte_anual(datos, año):
+    ptar, ptci, amtri = (_del_año(datos[base], año) for base in ("PTAR", "PTCI", "AMTRI"))
+
+    instituciones = _por_institucion(ptar, ptci, amtri)
+    if NGCI in instituciones:
+        instituciones["Lugar_NGCI"] = _lugares(instituciones, NGCI)
+        instituciones["Lugar_sector"] = _lugares(instituciones, NGCI, "Sector")
+        instituciones = instituciones.sort_values(["Lugar_NGCI", "Institución"], na_position="last", kind="stable")
+
+    sectores = _por_sector(ptar, ptci, amtri)
+    if NGCI in sectores:
+        sectores["Lugar_NGCI"] = _lugares(sectores, NGCI)
+        sectores = sectores.sort_values(["Lugar_NGCI", "Sector"], na_position="last", kind="stable")
+
+    return ReporteAnual(
+        año=año,
+        instituciones=instituciones[[c for c in columnas_instituciones if c in instituciones]].reset_index(drop=True),
+        sectores=sectores[[c for c in columnas_sectores if c in sectores]].reset_index(drop=True),
+        distribucion=_distribucion(instituciones),
+    )
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from sicoin.esquema import detalle_cols, estados, trimestres
+
+
+#================================================== VALORES DE LAS PESTAÑAS PTAR Y PTCI POR ALCANCE ==================================================
+# Números que muestran las pestañas PTAR (generate_dashboard) y PTCI (generate_ptci) para una institución (sector = "Todas")
+# o un sector y un año, sin HTML. La app arma sus tablas con estos valores y la exportación a Excel los escribe tal cual,
+# así que ambas siempre coinciden.
+
+def resumen_ptar(cubo, institucion, year, sector):
+    # Devuelve (agregado, data): el agregado del cubo (para la cabecera) y el diccionario de valores ya limpio
+  #----- Parte 1: Obtiene data para reportes desde el cubo de agregados -----#
+    if sector != "Todas":                                                               # Caso 1: Sector != "Todas"
+        agregado = cubo.consultar("PTAR", "Sector", sector, year)                       # Agregados de PTAR para el Sector y Año (búsqueda directa)
+        data = dict(agregado.sumas)                                                     # Acumulados del sector (acumulados por que es un sector)
+        for t in trimestres:                                                            # El Cumplimiento por Sector se obtiene en promedio
+            key = f"{t}Cumplimiento"
+            if key in agregado.medias:                                                  # Revisa si existe Key (nCumplimiento) como columna numérica de PTAR
+                data[key] = round(float(agregado.medias[key]), 2)                       # Promedio con NaN = 0, con dos decimales
+    else:                                                                               # Caso 2: sector = "Todas" (Filtro por Institución y Año)
+        agregado = cubo.consultar("PTAR", "Institución", institucion, year)             # Se usa el primer registro por que nadamas hay uno
+        data = dict(agregado.primeros)
+
+  #---- Parte 2: Se limpia el data obtenido - se cambian NaN por 0 -----#
+    for key in data:
+        if pd.isna(data[key]):
+            data[key] = 0
+        elif isinstance(data[key], (int, float, np.integer, np.floating)) and not str(key).endswith("Cumplimiento"):   # Los conteos vienen con tipos pequeños (int16, int8...)
+            data[key] = int(round(data[key]))
+    return agregado, data
+
+
+def resumen_ptci(cubo, institucion, year, sector):
+    # Devuelve None si no hay registros de PTCI; si no, (cum_ngci, valores_ptci, detalle, data_ptci_dict)
+    alcance, valor_alcance = ("Sector", sector) if sector != "Todas" else ("Institución", institucion)
+    agregado_ptci = cubo.consultar("PTCI", alcance, valor_alcance, year)
+    agregado_amtri = cubo.consultar("AMTRI", alcance, valor_alcance, year)
+    if agregado_ptci.filas == 0:
+        return None
+
+      #---------------------- Cumplimiento General de las NGCI: promedio para sector, valor directo para institución -------------------#
+    if sector != "Todas":
+        cum_ngci = round(float(agregado_ptci.medias_validas['Cumplimiento_General_de_las_NGCI']), 2)
+    else:
+        cum_ngci = round(agregado_ptci.primeros['Cumplimiento_General_de_las_NGCI'], 2)
+
+      #-------------- Indicadores del Programa de Trabajo (dependen de la condición sobre el sector) ------------#
+    if sector == "Todas":
+        ptci_cols = ["Acciones_de_Mejora_Programa_Original", "Se_Actualizó_el_Programa", "No_Se_Actualizó_el_Programa",
+                     "TotalAcciones_de_Mejora_Programa_Actualizado"]
+    else:
+        ptci_cols = ["Acciones_de_Mejora_Programa_Original", "TotalAcciones_de_Mejora_Programa_Actualizado"]
+    valores_ptci = {}
+    for col in ptci_cols:
+        if sector == "Todas" and col in ["Se_Actualizó_el_Programa", "No_Se_Actualizó_el_Programa"]:
+            valores_ptci[col] = agregado_ptci.primeros.get(col, "N/A")
+        else:
+            valores_ptci[col] = int(round(agregado_ptci.sumas.get(col, 0)))
+
+      #-------------- Detalle de las Acciones de Mejora (AMTRI) ------------#
+    detalle = {col: int(round(agregado_amtri.sumas.get(col, 0))) for col in detalle_cols}
+
+      #-------------- Seguimiento de las acciones de mejora: el Cumplimiento de un sector es el promedio ------------#
+    data_ptci_dict = {}
+    for t in trimestres:
+        for estado in estados:
+            key = f"{t}{estado}"
+            if key in agregado_ptci.sumas:
+                if estado == "Cumplimiento" and sector != "Todas":
+                    value = agregado_ptci.medias[key]
+                else:
+                    value = agregado_ptci.sumas[key]
+            else:
+                value = 0
+            data_ptci_dict[key] = int(round(value))
+
+    return cum_ngci, valores_ptci, detalle, data_ptci_dict
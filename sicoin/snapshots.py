@@ -0,0 +1,134 @@
+import argparse
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+from sicoin.descarga import DIRECTORIO_TRABAJO
+from sicoin.metricas import METRICAS
+
+
+#================================================== CONFIGURACIÓN DE LAS INSTANTÁNEAS (SNAPSHOTS) ==================================================
+# Cada DataFrame ya leído y limpio se guarda en formato columnar Arrow IPC (sin compresión para poder mapearlo en memoria).
+# El nombre del archivo incluye el hash del .xlsx de origen y la versión de la limpieza, así que cualquier cambio en
+# cualquiera de los dos invalida la instantánea automáticamente.
+DIRECTORIO_SNAPSHOTS = os.path.join(DIRECTORIO_TRABAJO, "snapshots")
+LIMITE_MB = float(os.environ.get("SICOIN_SNAPSHOTS_MB", "512"))
+EXTENSION = ".arrow"
+
+
+def tabla_arrow(df, preserve_index=False):
+    # Arrow no admite columnas object con tipos mezclados (p. ej. números y textos en "AC"); esas columnas se guardan como texto
+    try:
+        return pa.Table.from_pandas(df, preserve_index=preserve_index)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        df = df.copy()
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+        return pa.Table.from_pandas(df, preserve_index=preserve_index)
+
+
+def restaurar_objetos(df, tabla):
+    # Las columnas que en pandas eran object con números (Excel mezcla enteros y decimales) Arrow las devuelve como
+    # float64/int64; se regresan a object con enteros exactos para que se muestren igual que al leer el Excel ("55%" y no "55.0%")
+    columnas = (tabla.schema.pandas_metadata or {}).get("columns", [])
+    for col in (c["name"] for c in columnas if c.get("numpy_type") == "object"):
+        if col in df.columns and df[col].dtype.kind in "if":
+            serie = df[col]
+            enteros = serie.notna() & (serie % 1 == 0)
+            objeto = serie.astype(object)
+            objeto[enteros] = pd.Series(serie[enteros].astype("int64").tolist(), index=serie.index[enteros], dtype=object)
+            df[col] = objeto
+    return df
+
+
+class AlmacenSnapshots:
+    def __init__(self, directorio=None, limite_mb=None, version="1"):
+        self.directorio = directorio or DIRECTORIO_SNAPSHOTS
+        self.limite_bytes = int((LIMITE_MB if limite_mb is None else limite_mb) * 2**20)
+        self.version = str(version)
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def ruta(self, nombre, sha256):
+        base = os.path.splitext(nombre)[0]
+        return os.path.join(self.directorio, f"{base}__{sha256[:20]}__v{self.version}{EXTENSION}")
+
+    def _archivos(self, nombre=None):
+        prefijo = f"{os.path.splitext(nombre)[0]}__" if nombre else ""
+        return [os.path.join(self.directorio, f) for f in os.listdir(self.directorio)
+                if f.endswith(EXTENSION) and f.startswith(prefijo)]
+
+    #------------------------------------------------ Lectura (mapeada en memoria) ------------------------------------------------#
+    def leer(self, nombre, sha256):
+        ruta = self.ruta(nombre, sha256)
+        try:
+            with pa.memory_map(ruta, "r") as fuente:
+                tabla = pa.ipc.open_file(fuente).read_all()
+        except (OSError, pa.ArrowInvalid):
+            return None
+        os.utime(ruta)                                                         # Marca de uso reciente para el límite de tamaño (LRU)
+        return restaurar_objetos(tabla.to_pandas(split_blocks=True), tabla)
+
+    #------------------------------------------------ Escritura, invalidación y límite de tamaño ------------------------------------------------#
+    def escribir(self, nombre, sha256, df):
+        ruta = self.ruta(nombre, sha256)
+        tabla = tabla_arrow(df)
+        temporal = f"{ruta}.parcial"
+        with pa.OSFile(temporal, "wb") as salida, pa.ipc.new_file(salida, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+        os.replace(temporal, ruta)
+        self.invalidar(nombre, conservar=ruta)                                 # Las versiones anteriores del mismo archivo ya no sirven
+        self._aplicar_limite(conservar=ruta)
+        return ruta
+
+    def invalidar(self, nombre, conservar=None):
+        for ruta in self._archivos(nombre):
+            if ruta != conservar:
+                os.remove(ruta)
+
+    def _aplicar_limite(self, conservar=None):
+        archivos = sorted(self._archivos(), key=os.path.getmtime)              # Primero las menos usadas recientemente
+        total = sum(os.path.getsize(r) for r in archivos)
+        for ruta in archivos:
+            if total <= self.limite_bytes:
+                break
+            if ruta != conservar:
+                total -= os.path.getsize(ruta)
+                os.remove(ruta)
+
+    def purgar(self, nombre=None):
+        archivos = self._archivos(nombre)
+        for ruta in archivos:
+            os.remove(ruta)
+        return len(archivos)
+
+    def obtener(self, nombre, sha256, construir):
+        # Devuelve la instantánea si existe; si no, construye el DataFrame (leer Excel + limpiar) y la guarda
+        with METRICAS.tramo("instantanea_lectura"):
+            df = self.leer(nombre, sha256)
+        if df is None:
+            df = construir()
+            self.escribir(nombre, sha256, df)
+        return df
+
+
+#================================================== USO DESDE LA LÍNEA DE COMANDOS ==================================================
+#   python -m sicoin.snapshots listar
+#   python -m sicoin.snapshots purgar [--nombre PTAR.xlsx]
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m sicoin.snapshots", description="Administra las instantáneas Arrow de los archivos SICOIN")
+    parser.add_argument("accion", choices=["listar", "purgar"])
+    parser.add_argument("--nombre", help="Limita la acción a un archivo (p. ej. PTAR.xlsx)")
+    parser.add_argument("--directorio", default=None)
+    args = parser.parse_args(argv)
+
+    almacen = AlmacenSnapshots(args.directorio)
+    if args.accion == "purgar":
+        print(f"Instantáneas eliminadas: {almacen.purgar(args.nombre)}")
+    else:
+        for ruta in sorted(almacen._archivos(args.nombre)):
+            print(f"{os.path.getsize(ruta) / 2**20:8.2f} MB  {os.path.basename(ruta)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import html
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from sicoin.metricas import METRICAS
+
+
+#================================================== GENERADOR DE TABLAS HTML EN TIEMPO LINEAL ==================================================
+# Las tablas se arman por columnas: cada columna se convierte a texto y se escapa de una sola vez, las piezas de todas las filas
+# se acomodan en un arreglo (filas x piezas) y al final se hace un solo "".join.
+# Así se evita iterrows (una Serie por fila) y la concatenación repetida de cadenas (crecimiento cuadrático).
+
+#------------------------------------------------ Estilos que ya usaba la app ------------------------------------------------#
+CELDA = "padding:12px; text-align:center; border:1px solid #ddd;"
+CELDA_JUSTIFICADA = "padding:12px; text-align:justify; border:1px solid #ddd;"
+CELDA_VALOR = "padding:12px; text-align:center; border:1px solid #ddd; font-weight:500;"
+CELDA_COMPACTA = "padding:5px; text-align:center; border:1px solid #ddd;"
+CELDA_TRIMESTRE = "text-align:center; border:1px solid #ddd;"
+ETIQUETA_FILA = "background-color:#621132; color:white;"
+FILA_TITULOS = "background-color:#621132; color:white;"
+CONTENEDOR = "overflow-x:auto; margin-bottom:20px;"
+CONTENEDOR_TRIMESTRES = "overflow-x:auto; margin-top:20px; margin-bottom:20px;"
+TABLA = "width:100%; border-collapse:collapse;"
+
+FILAS_ESTATUS = {"Sin Avances": "Sin_Avances", "En Proceso": "En_Proceso", "Concluidas": "Concluidas", "% de Cumplimiento": "Cumplimiento"}
+
+_SEPARADOR = "\x00"                 # No puede aparecer en celdas de Excel y html.escape no lo modifica
+
+
+@dataclass(frozen=True)
+class Columna:
+    titulo: str
+    valores: object                  # Lista, arreglo o Serie (se convierte a texto y se escapa)
+    estilo: str = CELDA
+    estilo_titulo: str = CELDA
+    encabezado: bool = False         # True: las celdas se escriben como <th> (columna de etiquetas de fila)
+    escapar: bool = True             # False solo para valores que ya son HTML generado por la app
+
+
+#------------------------------------------------ Formatos vectorizados ------------------------------------------------#
+def _serie(valores):
+    return valores if isinstance(valores, pd.Series) else pd.Series(valores, dtype=object)
+
+
+def _numeros(serie):
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        serie = serie.astype(object)
+    return pd.to_numeric(serie, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+
+def columna(df, nombre, defecto=""):
+    # Equivale a row.get(nombre, defecto) para todas las filas
+    return df[nombre] if nombre in df.columns else [defecto] * len(df)
+
+
+def texto(valores, escapar=True):
+    # str() de cada valor (como en un f-string: vacío -> "nan") y escape de toda la columna en una sola llamada
+    cadenas = list(map(str, _serie(valores).tolist()))
+    if escapar and cadenas:
+        cadenas = html.escape(_SEPARADOR.join(cadenas)).split(_SEPARADOR)
+    return cadenas
+
+
+def porcentaje(valores, decimales=2):
+    # 55.0 -> "55.0%", 55.555 -> "55.56%", vacío -> "", y en una columna entera 55 -> "55%" (equivale a f"{round(v, 2)}%").
+    # round(v, 2) de Python es el número que se escribe con "%.2f" (los dos redondean con el valor decimal exacto; np.round
+    # difiere en casos como 12.345), así que toda la columna se formatea con "%.2f" y se vuelve a leer como número
+    serie = _serie(valores)
+    if pd.api.types.is_integer_dtype(serie.dtype):
+        return (serie.astype(str) + "%").tolist()
+    numeros = _numeros(serie)
+    validos = ~np.isnan(numeros)
+    redondeados = np.char.mod(f"%.{decimales}f", numeros).astype("float64")
+    return np.where(validos, np.char.add(redondeados.astype(str), "%"), "").tolist()
+
+
+def porcentaje_entero(valores):
+    # 55.7 -> "55%" (equivale a f"{int(v)}%"); un texto no numérico se deja igual y un vacío queda como ""
+    serie = _serie(valores)
+    numeros = _numeros(serie)
+    validos = ~np.isnan(numeros)
+    cadenas = np.char.add(np.trunc(np.where(validos, numeros, 0)).astype("int64").astype(str), "%")
+    originales = ["" if pd.isna(v) else str(v) for v in serie.tolist()]
+    return np.where(validos, cadenas, np.array(originales, dtype=object)).tolist()
+
+
+#------------------------------------------------ Armado de la tabla ------------------------------------------------#
+def _atributo(estilo):
+    return f" style='{estilo}'" if estilo else ""
+
+
+@METRICAS.medir("tabla_html")
+def tabla_html(columnas, contenedor=CONTENEDOR, tabla=TABLA, fila_titulos=FILA_TITULOS):
+    titulos = "".join(f"<th{_atributo(c.estilo_titulo)}>{html.escape(c.titulo)}</th>" for c in columnas)
+    filas = len(columnas[0].valores) if columnas else 0
+    cuerpo = ""
+    if filas:
+        # Piezas de cada fila: <tr><td ...> valor </td><td ...> valor ... </td></tr>
+        piezas = np.empty((filas, 2 * len(columnas) + 1), dtype=object)
+        cierre = "<tr>"
+        for i, c in enumerate(columnas):
+            etiqueta = "th" if c.encabezado else "td"
+            piezas[:, 2 * i] = f"{cierre}<{etiqueta}{_atributo(c.estilo)}>"
+            piezas[:, 2 * i + 1] = texto(c.valores, c.escapar)
+            cierre = f"</{etiqueta}>"
+        piezas[:, -1] = f"{cierre}</tr>"
+        cuerpo = "".join(piezas.ravel().tolist())
+    return (f"<div{_atributo(contenedor)}><table{_atributo(tabla)}>"
+            f"<tr{_atributo(fila_titulos)}>{titulos}</tr>{cuerpo}</table></div>")
+
+
+def tabla_valores(valores, titulos=None, estilos_titulo=None):
+    # Tabla de una sola fila (clasificación de riesgos, cuadrante, estrategia, programa de trabajo...)
+    titulos = list(valores) if titulos is None else titulos
+    estilos_titulo = estilos_titulo or [CELDA] * len(titulos)
+    return tabla_html([Columna(t, [valores[k]], CELDA_VALOR, e) for k, t, e in zip(valores, titulos, estilos_titulo)])
+
+
+def tabla_trimestres(titulo, filas, data, trimestres, porcentajes=(), contenedor=CONTENEDOR_TRIMESTRES):
+    # Tabla de estatus (filas) por trimestre (columnas): filas = {"Sin Avances": "Sin_Avances", ...} y data = {"1Sin_Avances": 3, ...}
+    etiquetas = Columna(titulo, list(filas), ETIQUETA_FILA, "", encabezado=True)
+    nombres = ["Primero", "Segundo", "Tercero", "Cuarto"]
+    columnas = [etiquetas]
+    for t, nombre in zip(trimestres, nombres):
+        valores = [f"{data.get(f'{t}{estado}', 0)}{'%' if estado in porcentajes else ''}" for estado in filas.values()]
+        columnas.append(Columna(nombre, valores, CELDA_TRIMESTRE, ""))
+    return tabla_html(columnas, contenedor=contenedor,
+                      fila_titulos="background-color:#621132; color:white; text-align:center;")
@@ -0,0 +1,21 @@
+import pytest
+
+from sicoin.actualizador import construir_publicacion
+
+from tests.datos import CAMBIOS, con_cambio, datasets, tablas_limpias
+
+
+@pytest.fixture(scope="session")
+def tablas():
+    return tablas_limpias()
+
+
+@pytest.fixture(scope="session")
+def publicacion(tablas):
+    return construir_publicacion(datasets("v1", tablas))
+
+
+@pytest.fixture(params=list(CAMBIOS))
+def cambio(request, tablas):
+    # (nombre del caso, tablas de la versión nueva)
+    return request.param, con_cambio(tablas, request.param)
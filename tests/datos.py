@@ -0,0 +1,63 @@
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.datos_sinteticos import generar
+from sicoin.esquema import limpiar_datos
+from sicoin.ingesta import Datasets
+
+
+#================================================== DATOS DE PRUEBA ==================================================
+# Tablas sintéticas ya limpias (mismas columnas y tipos que las reales) y pequeñas para que cada prueba tarde poco.
+# Un cambio de pocos renglones afecta pocos alcances, así que la publicación siguiente es incremental.
+INSTITUCIONES, SECTORES, AÑOS = 12, 3, (2023, 2024)
+
+
+def tablas_limpias():
+    return {nombre: limpiar_datos(df, nombre) for nombre, df in generar(INSTITUCIONES, SECTORES, AÑOS).items()}
+
+
+def datasets(version, tablas):
+    return Datasets(version, MappingProxyType(dict(tablas)), MappingProxyType({}))
+
+
+#--------------- Los cinco cambios de renglones que debe detectar la publicación incremental ---------------#
+def _modifica(tablas):
+    ptar = tablas["PTAR"].copy()
+    ptar.loc[3, "AC_Total"] = 7
+    return {"PTAR": ptar}
+
+
+def _quita(tablas):
+    return {"PTAR": tablas["PTAR"].drop(index=[5]).reset_index(drop=True)}
+
+
+def _agrega(tablas):
+    amtri = tablas["AMTRI"]
+    return {"AMTRI": pd.concat([amtri, amtri.iloc[[0, 1]]], ignore_index=True)}
+
+
+def _reordena(tablas):
+    # Intercambia dos renglones del mismo alcance (Institución × Año): el contenido es el mismo, el orden no
+    amtri = tablas["AMTRI"]
+    primero = amtri.iloc[0]
+    mismos = np.flatnonzero(((amtri["Institución"] == primero["Institución"]) & (amtri["Año"] == primero["Año"])).to_numpy())
+    orden = np.arange(len(amtri))
+    orden[mismos[0]], orden[mismos[1]] = mismos[1], mismos[0]
+    return {"AMTRI": amtri.take(orden).reset_index(drop=True)}
+
+
+def _actri(tablas):
+    actri = tablas["ACTRI"].copy()
+    actri.loc[actri.index[-1], "Avance_OIC"] = 0
+    actri.loc[actri.index[0], "Descripcion"] = "Supervisión trimestral del contrato de limpieza"
+    return {"ACTRI": actri}
+
+
+CAMBIOS = {"modifica": _modifica, "quita": _quita, "agrega": _agrega, "reordena": _reordena, "actri": _actri}
+
+
+def con_cambio(tablas, nombre):
+    # Tablas de la versión nueva después de aplicar uno de los CAMBIOS
+    return {**tablas, **CAMBIOS[nombre](tablas)}
@@ -0,0 +1,157 @@
+import http.client
+import json
+import threading
+from urllib.parse import urlencode
+
+import pytest
+
+from sicoin.actualizador import construir_publicacion
+from sicoin.api import Servidor, _coincide
+from sicoin.cache import CacheLRU
+
+from tests.datos import con_cambio, datasets
+
+
+class _Actualizador:
+    # Lo mínimo que usa el servidor: la publicación vigente y el estado para /salud
+    def __init__(self, publicacion):
+        self.actual = publicacion
+
+    def estado(self):
+        return {"version": self.actual.version}
+
+
+@pytest.fixture(scope="module")
+def servidor(publicacion):
+    servidor = Servidor(("127.0.0.1", 0), _Actualizador(publicacion), CacheLRU())
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture
+def pedir(servidor):
+    def pedir(ruta, **encabezados):
+        conexion = http.client.HTTPConnection(*servidor.server_address, timeout=10)
+        try:
+            conexion.request("GET", ruta, headers=encabezados)
+            respuesta = conexion.getresponse()
+            return respuesta.status, dict(respuesta.getheaders()), respuesta.read()
+        finally:
+            conexion.close()
+    return pedir
+
+
+def _url(ruta, **parametros):
+    return f"{ruta}?{urlencode(parametros)}"
+
+
+def _alcance(publicacion):
+    ptar = publicacion.datos["PTAR"]
+    return ptar.loc[0, "Institución"], int(ptar.loc[0, "Año"]), ptar.loc[0, "Sector"]
+
+
+#================================================== RUTAS ==================================================
+def test_version(pedir, publicacion):
+    estado, encabezados, cuerpo = pedir("/version")
+    assert estado == 200 and encabezados["ETag"] == f'"{publicacion.version}"'
+    datos = json.loads(cuerpo)
+    assert datos["version"] == publicacion.version
+    assert datos["filas"] == {nombre: len(df) for nombre, df in publicacion.datos.tablas.items()}
+
+
+def test_filtros(pedir, publicacion):
+    estado, _, cuerpo = pedir("/filtros")
+    assert estado == 200 and json.loads(cuerpo)["instituciones"] == publicacion.facetas.instituciones
+
+
+def test_ptar_por_institucion_y_por_sector(pedir, publicacion):
+    institucion, año, sector = _alcance(publicacion)
+    agregado = publicacion.cubo.consultar("PTAR", "Institución", institucion, año)
+    estado, _, cuerpo = pedir(_url("/ptar", institucion=institucion, anio=año))
+    datos = json.loads(cuerpo)
+    assert estado == 200 and datos["alcance"] == "Institución" and datos["sector"] == sector
+    assert datos["valores"]["AC_Total"] == agregado.sumas["AC_Total"]
+
+    estado, _, cuerpo = pedir(_url("/ptar", sector=sector, anio=año))
+    datos = json.loads(cuerpo)
+    assert estado == 200 and institucion in datos["instituciones"]
+
+
+def test_ptci(pedir, publicacion):
+    institucion, año, _ = _alcance(publicacion)
+    estado, _, cuerpo = pedir(_url("/ptci", institucion=institucion, anio=año))
+    assert estado == 200 and "Cumplimiento_General_de_las_NGCI" in json.loads(cuerpo)
+
+
+def test_renglones_paginados(pedir, publicacion):
+    institucion, año, _ = _alcance(publicacion)
+    total = len(publicacion.cubo.seleccionar("ACTRI", "Institución", institucion, año))
+    estado, _, cuerpo = pedir(_url("/actri", institucion=institucion, anio=año, desde=1, limite=2))
+    datos = json.loads(cuerpo)
+    assert estado == 200 and datos["total"] == total and datos["desde"] == 1
+    assert len(datos["registros"]) == min(2, total - 1)
+
+    estado, _, cuerpo = pedir(_url("/amtri", institucion=institucion, anio=año, trimestre=2))
+    assert estado == 200 and {r["Trimestre"] for r in json.loads(cuerpo)["registros"]} == {"2"}
+
+
+@pytest.mark.parametrize("ruta, esperado", [("/ptar?anio=2023", 400), ("/ptar?institucion=X&anio=dos", 400),
+                                            ("/ptar?institucion=Ninguna&anio=2023", 404), ("/nada", 404)])
+def test_errores(pedir, ruta, esperado):
+    estado, encabezados, cuerpo = pedir(ruta)
+    assert estado == esperado and "error" in json.loads(cuerpo)
+    assert "ETag" not in encabezados
+
+
+def test_salud_y_metricas(pedir):
+    assert pedir("/salud")[0] == 200
+    estado, encabezados, _ = pedir("/metrics")
+    assert estado == 200 and encabezados["Content-Type"].startswith("text/plain") and "ETag" not in encabezados
+
+
+#================================================== ETAG E IF-NONE-MATCH ==================================================
+@pytest.mark.parametrize("if_none_match, coincide", [
+    ('"v1"', True), ('W/"v1"', True), ('"v0", "v1"', True), ("*", True),
+    ('"v2"', False), ('"v"', False), ("v1", False), ("", False), (None, False),
+])
+def test_coincide(if_none_match, coincide):
+    assert _coincide('"v1"', if_none_match) is coincide
+
+
+def test_304_solo_con_la_version_vigente(pedir, publicacion):
+    etag = f'"{publicacion.version}"'
+    for encabezado in (etag, f"W/{etag}", f'"otra", {etag}', "*"):
+        estado, encabezados, cuerpo = pedir("/version", **{"If-None-Match": encabezado})
+        assert estado == 304 and cuerpo == b"" and encabezados["ETag"] == etag
+    assert pedir("/version", **{"If-None-Match": '"otra"'})[0] == 200
+
+
+@pytest.mark.parametrize("ruta", ["/ptar?anio=2023", "/ptar?institucion=Ninguna&anio=2023", "/nada"])
+def test_errores_no_se_revalidan(pedir, publicacion, ruta):
+    # Con parámetros inválidos se contesta el error aunque If-None-Match coincida con la versión
+    for encabezado in (f'"{publicacion.version}"', "*"):
+        estado, encabezados, _ = pedir(ruta, **{"If-None-Match": encabezado})
+        assert estado in (400, 404) and "ETag" not in encabezados
+
+
+def test_cambio_de_version_conserva_respuestas_de_otros_alcances(tablas, publicacion):
+    # Con una publicación incremental las respuestas de los alcances que no cambiaron pasan a la versión nueva
+    actualizador = _Actualizador(publicacion)
+    servidor = Servidor(("127.0.0.1", 0), actualizador, CacheLRU())
+    try:
+        ptar = tablas["PTAR"]
+        otra = {"institucion": ptar.loc[0, "Institución"], "anio": str(ptar.loc[0, "Año"])}
+        cambiada = {"institucion": ptar.loc[3, "Institución"], "anio": str(ptar.loc[3, "Año"])}
+        antes = {n: servidor.responder("/ptar", p)[2] for n, p in (("otra", otra), ("cambiada", cambiada))}
+
+        actualizador.actual = construir_publicacion(datasets("v2", con_cambio(tablas, "modifica")), publicacion)
+        aciertos = servidor.cache.estadisticas()["aciertos"]
+        estado, _, cuerpo, etag = servidor.responder("/ptar", otra)
+        assert estado == 200 and etag == '"v2"' and cuerpo == antes["otra"]
+        assert servidor.cache.estadisticas()["aciertos"] == aciertos + 1
+        assert servidor.responder("/ptar", cambiada)[2] != antes["cambiada"]
+    finally:
+        servidor.server_close()
@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+from sicoin import busqueda
+from sicoin.busqueda import IndiceTexto, terminos_consulta
+from sicoin.incremental import detectar_cambios
+
+from tests.datos import datasets
+
+
+def _con_descripcion(tablas, texto, fila=0):
+    actri = tablas["ACTRI"].copy()
+    actri.loc[fila, "Descripcion"] = texto
+    return {**tablas, "ACTRI": actri}
+
+
+def _actualizar(indice, anteriores, nuevas):
+    return indice.actualizado(datasets("v2", nuevas), detectar_cambios(datasets("v1", anteriores), datasets("v2", nuevas)))
+
+
+def test_terminos_normalizados():
+    assert terminos_consulta("La Contratación <b>de</b> OBRA pública") == ["contratacion", "obra", "publica"]
+
+
+def test_prefijos_y_todos_los_terminos(publicacion):
+    indice = publicacion.busqueda
+    assert len(indice.buscar("increm")) == 0
+    assert len(indice.buscar("incumpl")) == len(indice.buscar("incumplimiento")) > 0
+    assert len(indice.buscar("incumplimiento mejora")) == 0                   # Ningún documento tiene los dos términos
+    assert set(indice.buscar("proceso", base="AMTRI", limite=10_000)["Base"]) == {"AMTRI"}
+
+
+def test_amtri_un_documento_por_accion(publicacion):
+    # La misma AM en varios trimestres es un solo documento con la lista de trimestres
+    resultados = publicacion.busqueda.buscar("mejora", base="AMTRI", limite=10_000)
+    assert not resultados.duplicated(["Año", "Institución", "Identificador"]).any()
+    assert set(resultados["Trimestres"]) == {"1, 2"}
+
+
+def test_segmento_nuevo_y_borrados(tablas, publicacion):
+    nuevas = _con_descripcion(tablas, "Revisión exclusiva del almacén")
+    indice = _actualizar(publicacion.busqueda, tablas, nuevas)
+    assert len(indice.segmentos) == 2
+    institucion, año = tablas["ACTRI"].loc[0, ["Institución", "Año"]]
+    afectados = (tablas["ACTRI"]["Institución"] == institucion) & (tablas["ACTRI"]["Año"] == año)
+    assert (~indice.vivos[0]).sum() == afectados.sum()                         # Los documentos de la institución se marcan borrados...
+    assert len(indice.segmentos[1].documentos) == afectados.sum()            # ...y se vuelven a indexar en el segmento nuevo
+    assert indice.documentos == publicacion.busqueda.documentos
+
+    encontrados = indice.buscar("exclusiva almacen")
+    assert len(encontrados) == 1 and encontrados.loc[0, "Institución"] == institucion
+
+    # Al volver al texto original, el documento del segundo segmento queda borrado y ya no aparece
+    de_vuelta = _actualizar(indice, nuevas, tablas)
+    assert len(de_vuelta.segmentos) == 3
+    assert len(de_vuelta.buscar("exclusiva almacen")) == 0
+    completo = IndiceTexto.construir(datasets("v3", tablas))
+    for consulta in ("riesgo incumplimiento", "accion control"):
+        esperado, obtenido = (i.buscar(consulta, limite=10_000) for i in (completo, de_vuelta))
+        pd.testing.assert_frame_equal(*(r.sort_values(list(r.columns)).reset_index(drop=True) for r in (obtenido, esperado)))
+
+
+def test_sin_cambios_de_texto_se_reutiliza(tablas, publicacion):
+    ptci = tablas["PTCI"].copy()
+    ptci.loc[0, "Acciones_de_Mejora_Programa_Original"] += 1
+    indice = _actualizar(publicacion.busqueda, tablas, {**tablas, "PTCI": ptci})
+    assert indice is publicacion.busqueda
+
+
+@pytest.mark.parametrize("limite, atributo", [(1, "MAX_SEGMENTOS"), (0.0, "MAX_BORRADOS")])
+def test_reconstruye_con_demasiados_segmentos_o_borrados(tablas, publicacion, monkeypatch, limite, atributo):
+    monkeypatch.setattr(busqueda, atributo, limite)
+    indice = _actualizar(publicacion.busqueda, tablas, _con_descripcion(tablas, "Revisión exclusiva del almacén"))
+    assert len(indice.segmentos) == 1 and indice.vivos[0].all()
+    assert len(indice.buscar("exclusiva almacen")) == 1
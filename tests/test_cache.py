@@ -0,0 +1,83 @@
+from sicoin.cache import CacheLRU, memorizar
+
+X, Y = ("Institución", "Institución 00000", 2023), ("Institución", "Institución 00001", 2023)
+
+
+def _llenar(cache, version):
+    cache.obtener(version, "x", lambda: "x", frozenset({X}))
+    cache.obtener(version, "y", lambda: "y", frozenset({Y}))
+    cache.obtener(version, "todo", lambda: "todo")                            # Depende de todos los datos
+
+
+def test_aciertos_y_fallos():
+    cache = CacheLRU()
+    assert cache.obtener("v1", "a", lambda: 1) == 1
+    assert cache.obtener("v1", "a", lambda: 2) == 1
+    assert cache.estadisticas()["aciertos"] == 1 and cache.estadisticas()["fallos"] == 1
+
+
+def test_avanzar_conserva_lo_que_no_depende_de_los_afectados():
+    cache = CacheLRU()
+    _llenar(cache, "v1")
+    cache.avanzar("v2", "v1", frozenset({X}))
+    assert cache.estadisticas()["conservadas"] == 1
+    assert cache.obtener("v2", "y", lambda: "nuevo") == "y"                  # No depende de X: pasó a v2
+    assert cache.obtener("v2", "x", lambda: "nuevo") == "nuevo"              # Depende de X: se recalcula
+    assert cache.obtener("v2", "todo", lambda: "nuevo") == "nuevo"           # Sin alcances: cualquier cambio la descarta
+    assert cache.obtener("v1", "x", lambda: "otro") == "x"                   # Las sesiones en v1 conservan lo suyo
+
+
+def test_avanzar_a_una_version_ya_vista_no_hace_nada():
+    cache = CacheLRU()
+    _llenar(cache, "v1")
+    cache.obtener("v2", "z", lambda: "z")
+    cache.avanzar("v2", "v1", frozenset())
+    assert cache.estadisticas()["conservadas"] == 0
+    assert cache.obtener("v2", "y", lambda: "nuevo") == "nuevo"
+
+
+def test_avanzar_sin_cambios_conocidos_no_conserva_nada():
+    cache = CacheLRU()
+    _llenar(cache, "v1")
+    cache.avanzar("v2")
+    assert cache.obtener("v2", "y", lambda: "nuevo") == "nuevo"
+
+
+def test_solo_se_conservan_las_versiones_vivas():
+    cache = CacheLRU()
+    _llenar(cache, "v1")
+    _llenar(cache, "v2")
+    assert cache.estadisticas()["entradas"] == 6
+    assert cache.obtener("v1", "x", lambda: "nuevo") == "x"                  # Una sesión que sigue en v1 conserva lo suyo
+    cache.obtener("v3", "x", lambda: "x3")
+    assert cache.estadisticas()["entradas"] == 4 and cache.estadisticas()["invalidaciones"] == 1
+    assert cache.version == "v3"
+    assert cache.obtener("v2", "y", lambda: "nuevo") == "y"                  # v2 sigue viva (sesiones que aún no cambian)
+
+
+def test_limites_de_entradas_y_tamaño():
+    cache = CacheLRU(max_entradas=2)
+    for llave in "abc":
+        cache.obtener("v1", llave, lambda: llave)
+    assert cache.estadisticas()["entradas"] == 2 and cache.estadisticas()["descartes"] == 1
+    assert cache.obtener("v1", "a", lambda: "nuevo") == "nuevo"              # La menos usada recientemente salió primero
+
+    cache = CacheLRU(max_mb=1 / 2**20 * 200)
+    cache.obtener("v1", "grande", lambda: "g" * 500)
+    assert cache.estadisticas()["entradas"] == 0
+
+
+def test_memorizar():
+    cache, version, llamadas = CacheLRU(), ["v1"], []
+
+    @memorizar(cache, lambda: version[0], alcances=lambda valor, año: [("Institución", valor, año)])
+    def vista(valor, año):
+        llamadas.append((valor, año))
+        return f"{valor} {año}"
+
+    assert vista("Institución 00001", 2023) == vista("Institución 00001", 2023)
+    assert len(llamadas) == 1
+    cache.avanzar("v2", "v1", frozenset({X}))
+    version[0] = "v2"
+    vista("Institución 00001", 2023)
+    assert len(llamadas) == 1
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sicoin import incremental
+from sicoin.actualizador import construir_publicacion
+from sicoin.agregados import MATRICES
+from sicoin.facetas import RELACIONES
+from sicoin.incremental import detectar_cambios, firmas
+
+from tests.datos import datasets
+
+
+#================================================== FIRMAS POR ALCANCE (XOR de los renglones) ==================================================
+def test_firmas_iguales_para_tablas_iguales(tablas):
+    ptar = tablas["PTAR"]
+    pd.testing.assert_series_equal(firmas(ptar, "Institución"), firmas(ptar.copy(), "Institución"))
+
+
+def test_firmas_solo_cambian_en_el_alcance_modificado(tablas):
+    ptar = tablas["PTAR"]
+    modificada = ptar.copy()
+    modificada.loc[3, "AC_Total"] += 1
+    antes, despues = firmas(ptar, "Institución"), firmas(modificada, "Institución")
+    distintas = antes.index[antes.to_numpy() != despues.loc[antes.index].to_numpy()]
+    assert distintas.tolist() == [(ptar.loc[3, "Institución"], ptar.loc[3, "Año"])]
+
+
+def test_firmas_cambian_al_reordenar_renglones_del_alcance(tablas):
+    # El XOR por sí solo no distingue el orden; la posición dentro del alcance sí
+    amtri = tablas["AMTRI"]
+    llave = (amtri.loc[0, "Institución"], amtri.loc[0, "Año"])
+    orden = np.arange(len(amtri))
+    orden[[0, 1]] = [1, 0]
+    reordenada = amtri.take(orden).reset_index(drop=True)
+    assert reordenada.loc[0, "Descripcion"] != amtri.loc[0, "Descripcion"]
+    assert firmas(amtri, "Institución")[llave] != firmas(reordenada, "Institución")[llave]
+
+
+def test_firmas_ignoran_renglones_sin_año(tablas):
+    ptar = tablas["PTAR"].copy()
+    ptar.loc[0, "Año"] = pd.NA
+    assert len(firmas(ptar, "Institución")) == len(firmas(tablas["PTAR"], "Institución")) - 1
+
+
+#================================================== DETECCIÓN DE CAMBIOS ==================================================
+def test_detectar_cambios_sin_cambios(tablas):
+    cambios = detectar_cambios(datasets("v1", tablas), datasets("v2", tablas))
+    assert cambios.llaves == {} and cambios.afectados == frozenset()
+
+
+def test_detectar_cambios_por_caso(tablas, cambio):
+    _, nuevas = cambio
+    cambios = detectar_cambios(datasets("v1", tablas), datasets("v2", nuevas))
+    assert cambios is not None and cambios.version_anterior == "v1"
+    assert cambios.afectados
+    assert 0 < cambios.fraccion <= 0.5
+
+
+def test_detectar_cambios_reconstruye_si_cambian_los_tipos(tablas):
+    ptar = tablas["PTAR"].astype({"AC_Total": "float64"})
+    assert detectar_cambios(datasets("v1", tablas), datasets("v2", {**tablas, "PTAR": ptar})) is None
+
+
+def test_detectar_cambios_reconstruye_si_el_cambio_es_grande(tablas, monkeypatch):
+    # Todos los alcances de PTAR cambian: una cuarta parte de los alcances de las cuatro bases
+    ptar = tablas["PTAR"].copy()
+    ptar["AC_Total"] += 1
+    nuevos = datasets("v2", {**tablas, "PTAR": ptar})
+    assert detectar_cambios(datasets("v1", tablas), nuevos).fraccion == pytest.approx(0.25, abs=0.05)
+    monkeypatch.setattr(incremental, "FRACCION_MAXIMA", 0.2)
+    assert detectar_cambios(datasets("v1", tablas), nuevos) is None
+
+
+#================================================== PUBLICACIÓN INCREMENTAL == RECONSTRUCCIÓN COMPLETA ==================================================
+@pytest.fixture
+def incremental_y_completa(publicacion, cambio):
+    _, nuevas = cambio
+    derivada = construir_publicacion(datasets("v2", nuevas), publicacion)
+    assert derivada.cambios is not None                                       # De verdad se tomó el camino incremental
+    return derivada, construir_publicacion(datasets("v2", nuevas))
+
+
+def test_cubo_incremental(incremental_y_completa):
+    incremental, completa = (p.cubo for p in incremental_y_completa)
+    assert incremental._tablas.keys() == completa._tablas.keys()
+    for llave, esperada in completa._tablas.items():
+        tabla = incremental._tablas[llave]
+        assert tabla["valores"].equals(esperada["valores"])
+        for nombre in ("años", "inicios", "finales"):
+            np.testing.assert_array_equal(tabla[nombre], esperada[nombre])
+        assert tabla["numericas"] == esperada["numericas"]
+        for nombre in MATRICES:
+            np.testing.assert_array_equal(tabla[nombre], esperada[nombre])
+        pd.testing.assert_frame_equal(tabla["ordenado"], esperada["ordenado"])
+
+
+def test_facetas_incrementales(incremental_y_completa):
+    incremental, completa = (p.facetas for p in incremental_y_completa)
+    assert incremental.instituciones == completa.instituciones
+    assert incremental.sectores == completa.sectores
+    for nombre in RELACIONES:
+        assert getattr(incremental, nombre) == getattr(completa, nombre), nombre
+    assert incremental._opciones.keys() == completa._opciones.keys()
+    for llave, esperadas in completa._opciones.items():
+        opciones = incremental._opciones[llave]
+        for nombre in ("valores", "opciones"):
+            assert opciones[nombre].equals(esperadas[nombre]), (llave, nombre)
+        for nombre in ("años", "inicios", "finales"):
+            np.testing.assert_array_equal(opciones[nombre], esperadas[nombre])
+
+
+
+def test_conciliacion_incremental(incremental_y_completa):
+    incremental, completa = (p.conciliacion for p in incremental_y_completa)
+    assert incremental.alcances == completa.alcances
+    pd.testing.assert_frame_equal(incremental.discrepancias, completa.discrepancias)
+    assert incremental._rangos.keys() == completa._rangos.keys()
+    for alcance, esperados in completa._rangos.items():
+        assert incremental._rangos[alcance]["valores"].equals(esperados["valores"])
+        for nombre in ("años", "inicios", "finales"):
+            np.testing.assert_array_equal(incremental._rangos[alcance][nombre], esperados[nombre])
+
+
+@pytest.mark.parametrize("consulta", ["riesgo incumplimiento", "mejora proceso", "accion control", "contrat"])
+def test_busqueda_incremental(incremental_y_completa, consulta):
+    # Con empates de puntaje el orden entre segmentos puede variar, así que se comparan todos los resultados ordenados
+    incremental, completa = (p.busqueda for p in incremental_y_completa)
+    assert incremental.documentos == completa.documentos
+    assert incremental.longitud_media == pytest.approx(completa.longitud_media)
+    resultados = [b.buscar(consulta, limite=10_000) for b in (incremental, completa)]
+    resultados = [r.sort_values(list(r.columns), kind="stable").reset_index(drop=True) for r in resultados]
+    pd.testing.assert_frame_equal(*resultados)
@@ -0,0 +1,56 @@
+import functools
+import os
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from benchmarks.datos_sinteticos import escribir, generar
+from sicoin import lectores
+from sicoin.esquema import ESQUEMAS, limpiar_datos
+from sicoin.lectores import LECTORES, leer_bloques
+
+
+@pytest.fixture(scope="module")
+def carpeta(tmp_path_factory):
+    carpeta = tmp_path_factory.mktemp("xlsx")
+    escribir(generar(8, 2, (2023, 2024)), str(carpeta))
+    return carpeta
+
+
+@pytest.mark.parametrize("nombre", list(ESQUEMAS))
+def test_todos_los_lectores_dan_la_misma_tabla_limpia(carpeta, nombre):
+    ruta = os.path.join(carpeta, f"{nombre}.xlsx")
+    referencia = limpiar_datos(LECTORES["pandas"](ruta), nombre)
+    for lector in LECTORES.values():
+        tabla = lector(ruta) if lector.limpia else limpiar_datos(lector(ruta), nombre)
+        pd.testing.assert_frame_equal(tabla, referencia[tabla.columns], obj=lector.nombre)
+
+
+@pytest.mark.parametrize("tamaño", [1, 7, 100_000])
+@pytest.mark.parametrize("nombre", list(ESQUEMAS))
+def test_flujo_no_depende_del_tamaño_de_bloque(carpeta, nombre, tamaño, monkeypatch):
+    ruta = os.path.join(carpeta, f"{nombre}.xlsx")
+    monkeypatch.setattr(lectores, "leer_bloques", functools.partial(leer_bloques, tamaño=tamaño))
+    pd.testing.assert_frame_equal(LECTORES["flujo"](ruta), limpiar_datos(LECTORES["proyeccion"](ruta), nombre))
+
+
+def test_flujo_une_tipos_distintos_entre_bloques(tmp_path, monkeypatch):
+    # Enteros con vacíos en un bloque (decimales en él), textos y números mezclados, y bloques sin ningún valor
+    libro = Workbook()
+    hoja = libro.active
+    hoja.append(["Año", "Institución", "Sector", "Siglas", "AC", "Descripcion", "Avance_OIC"])
+    for fila in [(2023, 1, "S1", None, 1, "x", None), (2023, None, "S1", None, None, 3, None),
+                 ("Año", "Institución", "Sector", "Siglas", "AC", "Descripcion", "Avance_OIC"),
+                 (2024, "Inst B", None, "IB", 2, None, 80.5), (None, 2, "S2", "IC", None, 4.5, None),
+                 (2024, " Inst B ", "S2", 7, 3, "y", 10)]:
+        hoja.append(fila)
+    ruta = str(tmp_path / "ACTRI.xlsx")
+    libro.save(ruta)
+
+    referencia = limpiar_datos(LECTORES["proyeccion"](ruta), "ACTRI")
+    assert referencia["Institución"].cat.categories.tolist() == ["1", "2", "Inst B"]
+    for tamaño in (1, 2, 3, 10):
+        monkeypatch.setattr(lectores, "leer_bloques", functools.partial(leer_bloques, tamaño=tamaño))
+        pd.testing.assert_frame_equal(LECTORES["flujo"](ruta), referencia)
+
@@ -0,0 +1,79 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sicoin import paquete
+from sicoin.actualizador import Actualizador, construir_publicacion
+
+from tests.datos import con_cambio, datasets
+
+
+def _consultas(publicacion):
+    # Lo que leen la app y la API de cada estructura, para comparar una publicación con la que se cargó del paquete
+    facetas, cubo = publicacion.facetas, publicacion.cubo
+    resultado = {"instituciones": facetas.instituciones, "sectores": facetas.sectores,
+                 "años": [facetas.años(i, "Todas") for i in facetas.instituciones]}
+    for alcance, valores in (("Institución", facetas.instituciones), ("Sector", facetas.sectores)):
+        for valor in valores:
+            for año in (2023, 2024):
+                resultado[(alcance, valor, año)] = (
+                    [cubo.consultar(base, alcance, valor, año) for base in ("PTAR", "ACTRI", "PTCI", "AMTRI")],
+                    [facetas.opciones(base, "Siglas", alcance, valor, año) for base in ("PTAR", "AMTRI")],
+                    publicacion.conciliacion.de(alcance, valor, año).to_dict("records"))
+    for consulta in ("riesgo", "mejora proceso", "contrat"):
+        resultado[consulta] = publicacion.busqueda.buscar(consulta, limite=10_000).to_dict("records")
+    return resultado
+
+
+@pytest.fixture(params=["completa", "incremental"])
+def original(request, tablas, publicacion):
+    if request.param == "completa":
+        return publicacion
+    nueva = construir_publicacion(datasets("v2", con_cambio(tablas, "actri")), publicacion)
+    assert nueva.cambios is not None and len(nueva.busqueda.segmentos) == 2
+    return nueva
+
+
+def test_ida_y_vuelta(original, tmp_path):
+    ruta = paquete.guardar(original, str(tmp_path / "sicoin.paquete"), fuente="pruebas")
+    cargada = paquete.cargar(ruta)
+    assert cargada.version == original.version and cargada.fecha == original.fecha
+    for nombre, df in original.datos.tablas.items():
+        pd.testing.assert_frame_equal(cargada.datos[nombre], df)
+    assert cargada.cambios == original.cambios
+    for alcance, esperada in original.cubo._tablas.items():
+        tabla = cargada.cubo._tablas[alcance]
+        for nombre in ("años", "inicios", "finales", "sumas", "medias", "medias_validas"):
+            assert tabla[nombre].dtype == esperada[nombre].dtype
+            np.testing.assert_array_equal(tabla[nombre], esperada[nombre])
+    for vivos, esperados in zip(cargada.busqueda.vivos, original.busqueda.vivos):
+        np.testing.assert_array_equal(vivos, esperados)
+    pd.testing.assert_frame_equal(cargada.conciliacion.discrepancias, original.conciliacion.discrepancias)
+    assert repr(_consultas(cargada)) == repr(_consultas(original))            # repr: los promedios vacíos son NaN (NaN != NaN)
+    assert paquete.leer_manifiesto(ruta)["fuente"] == "pruebas"
+
+
+def test_archivo_que_no_es_paquete(tmp_path):
+    ruta = tmp_path / "otro.paquete"
+    ruta.write_bytes(b"no es un paquete")
+    with pytest.raises(ValueError):
+        paquete.cargar(str(ruta))
+
+
+def test_el_actualizador_revisa_el_manifiesto_seguido(tablas, publicacion, tmp_path):
+    # Con el paquete, la versión nueva llega en segundos (revision_s) y no en el intervalo de refresco de los Excel
+    ruta = paquete.guardar(publicacion, str(tmp_path / "datos.sicoin"))
+    ingesta = paquete.IngestaPaquete(ruta, revision_s=0.05)
+    actualizador = Actualizador(ingesta, ingesta.intervalo_min, ingesta.construir)
+    actualizador.iniciar()
+    try:
+        nueva = construir_publicacion(datasets("v2", con_cambio(tablas, "modifica")), publicacion)
+        paquete.guardar(nueva, ruta)
+        limite = time.monotonic() + 10
+        while actualizador.actual.version != "v2" and time.monotonic() < limite:
+            time.sleep(0.02)
+        assert actualizador.actual.version == "v2" and actualizador.actual.cambios is not None
+    finally:
+        actualizador.detener()